@@ -0,0 +1,58 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from database import db_helper
+
+# bcrypt releases the GIL while hashing, so one thread per core scales
+MAX_WORKERS = os.cpu_count() or 1
+POLL_INTERVAL_MS = 15
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="auth")
+        return _executor
+
+
+def configure(max_workers=None, bcrypt_rounds=None):
+    global MAX_WORKERS
+    if bcrypt_rounds is not None:
+        db_helper.set_bcrypt_rounds(bcrypt_rounds)
+    if max_workers is not None and max_workers != MAX_WORKERS:
+        MAX_WORKERS = max_workers
+        shutdown(wait=False)
+
+
+def shutdown(wait=True):
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+def authenticate_user_async(username: str, password: str):
+    return get_executor().submit(db_helper.authenticate_user, username, password)
+
+
+def create_user_async(username: str, password: str):
+    return get_executor().submit(db_helper.create_user, username, password)
+
+
+def deliver_on_tk(widget, future, callback):
+    # Tk may only be touched from the main thread, so poll the future from
+    # there and hand over callback(result, error) once it is done
+    def poll():
+        if not future.done():
+            widget.after(POLL_INTERVAL_MS, poll)
+            return
+        error = future.exception()
+        callback(None if error else future.result(), error)
+
+    widget.after(POLL_INTERVAL_MS, poll)
@@ -1,5 +1,10 @@
+import threading
+
+
 class EventBus:
     _subscribers = {}
+    _dispatcher = None
+    _delivered = 0
 
     @classmethod
     def subscribe(cls, event_name, callback):
@@ -9,11 +14,109 @@ class EventBus:
 
     @classmethod
     def unsubscribe(cls, event_name, callback):
-        if event_name in cls._subscribers:
+        if event_name in cls._subscribers and callback in cls._subscribers[event_name]:
             cls._subscribers[event_name].remove(callback)
 
     @classmethod
     def notify(cls, event_name, data=None):
-        if event_name in cls._subscribers:
-            for callback in cls._subscribers[event_name]:
-                callback(data)
+        if cls._dispatcher is not None:
+            cls._dispatcher.enqueue(event_name, data)
+        else:
+            cls._deliver(event_name, data)
+
+    @classmethod
+    def _deliver(cls, event_name, data):
+        # Copy, callbacks may unsubscribe themselves while handling the event
+        for callback in list(cls._subscribers.get(event_name, ())):
+            callback(data)
+        cls._delivered += 1
+
+    # ------------------------ Tk Dispatch ------------------------
+
+    @classmethod
+    def attach_tk(cls, root, interval_ms=50):
+        # From now on events are queued, duplicates within one interval are
+        # merged, and delivery happens on the Tk main thread from one pump,
+        # scheduled by the first event after the queue was empty.
+        cls.detach()
+        cls._dispatcher = _TkDispatcher(cls, root, interval_ms)
+
+    @classmethod
+    def detach(cls):
+        if cls._dispatcher is not None:
+            cls._dispatcher.stop()
+            cls._dispatcher = None
+
+    @classmethod
+    def stats(cls):
+        dispatcher = cls._dispatcher
+        return {
+            "delivered": cls._delivered,
+            "queued": dispatcher.queued if dispatcher else 0,
+            "coalesced": dispatcher.coalesced if dispatcher else 0,
+            "pending": dispatcher.pending_count() if dispatcher else 0,
+        }
+
+
+class _TkDispatcher:
+    def __init__(self, bus, root, interval_ms):
+        self.bus = bus
+        self.root = root
+        self.interval_ms = interval_ms
+        self.lock = threading.Lock()
+        self.pending = {}  # (event, data) -> data, insertion ordered
+        self.queued = 0
+        self.coalesced = 0
+        self.stopped = False
+        self.after_id = None  # the scheduled pump, only while events are pending
+
+    def enqueue(self, event_name, data):
+        try:
+            key = (event_name, data)
+            hash(key)
+        except TypeError:
+            key = (event_name, id(data))  # unhashable payloads are never merged
+        with self.lock:
+            self.queued += 1
+            if key in self.pending:
+                self.coalesced += 1
+            else:
+                self.pending[key] = (event_name, data)
+            if self.after_id is not None or self.stopped:
+                return
+            self.after_id = "scheduling"  # claims the pump while not holding the lock
+        try:
+            # From another thread, tkinter hands the call to the Tk thread
+            after_id = self.root.after(self.interval_ms, self.pump)
+        except RuntimeError:
+            after_id = None  # Tk loop not running; the next enqueue tries again
+        with self.lock:
+            if self.after_id == "scheduling":
+                self.after_id = after_id
+
+    def pending_count(self):
+        with self.lock:
+            return len(self.pending)
+
+    def pump(self):
+        with self.lock:
+            if self.stopped:
+                return
+            batch, self.pending = list(self.pending.values()), {}
+            self.after_id = None
+        for event_name, data in batch:
+            # One failing subscriber must not drop the rest of the batch
+            try:
+                self.bus._deliver(event_name, data)
+            except Exception as e:
+                print(f"[ERROR] {event_name} subscriber failed: {e!r}")
+
+    def stop(self):
+        with self.lock:
+            self.stopped = True
+            after_id, self.after_id = self.after_id, None
+        if after_id not in (None, "scheduling"):
+            try:
+                self.root.after_cancel(after_id)
+            except Exception:
+                pass  # root already destroyed
@@ -0,0 +1,112 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from database import db_helper
+from database.group_commit import GroupCommitWriter
+from database.money import Money, ZERO
+from database.velocity import VelocityLimitExceeded
+
+# SQLite allows one writer at a time, so a handful of threads is plenty;
+# more only adds lock contention
+DEFAULT_DB_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+
+
+class ServiceError(Exception):
+    def __init__(self, error, status=422):
+        super().__init__(error)
+        self.error = error
+        self.status = status
+
+
+class BankService:
+    """Headless, asyncio-friendly wrapper around db_helper.
+
+    Every call runs on a bounded thread pool so the event loop never
+    blocks on SQLite or bcrypt. With group_commit=True, postings go
+    through a GroupCommitWriter instead and share commits.
+    """
+
+    def __init__(self, max_workers=DEFAULT_DB_WORKERS, group_commit=False):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bank-db")
+        self.writer = GroupCommitWriter() if group_commit else None
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lambda: fn(*args, **kwargs))
+
+    async def _write(self, fn, *args, **kwargs):
+        if self.writer is None:
+            return await self._run(fn, *args, **kwargs)
+        return await asyncio.wrap_future(self.writer.submit(fn, *args, **kwargs))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.executor.shutdown(wait=True)
+
+    # ------------------------ Auth ------------------------
+
+    async def login(self, username, password):
+        user_id = await self._run(db_helper.authenticate_user, username, password)
+        if user_id is None:
+            raise ServiceError("invalid_credentials", status=401)
+        return {"user_id": user_id}
+
+    async def create_user(self, username, password):
+        if not username or not password:
+            raise ServiceError("missing_credentials", status=400)
+        if not await self._run(db_helper.create_user, username, password):
+            raise ServiceError("username_taken", status=409)
+        return {"user_id": await self._run(db_helper.get_user_id_by_username, username)}
+
+    # ------------------------ Accounts ------------------------
+
+    async def list_accounts(self, user_id):
+        return {"accounts": await self._run(db_helper.get_accounts, user_id)}
+
+    async def create_account(self, user_id, account_type):
+        if not account_type:
+            raise ServiceError("missing_account_type", status=400)
+        return {"account_id": await self._run(db_helper.create_account, user_id, account_type)}
+
+    async def balance(self, account_id):
+        balance = await self._run(db_helper.get_account_balance, account_id)
+        if balance is None:
+            raise ServiceError(db_helper.ACCOUNT_NOT_FOUND, status=404)
+        return {"account_id": account_id, "balance": balance}
+
+    async def history(self, account_id, before=None, limit=50):
+        rows = await self._run(db_helper.get_transaction_page, account_id, before=before, limit=limit)
+        next_cursor = [rows[-1]["timestamp"], rows[-1]["id"]] if rows and len(rows) == limit else None
+        return {"transactions": rows, "next": next_cursor}
+
+    # ------------------------ Postings ------------------------
+
+    async def _post(self, fn, *args, **kwargs):
+        try:
+            return await self._write(fn, *args, **kwargs)
+        except VelocityLimitExceeded:
+            raise ServiceError(db_helper.VELOCITY_LIMIT, status=429)
+
+    async def deposit(self, account_id, amount, note="Deposit"):
+        amount = Money.parse(amount)
+        if not await self._post(db_helper.deposit, account_id, amount, note=note):
+            if amount <= ZERO:
+                raise ServiceError(db_helper.INVALID_AMOUNT)
+            await self.balance(account_id)  # 404 when the account is missing
+            raise ServiceError(db_helper.BALANCE_LIMIT)
+        return await self.balance(account_id)
+
+    async def withdraw(self, account_id, amount, note="Withdrawal"):
+        amount = Money.parse(amount)
+        if not await self._post(db_helper.record_withdrawal, account_id, amount, note=note):
+            raise ServiceError(db_helper.INVALID_AMOUNT if amount <= ZERO else db_helper.INSUFFICIENT_FUNDS)
+        return await self.balance(account_id)
+
+    async def transfer(self, from_account, to_account, amount, note="Transfer", note_in=None):
+        result = await self._post(db_helper.transfer_funds, from_account, to_account, amount,
+                                  note=note, note_in=note_in)
+        if not result:
+            raise ServiceError(result.error)
+        return {"from_account": from_account, "to_account": to_account, "from_balance": result.from_balance}
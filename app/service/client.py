@@ -0,0 +1,206 @@
+"""Load client for the local JSON API.
+
+    python -m app.service.client --spawn             # own server + scratch DB
+    python -m app.service.client --port 8765 --op balance --account 1
+
+With --spawn it starts a server on a scratch database, seeds two
+accounts, runs the balance and transfer workloads and exits non-zero
+when either misses its THROUGHPUT_TARGETS entry.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from app.service.server import DEFAULT_HOST, DEFAULT_PORT
+
+# Requests/sec a single local server should sustain
+THROUGHPUT_TARGETS = {
+    "balance": 3000,
+    "transfer": 800,
+}
+
+
+class ApiConnection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    def send(self, method, path, body=None):
+        payload = json.dumps(body).encode() if body is not None else b""
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+        )
+
+    async def receive(self):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("server closed the connection")
+        status = int(status_line.split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        body = await self.reader.readexactly(length)
+        return status, json.loads(body)
+
+    async def request(self, method, path, body=None):
+        self.send(method, path, body)
+        await self.writer.drain()
+        return await self.receive()
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+def _percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_load(host, port, make_request, connections=8, pipeline=8, duration=5.0):
+    # Each connection keeps `pipeline` requests in flight at all times
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        conn = await ApiConnection.open(host, port)
+        sent_at = []
+        try:
+            while True:
+                now = time.perf_counter()
+                while len(sent_at) < pipeline and now < deadline:
+                    conn.send(*make_request())
+                    sent_at.append(now)
+                if not sent_at:
+                    break
+                await conn.writer.drain()
+                status, _ = await conn.receive()
+                latencies.append(time.perf_counter() - sent_at.pop(0))
+                if status != 200:
+                    errors += 1
+        finally:
+            await conn.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+    }
+
+
+async def seed(host, port):
+    conn = await ApiConnection.open(host, port)
+    try:
+        account_ids = []
+        for name in ("load_alice", "load_bob"):
+            status, body = await conn.request("POST", "/users", {"username": name, "password": "load-test"})
+            if status != 200:
+                raise RuntimeError(f"could not create {name}: {body}")
+            _, body = await conn.request("POST", f"/users/{body['user_id']}/accounts", {"type": "Checking"})
+            account_ids.append(body["account_id"])
+            await conn.request("POST", f"/accounts/{body['account_id']}/deposit", {"amount": 1_000_000})
+        return account_ids
+    finally:
+        await conn.close()
+
+
+def workload(op, accounts):
+    if op == "balance":
+        path = f"/accounts/{accounts[0]}/balance"
+        return lambda: ("GET", path, None)
+
+    flip = [False]
+
+    def transfer():
+        # Alternate direction so neither side ever runs dry
+        flip[0] = not flip[0]
+        source, target = (accounts[0], accounts[1]) if flip[0] else (accounts[1], accounts[0])
+        return ("POST", "/transfers", {"from_account": source, "to_account": target, "amount": 1})
+    return transfer
+
+
+def spawn_server(directory):
+    env = dict(os.environ, BANKING_BCRYPT_ROUNDS="4")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.service.server", "--port", "0", "--db", os.path.join(directory, "load.db")],
+        stdout=subprocess.PIPE, env=env, text=True,
+    )
+    for line in process.stdout:
+        if "Listening on" in line:
+            address = line.rsplit("//", 1)[1].strip()
+            host, port = address.rsplit(":", 1)
+            return process, host, int(port)
+    raise RuntimeError("server did not start")
+
+
+def print_result(op, result, target=None):
+    verdict = ""
+    if target is not None:
+        verdict = f"  target {target}/s: {'PASS' if result['rps'] >= target else 'FAIL'}"
+    print(f"{op:<10}{result['rps']:>10.0f} req/s  p50 {result['p50_ms']:.2f} ms  "
+          f"p99 {result['p99_ms']:.2f} ms  errors {result['errors']}{verdict}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load client for the local JSON API.")
+    parser.add_argument("--spawn", action="store_true", help="start a server on a scratch database")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--op", choices=("balance", "transfer"), default=None)
+    parser.add_argument("--account", type=int, action="append", help="account id(s) to use (two for transfers)")
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--pipeline", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    ops = [args.op] if args.op else list(THROUGHPUT_TARGETS)
+    failed = False
+
+    with tempfile.TemporaryDirectory() as directory:
+        process = None
+        host, port = args.host, args.port
+        if args.spawn:
+            process, host, port = spawn_server(directory)
+        try:
+            accounts = args.account or asyncio.run(seed(host, port))
+            for op in ops:
+                result = asyncio.run(run_load(host, port, workload(op, accounts),
+                                              args.connections, args.pipeline, args.duration))
+                target = THROUGHPUT_TARGETS.get(op) if args.spawn else None
+                print_result(op, result, target)
+                failed |= target is not None and result["rps"] < target
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+"""Local HTTP/JSON API over BankService.
+
+    python -m app.service.server [--port 8765] [--db banking.db]
+
+HTTP/1.1 with keep-alive. Requests pipelined on one connection are
+started as soon as they are read and answered in order. It binds to
+127.0.0.1 only and has no authentication: /login checks a password but
+issues no token, and every other route trusts its caller. It is a tool
+for scripts and load tests on this machine, not something to expose.
+"""
+import argparse
+import asyncio
+import json
+import re
+from urllib.parse import urlsplit, parse_qs
+
+from app.service.bank_service import BankService, ServiceError, DEFAULT_DB_WORKERS
+from database import metrics
+from database.money import Money
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Requests a single connection may have in flight before we stop reading
+MAX_PIPELINE_DEPTH = 64
+MAX_BODY_BYTES = 1024 * 1024
+# Largest page GET /accounts/<id>/transactions returns; bigger limits are clamped
+MAX_PAGE_SIZE = 500
+
+_REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+            405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+            422: "Unprocessable Entity", 429: "Too Many Requests", 500: "Internal Server Error"}
+
+
+class BadRequest(Exception):
+    pass
+
+
+class BankServer:
+    def __init__(self, service: BankService):
+        self.service = service
+        self.requests_served = 0
+        self.routes = [
+            ("POST", re.compile(r"^/login$"), self.login),
+            ("POST", re.compile(r"^/users$"), self.create_user),
+            ("GET", re.compile(r"^/users/(\d+)/accounts$"), self.list_accounts),
+            ("POST", re.compile(r"^/users/(\d+)/accounts$"), self.create_account),
+            ("GET", re.compile(r"^/accounts/(\d+)/balance$"), self.balance),
+            ("GET", re.compile(r"^/accounts/(\d+)/transactions$"), self.history),
+            ("POST", re.compile(r"^/accounts/(\d+)/deposit$"), self.deposit),
+            ("POST", re.compile(r"^/accounts/(\d+)/withdraw$"), self.withdraw),
+            ("POST", re.compile(r"^/transfers$"), self.transfer),
+            ("GET", re.compile(r"^/stats$"), self.stats),
+            ("GET", re.compile(r"^/metrics$"), self.metrics),
+        ]
+
+    # ------------------------ Handlers ------------------------
+
+    async def login(self, body, query):
+        return await self.service.login(_field(body, "username", str), _field(body, "password", str))
+
+    async def create_user(self, body, query):
+        return await self.service.create_user(_field(body, "username", str), _field(body, "password", str))
+
+    async def list_accounts(self, body, query, user_id):
+        return await self.service.list_accounts(int(user_id))
+
+    async def create_account(self, body, query, user_id):
+        return await self.service.create_account(int(user_id), _field(body, "type", str))
+
+    async def balance(self, body, query, account_id):
+        return await self.service.balance(int(account_id))
+
+    async def history(self, body, query, account_id):
+        before = None
+        if "before_timestamp" in query and "before_id" in query:
+            before = (query["before_timestamp"][0], int(query["before_id"][0]))
+        limit = int(query.get("limit", ["50"])[0])
+        if limit < 1:
+            raise BadRequest("'limit' must be at least 1")
+        limit = min(limit, MAX_PAGE_SIZE)
+        return await self.service.history(int(account_id), before=before, limit=limit)
+
+    async def deposit(self, body, query, account_id):
+        return await self.service.deposit(int(account_id), _amount(body), note=body.get("note") or "Deposit")
+
+    async def withdraw(self, body, query, account_id):
+        return await self.service.withdraw(int(account_id), _amount(body), note=body.get("note") or "Withdrawal")
+
+    async def transfer(self, body, query):
+        return await self.service.transfer(
+            _field(body, "from_account", int), _field(body, "to_account", int), _amount(body),
+            note=body.get("note") or "Transfer", note_in=body.get("note_in"))
+
+    async def stats(self, body, query):
+        return {"requests_served": self.requests_served}
+
+    async def metrics(self, body, query):
+        # Prometheus text by default, ?format=json for the full snapshot
+        if query.get("format", [""])[0] == "json":
+            return {"metrics": metrics.registry.snapshot()}
+        return metrics.registry.to_prometheus()
+
+    # ------------------------ HTTP ------------------------
+
+    async def dispatch(self, method, target, body):
+        parts = urlsplit(target)
+        query = parse_qs(parts.query)
+        path_matched = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(parts.path)
+            if not match:
+                continue
+            path_matched = True
+            if route_method == method:
+                return 200, await handler(body, query, *match.groups())
+        if path_matched:
+            return 405, {"ok": False, "error": "method_not_allowed"}
+        return 404, {"ok": False, "error": "not_found"}
+
+    async def respond(self, method, target, raw_body):
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+            if not isinstance(body, dict):
+                raise BadRequest("body must be a JSON object")
+            status, payload = await self.dispatch(method, target, body)
+            if status == 200 and isinstance(payload, dict):
+                payload = {"ok": True, **payload}
+        except (BadRequest, ValueError) as e:
+            status, payload = 400, {"ok": False, "error": "bad_request", "detail": str(e)}
+        except ServiceError as e:
+            status, payload = e.status, {"ok": False, "error": e.error}
+        except Exception as e:
+            status, payload = 500, {"ok": False, "error": "internal_error", "detail": str(e)}
+        self.requests_served += 1
+        return status, payload
+
+    async def handle_connection(self, reader, writer):
+        # Responses must go out in request order, so each request's task is
+        # queued here and a single writer drains them one by one
+        pending = asyncio.Queue(maxsize=MAX_PIPELINE_DEPTH)
+        writer_task = asyncio.create_task(self._write_responses(pending, writer))
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, raw_body = request
+                keep_alive = headers.get("connection", "keep-alive").lower() != "close"
+                task = asyncio.create_task(self.respond(method, target, raw_body))
+                await pending.put((task, keep_alive))
+                if not keep_alive:
+                    break
+        except BadRequest as e:
+            await pending.put((_completed(400, {"ok": False, "error": "bad_request", "detail": str(e)}), False))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            await pending.put(None)
+            await writer_task
+
+    async def _write_responses(self, pending, writer):
+        try:
+            while True:
+                item = await pending.get()
+                if item is None:
+                    break
+                task, keep_alive = item
+                status, payload = await task
+                writer.write(_encode_response(status, payload, keep_alive))
+                if pending.empty():
+                    await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def _field(body, name, kind):
+    value = body.get(name)
+    if kind is int and isinstance(value, bool):
+        value = None
+    if not isinstance(value, kind):
+        raise BadRequest(f"'{name}' is required")
+    return value
+
+
+def _amount(body):
+    # A JSON number or a decimal string such as "12.34"; ValueError -> 400
+    value = body.get("amount")
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise BadRequest("'amount' must be a number")
+    return Money.parse(value)
+
+
+def _json_default(value):
+    # Money goes out as an exact decimal string, "12.34", like the CLI's --json
+    if isinstance(value, Money):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _completed(status, payload):
+    future = asyncio.get_running_loop().create_future()
+    future.set_result((status, payload))
+    return future
+
+
+async def _read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, _version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise BadRequest("malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = headers.get("content-length", "0") or "0"
+    if not length.isdigit():
+        raise BadRequest("invalid Content-Length")
+    length = int(length)
+    if length > MAX_BODY_BYTES:
+        raise BadRequest("body too large")
+    raw_body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, raw_body
+
+
+def _encode_response(status, payload, keep_alive):
+    # A str payload is plain text (the Prometheus exposition format)
+    if isinstance(payload, str):
+        body = payload.encode()
+        content_type = "text/plain; version=0.0.4"
+    else:
+        body = json.dumps(payload, separators=(",", ":"), default=_json_default).encode()
+        content_type = "application/json"
+    head = (
+        f"HTTP/1.1 {status} {_REASONS.get(status, 'Unknown')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    return head.encode() + body
+
+
+async def serve(port=DEFAULT_PORT, workers=DEFAULT_DB_WORKERS, ready=None, group_commit=False):
+    # Always localhost: there is no authentication to protect anything else
+    service = BankService(max_workers=workers, group_commit=group_commit)
+    server = BankServer(service)
+    tcp_server = await asyncio.start_server(server.handle_connection, DEFAULT_HOST, port)
+    if ready is not None:
+        ready(tcp_server.sockets[0].getsockname())
+    try:
+        async with tcp_server:
+            await tcp_server.serve_forever()
+    finally:
+        service.close()
+
+
+def main():
+    from database.database import initialize_database, set_database_path, startup_notices
+
+    parser = argparse.ArgumentParser(description="Local JSON API for the banking database.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--db", default=None, help="database file (default: banking.db)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_DB_WORKERS)
+    parser.add_argument("--group-commit", action="store_true", help="commit concurrent postings together")
+    args = parser.parse_args()
+
+    if args.db:
+        set_database_path(args.db)
+    for notice in startup_notices(initialize_database()):
+        print(notice)
+
+    def ready(address):
+        print(f"[INFO] Listening on http://{address[0]}:{address[1]}", flush=True)
+
+    try:
+        asyncio.run(serve(args.port, args.workers, ready=ready, group_commit=args.group_commit))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import tkinter as tk
+
+
+def account_label(acc):
+    return f"{acc['type'].capitalize()} - ${acc['balance']:.2f} (#{acc['account_id']})"
+
+
+def diff_accounts(old, new):
+    # old/new map account_id -> account dict; returns the ids that were
+    # added, whose type or balance changed, and that disappeared
+    added = [acc_id for acc_id in new if acc_id not in old]
+    removed = [acc_id for acc_id in old if acc_id not in new]
+    changed = [
+        acc_id for acc_id, acc in new.items()
+        if acc_id in old and (acc["type"], acc["balance"]) != (old[acc_id]["type"], old[acc_id]["balance"])
+    ]
+    return added, changed, removed
+
+
+class AccountMenu:
+    """An OptionMenu over accounts that is kept up to date entry by entry."""
+
+    def __init__(self, parent, accounts, on_select=None):
+        self.var = tk.StringVar()
+        self.widget = tk.OptionMenu(parent, self.var, "")
+        self.menu = self.widget["menu"]
+        self.menu.delete(0, "end")
+        self.on_select = on_select
+        self.order = []
+        self.selected_id = None
+
+        for acc in accounts:
+            self._append(acc)
+        if accounts:
+            self.select(accounts[0]["account_id"], notify=False)
+
+    def pack(self, **kwargs):
+        self.widget.pack(**kwargs)
+
+    def _append(self, acc):
+        acc_id = acc["account_id"]
+        self.menu.add_command(label=account_label(acc), command=lambda: self.select(acc_id))
+        self.order.append(acc_id)
+
+    def select(self, account_id, notify=True):
+        self.selected_id = account_id
+        self.var.set(self.menu.entrycget(self.order.index(account_id), "label"))
+        if notify and self.on_select:
+            self.on_select(account_id)
+
+    def apply(self, accounts, added, changed, removed):
+        for acc_id in removed:
+            index = self.order.index(acc_id)
+            self.menu.delete(index)
+            del self.order[index]
+        for acc_id in changed:
+            self.menu.entryconfigure(self.order.index(acc_id), label=account_label(accounts[acc_id]))
+        for acc_id in added:
+            self._append(accounts[acc_id])
+
+        if self.selected_id not in accounts:
+            self.selected_id = None
+            if self.order:
+                self.select(self.order[0])
+            else:
+                self.var.set("")
+        elif self.selected_id in changed:
+            self.select(self.selected_id, notify=False)
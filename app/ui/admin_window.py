@@ -2,11 +2,21 @@ import tkinter as tk
 from tkinter import messagebox, ttk
 from database.db_helper import (
     delete_all_users,
-    get_all_users,
-    get_accounts,
-    get_transaction_history,
+    get_dashboard_snapshot,
+    search_users,
     delete_user_by_id
 )
+from database import metrics
+from app.ui.paged_treeview import PagedTreeview, transaction_history_view, transaction_values
+from app.ui import profiler
+
+# Transactions shown per account in the accounts popup
+RECENT_TRANSACTIONS = 5
+
+# Wait this long after the last keystroke before searching
+SEARCH_DELAY_MS = 150
+
+USER_COLUMNS = (("Username", 220), ("ID", 70), ("Accounts", 80), ("Total Balance", 140))
 
 
 def open_admin_window():
@@ -35,74 +45,109 @@ class AdminWindow:
 
     def build_users_tab(self):
         tk.Label(self.users_tab, text="Users", font=("Arial", 14)).pack(pady=10)
-        self.user_list_frame = tk.Frame(self.users_tab)
-        self.user_list_frame.pack(fill=tk.BOTH, expand=True)
 
-        self.refresh_user_list()
+        search_row = tk.Frame(self.users_tab)
+        search_row.pack(fill=tk.X, padx=20)
+        tk.Label(search_row, text="Search").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        search_entry = tk.Entry(search_row, textvariable=self.search_var)
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.substring_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(search_row, text="Anywhere in name", variable=self.substring_var,
+                       command=self.refresh_user_list).pack(side=tk.LEFT)
+
+        # Only the pages scrolled into view are ever queried or drawn
+        self.directory = PagedTreeview(
+            self.users_tab,
+            USER_COLUMNS,
+            fetch_page=self.fetch_users,
+            cursor_of=lambda user: (user["username"], user["id"]),
+            values_of=lambda user: (user["username"], user["id"], user["accounts"], f"${user['total_balance']:,.2f}"),
+            empty_text="No users found.",
+        )
+        self.directory.pack(fill=tk.BOTH, expand=True, padx=20, pady=5)
+        view_user = metrics.tracked("admin.view_user", self.view_selected_user)
+        self.directory.tree.bind("<Double-1>", lambda event: view_user())
+
+        tk.Button(self.users_tab, text="View Accounts", command=view_user).pack(pady=5)
+
+        self.pending_search = None
+        self.search_var.trace_add("write", lambda *args: self.schedule_search())
+        search_entry.focus_set()
+
+    def fetch_users(self, cursor, limit):
+        return search_users(self.search_var.get(), after=cursor, limit=limit, substring=self.substring_var.get())
+
+    def schedule_search(self):
+        # Type-ahead: restart the timer on every keystroke, query once typing pauses
+        if self.pending_search is not None:
+            self.window.after_cancel(self.pending_search)
+        self.pending_search = self.window.after(SEARCH_DELAY_MS, self.refresh_user_list)
 
     def refresh_user_list(self):
-        for widget in self.user_list_frame.winfo_children():
-            widget.destroy()
-
-        users = get_all_users()
-        if not users:
-            tk.Label(self.user_list_frame, text="No users found.").pack(pady=10)
+        self.pending_search = None
+        with metrics.action("admin.search_users"):
+            self.directory.reload()
+
+    def view_selected_user(self):
+        selection = self.directory.tree.selection()
+        if not selection:
+            messagebox.showinfo("View Accounts", "Select a user first.")
             return
+        user_id = int(self.directory.tree.item(selection[0], "values")[1])
+        snapshot = get_dashboard_snapshot([user_id], recent_n=RECENT_TRANSACTIONS)
+        if not snapshot:
+            messagebox.showerror("Error", "That user no longer exists.")
+            self.refresh_user_list()
+            return
+        self.view_user_accounts(snapshot[0])
 
-        for user in users:
-            frame = tk.Frame(self.user_list_frame, pady=3)
-            frame.pack(fill=tk.X, padx=20)
-
-            label = tk.Label(frame, text=f"{user['username']} (ID: {user['id']})", anchor="w")
-            label.pack(side=tk.LEFT)
-
-            view_button = tk.Button(frame, text="View Accounts",
-                                    command=lambda uid=user['id'], uname=user['username']: self.view_user_accounts(uid, uname))
-            view_button.pack(side=tk.RIGHT)
+    def view_user_accounts(self, user):
+        with profiler.frame("admin.build.accounts_popup"):
+            self._view_user_accounts(user)
 
-    def view_user_accounts(self, user_id, username):
+    def _view_user_accounts(self, user):
+        user_id, username = user["id"], user["username"]
         popup = tk.Toplevel(self.window)
         popup.title(f"{username}'s Accounts")
-        popup.geometry("400x400")
+        popup.geometry("520x500")
 
         tk.Label(popup, text=f"Accounts for {username}", font=("Arial", 12)).pack(pady=10)
 
-        accounts = get_accounts(user_id)
-        if not accounts:
+        if not user["accounts"]:
             tk.Label(popup, text="No accounts found.").pack(pady=5)
         else:
-            for acc in accounts:
+            for acc in user["accounts"]:
                 frame = tk.Frame(popup)
                 frame.pack(fill=tk.X, padx=20, pady=3)
 
                 label = tk.Label(frame, text=f"{acc['type'].capitalize()} - ${acc['balance']:.2f}")
                 label.pack(side=tk.LEFT)
 
-                view_tx = tk.Button(frame, text="Transactions", command=lambda aid=acc['account_id']: self.view_account_transactions(aid))
+                view_tx = tk.Button(frame, text="All Transactions", command=lambda aid=acc['account_id']: self.view_account_transactions(aid))
                 view_tx.pack(side=tk.RIGHT)
 
+                if not acc["recent"]:
+                    tk.Label(popup, text="No transactions yet.", fg="gray").pack(anchor="w", padx=40)
+                for tx in acc["recent"]:
+                    timestamp, tx_type, amount, details = transaction_values(tx)
+                    tk.Label(popup, text=f"{timestamp}  {tx_type}  {amount}  {details}", fg="gray",
+                             anchor="w").pack(anchor="w", padx=40)
+
         del_button = tk.Button(popup, text=f"Delete {username}", fg="red",
                                command=lambda: self.confirm_delete_user(user_id, username, popup))
         del_button.pack(pady=20)
 
     def view_account_transactions(self, account_id):
+        with metrics.action("admin.account_transactions"), profiler.frame("admin.build.transactions_popup"):
+            self._view_account_transactions(account_id)
+
+    def _view_account_transactions(self, account_id):
         tx_popup = tk.Toplevel(self.window)
         tx_popup.title("Transaction History")
-        tx_popup.geometry("400x300")
-
-        transactions = get_transaction_history(account_id)
-
-        if not transactions:
-            tk.Label(tx_popup, text="No transactions found.").pack(pady=10)
-            return
+        tx_popup.geometry("560x300")
 
-        for tx in transactions:
-            text = f"[{tx['timestamp']}] {tx['type']} ${tx['amount']:.2f}"
-            if tx['note']:
-                text += f" - {tx['note']}"
-            if tx['related_account_id']:
-                text += f" (to/from Acc #{tx['related_account_id']})"
-            tk.Label(tx_popup, text=text, anchor="w", justify="left").pack(anchor="w", padx=10, pady=2)
+        transaction_history_view(tx_popup, account_id).pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
     def confirm_delete_user(self, user_id, username, popup):
         if messagebox.askyesno("Confirm", f"Delete user '{username}'?\nTransactions will be preserved."):
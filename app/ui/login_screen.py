@@ -1,6 +1,6 @@
 import tkinter as tk
 from tkinter import messagebox
-from database.db_helper import create_user, authenticate_user
+from app.auth_executor import authenticate_user_async, create_user_async, deliver_on_tk
 from app.ui.user_window import open_user_window
 from app.ui.admin_window import open_admin_window
 
@@ -19,8 +19,10 @@ class LoginScreen:
         tk.Label(root, text="Password").pack(pady=5)
         tk.Entry(root, show="*", textvariable=self.password_var).pack()
 
-        tk.Button(root, text="Login", command=self.login).pack(pady=5)
-        tk.Button(root, text="Create Account", command=self.create_account).pack()
+        self.login_button = tk.Button(root, text="Login", command=self.login)
+        self.login_button.pack(pady=5)
+        self.create_button = tk.Button(root, text="Create Account", command=self.create_account)
+        self.create_button.pack()
 
         # Admin Login Section
         tk.Label(root, text="--- Admin Login ---").pack(pady=10)
@@ -28,12 +30,26 @@ class LoginScreen:
         tk.Entry(root, show="*", textvariable=self.admin_pass_var).pack()
         tk.Button(root, text="Admin Login", command=self.admin_login).pack(pady=5)
 
+    def set_busy(self, busy):
+        state = tk.DISABLED if busy else tk.NORMAL
+        self.login_button.config(state=state)
+        self.create_button.config(state=state)
+        self.root.config(cursor="watch" if busy else "")
+
     def login(self):
         username = self.username_var.get().strip()
         password = self.password_var.get().strip()
 
-        user_id = authenticate_user(username, password)
-        if user_id:
+        # bcrypt takes a few hundred ms, keep it off the event loop
+        self.set_busy(True)
+        future = authenticate_user_async(username, password)
+        deliver_on_tk(self.root, future, lambda user_id, error: self.on_login_done(username, user_id, error))
+
+    def on_login_done(self, username, user_id, error):
+        self.set_busy(False)
+        if error:
+            messagebox.showerror("Login Failed", f"Could not log in: {error}")
+        elif user_id:
             messagebox.showinfo("Login Success", f"Welcome, {username}!")
             open_user_window(username, user_id)
         else:
@@ -47,7 +63,15 @@ class LoginScreen:
             messagebox.showerror("Error", "Username and password cannot be empty.")
             return
 
-        if create_user(username, password):
+        self.set_busy(True)
+        future = create_user_async(username, password)
+        deliver_on_tk(self.root, future, self.on_create_done)
+
+    def on_create_done(self, created, error):
+        self.set_busy(False)
+        if error:
+            messagebox.showerror("Error", f"Could not create account: {error}")
+        elif created:
             messagebox.showinfo("Success", "Account created. You may now log in.")
         else:
             messagebox.showerror("Error", "Username already exists.")
@@ -0,0 +1,97 @@
+import tkinter as tk
+from tkinter import ttk
+from database.db_helper import get_transaction_page
+
+
+class PagedTreeview(tk.Frame):
+    """A ttk.Treeview that pulls rows in pages as the user scrolls.
+
+    fetch_page(cursor, limit) returns the next list of rows after `cursor`
+    (None for the first page), cursor_of(row) gives the cursor to continue
+    after that row and values_of(row) the tuple shown in the columns.
+    """
+
+    # Fetch the next page once the view is scrolled past this fraction
+    PREFETCH_AT = 0.85
+
+    def __init__(self, parent, columns, fetch_page, cursor_of, values_of,
+                 page_size=100, empty_text="No rows found.", height=12):
+        super().__init__(parent)
+        self.fetch_page = fetch_page
+        self.cursor_of = cursor_of
+        self.values_of = values_of
+        self.page_size = page_size
+
+        self.tree = ttk.Treeview(self, columns=[name for name, _ in columns], show="headings", height=height)
+        for name, width in columns:
+            self.tree.heading(name, text=name)
+            self.tree.column(name, width=width, anchor="w", stretch=True)
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.on_scroll)
+
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.empty_label = tk.Label(self.tree, text=empty_text)
+        self.reload()
+
+    def reload(self):
+        self.tree.delete(*self.tree.get_children())
+        self.cursor = None
+        self.exhausted = False
+        self.loading = False
+        self.load_next_page()
+        if self.tree.get_children():
+            self.empty_label.place_forget()
+        else:
+            self.empty_label.place(relx=0.5, rely=0.3, anchor="center")
+
+    def load_next_page(self):
+        if self.exhausted or self.loading:
+            return
+        self.loading = True
+        try:
+            rows = self.fetch_page(self.cursor, self.page_size)
+            for row in rows:
+                self.tree.insert("", tk.END, values=self.values_of(row))
+            if rows:
+                self.cursor = self.cursor_of(rows[-1])
+            if len(rows) < self.page_size:
+                self.exhausted = True
+        finally:
+            self.loading = False
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if float(last) >= self.PREFETCH_AT and not self.exhausted:
+            # Let Tk finish the current scroll before adding rows
+            self.after_idle(self.load_next_page)
+
+
+# ------------------------ Transaction History ------------------------
+
+TRANSACTION_COLUMNS = (("Date", 140), ("Type", 90), ("Amount", 80), ("Details", 220))
+
+
+def transaction_values(tx):
+    details = tx["note"] or ""
+    if tx["related_account_id"]:
+        details += f" (to/from Acc #{tx['related_account_id']})"
+    return (tx["timestamp"], tx["type"], f"${tx['amount']:.2f}", details)
+
+
+def transaction_cursor(tx):
+    return (tx["timestamp"], tx["id"])
+
+
+def transaction_history_view(parent, account_id, page_size=100):
+    return PagedTreeview(
+        parent,
+        TRANSACTION_COLUMNS,
+        fetch_page=lambda cursor, limit: get_transaction_page(account_id, before=cursor, limit=limit),
+        cursor_of=transaction_cursor,
+        values_of=transaction_values,
+        page_size=page_size,
+        empty_text="No transactions found.",
+    )
@@ -0,0 +1,333 @@
+"""Event-loop profiler for the Tk UI.
+
+    BANKING_UI_PROFILE=1 python main.py
+
+install() routes every Tk callback (button commands, bindings, after and
+after_idle jobs) through a timer, and frame(name) times any block, such
+as a view build. Each frame's time is split into:
+
+- db: time spent in db_helper (database.metrics, which install() turns on)
+- modal: time a dialog (messagebox and the like) sat waiting for the user
+- widgets: everything else, building and updating widgets in Python and Tk
+
+along with the number of widgets it created and destroyed. A watchdog
+after() tick notices when the event loop was held up past stall_ms and
+blames the longest frame since the previous tick. report() has per-name
+totals, the worst frames and the stalls; print_report(), dump() and
+show_overlay() present it.
+"""
+import atexit
+import heapq
+import itertools
+import json
+import os
+import time
+import tkinter as tk
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from tkinter import commondialog
+
+from database import metrics
+
+# Watchdog tick period, and how late a tick must be to count as a stall
+TICK_MS = 50
+STALL_MS = 100
+
+# Worst frames and stalls kept for the report
+WORST_FRAMES = 20
+STALLS_KEPT = 100
+
+# The installed profiler, if any; see frame()
+_active = None
+
+
+class _Frame:
+    __slots__ = ("name", "started", "db", "created", "destroyed",
+                 "modal", "modal_db", "modal_created", "modal_destroyed")
+
+    def __init__(self, name, started, db, created, destroyed):
+        self.name = name
+        self.started = started
+        self.db = db
+        self.created = created
+        self.destroyed = destroyed
+        self.modal = self.modal_db = 0.0
+        self.modal_created = self.modal_destroyed = 0
+
+
+class UIProfiler:
+    def __init__(self, root, tick_ms=TICK_MS, stall_ms=STALL_MS, log_ms=None):
+        self.root = root
+        self.tick_ms = tick_ms
+        self.stall_ms = stall_ms
+        self.log_ms = log_ms    # print frames at least this slow; None logs nothing
+        self.installed = False
+        self.enabled_metrics = False
+        self.originals = []
+        self.after_id = None
+        self.overlay = None
+        self.reset()
+
+    def reset(self):
+        self.stack = []         # open frames, innermost last
+        self.by_name = {}       # frame name -> totals
+        self.worst = []         # min-heap of (ms, sequence, frame entry)
+        self.sequence = itertools.count()
+        self.stalls = deque(maxlen=STALLS_KEPT)
+        self.created = self.destroyed = 0
+        self.slowest_since_tick = None
+        self.due = None
+        self.ticks = 0
+
+    # ------------------------ Hooks ------------------------
+
+    def install(self):
+        global _active
+        if self.installed:
+            return
+        profiler = self
+        call_wrapper = tk.CallWrapper.__call__
+        setup = tk.BaseWidget._setup
+        destroy = tk.BaseWidget.destroy
+        show = commondialog.Dialog.show
+
+        def profiled_call(wrapper, *args):
+            func = _unwrap(wrapper.func)
+            # The watchdog and the overlay don't profile themselves
+            if getattr(func, "__self__", None) is profiler:
+                return call_wrapper(wrapper, *args)
+            with profiler.frame(_callback_name(func)):
+                return call_wrapper(wrapper, *args)
+
+        def counted_setup(widget, master, cnf):
+            profiler.created += 1
+            return setup(widget, master, cnf)
+
+        def counted_destroy(widget):
+            # Called once per widget, children included
+            profiler.destroyed += 1
+            return destroy(widget)
+
+        def timed_show(dialog, **options):
+            return profiler._modal(show, dialog, options)
+
+        self.originals = [(tk.CallWrapper, "__call__", call_wrapper), (tk.BaseWidget, "_setup", setup),
+                          (tk.BaseWidget, "destroy", destroy), (commondialog.Dialog, "show", show)]
+        tk.CallWrapper.__call__ = profiled_call
+        tk.BaseWidget._setup = counted_setup
+        tk.BaseWidget.destroy = counted_destroy
+        commondialog.Dialog.show = timed_show
+
+        if not metrics.registry.enabled:
+            metrics.registry.enable()
+            self.enabled_metrics = True
+        self.installed = True
+        _active = self
+        self.due = time.perf_counter() + self.tick_ms / 1000
+        self.after_id = self.root.after(self.tick_ms, self._tick)
+
+    def uninstall(self):
+        global _active
+        if not self.installed:
+            return
+        for owner, name, original in self.originals:
+            setattr(owner, name, original)
+        self.originals = []
+        if self.enabled_metrics:
+            metrics.registry.disable()
+            self.enabled_metrics = False
+        if self.after_id is not None:
+            try:
+                self.root.after_cancel(self.after_id)
+            except tk.TclError:
+                pass  # root already destroyed
+            self.after_id = None
+        self.installed = False
+        if _active is self:
+            _active = None
+
+    # ------------------------ Frames ------------------------
+
+    @contextmanager
+    def frame(self, name):
+        frame = _Frame(name, time.perf_counter(), metrics.registry.db_seconds(), self.created, self.destroyed)
+        self.stack.append(frame)
+        try:
+            yield
+        finally:
+            self.stack.pop()
+            self._record(frame)
+
+    def _modal(self, show, dialog, options):
+        # A dialog runs its own event loop until the user answers: callbacks
+        # in there are frames of their own, and the wait isn't the caller's
+        started = time.perf_counter()
+        db, created, destroyed = metrics.registry.db_seconds(), self.created, self.destroyed
+        outer, self.stack = self.stack, []
+        try:
+            return show(dialog, **options)
+        finally:
+            self.stack = outer
+            waited = time.perf_counter() - started
+            for frame in outer:
+                frame.modal += waited
+                frame.modal_db += metrics.registry.db_seconds() - db
+                frame.modal_created += self.created - created
+                frame.modal_destroyed += self.destroyed - destroyed
+            # The wait may have held up the watchdog too; don't call it a stall
+            self.due = None
+
+    def _record(self, frame):
+        total = time.perf_counter() - frame.started - frame.modal
+        db = metrics.registry.db_seconds() - frame.db - frame.modal_db
+        entry = {
+            "name": frame.name,
+            "ms": round(total * 1000, 3),
+            "db_ms": round(db * 1000, 3),
+            "widget_ms": round(max(total - db, 0.0) * 1000, 3),
+            "modal_ms": round(frame.modal * 1000, 3),
+            "created": self.created - frame.created - frame.modal_created,
+            "destroyed": self.destroyed - frame.destroyed - frame.modal_destroyed,
+        }
+
+        totals = self.by_name.get(frame.name)
+        if totals is None:
+            totals = self.by_name[frame.name] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "db_ms": 0.0,
+                                                 "widget_ms": 0.0, "created": 0, "destroyed": 0}
+        totals["count"] += 1
+        totals["total_ms"] += entry["ms"]
+        totals["max_ms"] = max(totals["max_ms"], entry["ms"])
+        for key in ("db_ms", "widget_ms", "created", "destroyed"):
+            totals[key] += entry[key]
+
+        # A nested frame is already part of the one around it
+        if self.stack:
+            return
+        entry["at"] = time.time()
+        item = (entry["ms"], next(self.sequence), entry)
+        if len(self.worst) < WORST_FRAMES:
+            heapq.heappush(self.worst, item)
+        else:
+            heapq.heappushpop(self.worst, item)
+        if self.slowest_since_tick is None or entry["ms"] > self.slowest_since_tick["ms"]:
+            self.slowest_since_tick = entry
+        if self.log_ms is not None and entry["ms"] >= self.log_ms:
+            print(f"[WARN] UI frame {entry['ms']:.0f} ms in {frame.name} (db {entry['db_ms']:.0f} ms, "
+                  f"widgets {entry['widget_ms']:.0f} ms, +{entry['created']}/-{entry['destroyed']} widgets)")
+
+    def _tick(self):
+        now = time.perf_counter()
+        if self.due is not None:
+            late_ms = (now - self.due) * 1000
+            if late_ms >= self.stall_ms:
+                culprit = self.slowest_since_tick["name"] if self.slowest_since_tick else None
+                self.stalls.append({"late_ms": round(late_ms, 1), "frame": culprit, "at": time.time()})
+                if self.log_ms is not None:
+                    print(f"[WARN] Event loop stalled {late_ms:.0f} ms (longest callback: {culprit or 'unknown'})")
+        self.ticks += 1
+        self.slowest_since_tick = None
+        self.due = now + self.tick_ms / 1000
+        self.after_id = self.root.after(self.tick_ms, self._tick)
+
+    # ------------------------ Output ------------------------
+
+    def report(self, worst=10):
+        frames = {
+            name: {key: round(value, 3) if isinstance(value, float) else value for key, value in totals.items()}
+            for name, totals in sorted(self.by_name.items(), key=lambda item: -item[1]["total_ms"])
+        }
+        for totals in frames.values():
+            totals["mean_ms"] = round(totals["total_ms"] / totals["count"], 3)
+        return {
+            "ticks": self.ticks,
+            "stall_ms": self.stall_ms,
+            "stalls": list(self.stalls),
+            "frames": frames,
+            "worst": [entry for _, _, entry in sorted(self.worst, reverse=True)[:worst]],
+        }
+
+    def print_report(self, worst=10):
+        report = self.report(worst)
+        print(f"{'frame':<48}{'count':>7}{'mean ms':>10}{'max ms':>10}{'db ms':>10}{'widget ms':>11}"
+              f"{'+wid':>7}{'-wid':>7}")
+        for name, totals in report["frames"].items():
+            print(f"{name[:47]:<48}{totals['count']:>7}{totals['mean_ms']:>10.1f}{totals['max_ms']:>10.1f}"
+                  f"{totals['db_ms']:>10.1f}{totals['widget_ms']:>11.1f}{totals['created']:>7}{totals['destroyed']:>7}")
+        print(f"Worst frames (of {sum(t['count'] for t in report['frames'].values())}):")
+        for entry in report["worst"]:
+            print(f"  {entry['ms']:>9.1f} ms  {entry['name']}  (db {entry['db_ms']:.1f}, "
+                  f"widgets {entry['widget_ms']:.1f}, +{entry['created']}/-{entry['destroyed']})")
+        print(f"Stalls over {report['stall_ms']} ms: {len(report['stalls'])} in {report['ticks']} ticks")
+
+    def dump(self, path, worst=WORST_FRAMES):
+        with open(path, "w") as f:
+            json.dump(self.report(worst), f, indent=2)
+
+    def show_overlay(self, refresh_ms=1000, worst=8):
+        # A small always-on-top window listing the worst frames so far
+        if self.overlay is not None:
+            return
+        self.overlay = tk.Toplevel(self.root)
+        self.overlay.title("UI Profiler")
+        self.overlay.attributes("-topmost", True)
+        self.overlay.protocol("WM_DELETE_WINDOW", self._close_overlay)
+        text = tk.Text(self.overlay, width=72, height=worst + 2, font=("Courier", 9))
+        text.pack(fill=tk.BOTH, expand=True)
+        self._refresh_overlay(text, refresh_ms, worst)
+
+    def _refresh_overlay(self, text, refresh_ms, worst):
+        if self.overlay is None:
+            return
+        report = self.report(worst)
+        lines = [f"stalls: {len(report['stalls'])}   frames: {sum(t['count'] for t in report['frames'].values())}"]
+        lines += [f"{e['ms']:>8.1f} ms  db {e['db_ms']:>7.1f}  {e['name'][:40]}" for e in report["worst"]]
+        text.delete("1.0", tk.END)
+        text.insert(tk.END, "\n".join(lines))
+        self.overlay.after(refresh_ms, self._refresh_overlay, text, refresh_ms, worst)
+
+    def _close_overlay(self):
+        overlay, self.overlay = self.overlay, None
+        overlay.destroy()
+
+
+def _unwrap(func):
+    # after() registers a local callit() around the real callback
+    if getattr(func, "__qualname__", "").endswith("after.<locals>.callit") and func.__closure__:
+        cells = dict(zip(func.__code__.co_freevars, func.__closure__))
+        if "func" in cells:
+            return cells["func"].cell_contents
+    return func
+
+
+def _callback_name(func):
+    name = getattr(func, "__qualname__", None) or type(func).__name__
+    return name.replace(".<locals>", "")
+
+
+def frame(name):
+    # Times a block as a frame of its own while a profiler is installed
+    return _active.frame(name) if _active is not None else nullcontext()
+
+
+def configure_from_environment(root):
+    """Install a profiler on `root` if BANKING_UI_PROFILE is set.
+
+    BANKING_UI_PROFILE_LOG_MS logs frames at least that slow (default
+    STALL_MS), BANKING_UI_PROFILE_FILE gets the report as JSON at exit
+    (otherwise it is printed), BANKING_UI_PROFILE_OVERLAY=1 shows the
+    overlay. Returns the profiler, or None.
+    """
+    if os.environ.get("BANKING_UI_PROFILE", "") in ("", "0"):
+        return None
+    log_ms = float(os.environ.get("BANKING_UI_PROFILE_LOG_MS", STALL_MS))
+    profiler = UIProfiler(root, log_ms=log_ms)
+    profiler.install()
+    path = os.environ.get("BANKING_UI_PROFILE_FILE")
+    if path:
+        atexit.register(profiler.dump, path)
+    else:
+        atexit.register(profiler.print_report)
+    if os.environ.get("BANKING_UI_PROFILE_OVERLAY", "") not in ("", "0"):
+        profiler.show_overlay()
+    print(f"[INFO] UI profiler on (stalls over {profiler.stall_ms} ms, logging frames over {log_ms:g} ms)")
+    return profiler
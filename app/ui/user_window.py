@@ -1,15 +1,21 @@
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import messagebox, ttk
 from database.db_helper import (
     get_accounts,
-    get_transaction_history,
     create_account,
     deposit,
-    get_account_balance,
     record_withdrawal,
-    get_user_accounts_by_username
+    get_user_accounts_by_username,
+    transfer_funds,
+    INSUFFICIENT_FUNDS
 )
+from database import metrics
+from database.money import Money, ZERO
+from database.velocity import VelocityLimitExceeded
 from app.event_bus import EventBus
+from app.ui.paged_treeview import transaction_history_view
+from app.ui.account_views import AccountMenu, diff_accounts
+from app.ui import profiler
 
 
 class UserWindow:
@@ -36,72 +42,113 @@ class UserWindow:
         tk.Button(self.nav_frame, text="Transfer", command=self.show_transfer).pack(side=tk.LEFT)
         tk.Button(self.nav_frame, text="Transactions", command=self.show_transactions_tab).pack(side=tk.LEFT)
 
-        self.transaction_account_var = tk.StringVar()  # used by transaction tab
-        self.transaction_account_map = {}
+        self.accounts = {}      # account_id -> account, as of the last get_accounts
+        self.views = {}         # view name -> frame, built the first time it is shown
+        self.view_updaters = [] # called with (added, changed, removed) account ids
+        self.current_view = None
 
+        self.load_accounts()
         self.show_accounts()
 
-    def clear_content(self):
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
-
     def cleanup(self):
-        from app.event_bus import EventBus
         EventBus.unsubscribe("account_updated", self.on_account_update)
+        EventBus.unsubscribe("user_deleted", self.on_user_deleted)
         self.window.destroy()
 
     def on_account_update(self, updated_user_id):
         if updated_user_id != self.user_id:
             return
-
-        print(f"[DEBUG] Refresh triggered for {self.username}")
-
-        # Refresh if transactions tab is active and has been initialized
-        if hasattr(self, "transaction_list_frame") and self.current_view == "transactions":
-            current_account = self.transaction_account_var.get()
-            self.refresh_transaction_list(current_account)
-
-        # Refresh account view if active
-        if hasattr(self, "current_view") and self.current_view == "accounts":
-            self.show_accounts()
-
-        if self.current_view == "accounts":
-            self.window.after(100, self.show_accounts)
-        elif self.current_view == "transactions":
-            self.window.after(100, self.show_transactions_tab)
-        elif self.current_view == "deposit":
-            self.window.after(100, self.show_deposit)
-        elif self.current_view == "transfer":
-            self.window.after(100, self.show_transfer)
+        with metrics.action("user.refresh_accounts"):
+            self.refresh_accounts()
 
     def on_user_deleted(self, deleted_user_id):
         if deleted_user_id == self.user_id:
             messagebox.showwarning("Logged Out", "Your account has been deleted by an admin.")
             self.cleanup()
 
+    # -------------------- Shared State --------------------
+    def load_accounts(self):
+        accounts = {acc["account_id"]: acc for acc in get_accounts(self.user_id)}
+        changes = diff_accounts(self.accounts, accounts)
+        self.accounts = accounts
+        return changes
+
+    def refresh_accounts(self):
+        # One query, then every built view patches only the rows that changed
+        added, changed, removed = self.load_accounts()
+        if not (added or changed or removed):
+            return
+        for update in self.view_updaters:
+            update(added, changed, removed)
+
+    def account_list(self):
+        return list(self.accounts.values())
+
+    def show_view(self, name, build):
+        if self.current_view == name:
+            return
+        with metrics.action(f"user.view.{name}"):
+            self._show_view(name, build)
+
+    def _show_view(self, name, build):
+        if self.current_view is not None:
+            self.views[self.current_view].pack_forget()
+        if name not in self.views:
+            frame = tk.Frame(self.content_frame)
+            with profiler.frame(f"user.build.{name}"):
+                build(frame)
+            self.views[name] = frame
+        self.views[name].pack(fill=tk.BOTH, expand=True)
+        self.current_view = name
+
+    @staticmethod
+    def toggle(placeholder, form, show_form):
+        if show_form:
+            placeholder.pack_forget()
+            form.pack(fill=tk.BOTH, expand=True)
+        else:
+            form.pack_forget()
+            placeholder.pack(pady=10)
 
     # -------------------- View Accounts --------------------
     def show_accounts(self):
-        self.clear_content()
-        self.current_view = "accounts"
-        accounts = get_accounts(self.user_id)
+        self.show_view("accounts", self.build_accounts_view)
 
-        tk.Label(self.content_frame, text="Your Accounts:", font=("Arial", 14)).pack(pady=10)
+    def build_accounts_view(self, parent):
+        tk.Label(parent, text="Your Accounts:", font=("Arial", 14)).pack(pady=10)
 
-        if not accounts:
-            tk.Label(self.content_frame, text="No accounts found.").pack(pady=5)
+        rows_frame = tk.Frame(parent)
+        rows_frame.pack(fill=tk.X)
+        empty_label = tk.Label(rows_frame, text="No accounts found.")
+        rows = {}
 
-        for acc in accounts:
-            frame = tk.Frame(self.content_frame, pady=5)
+        def add_row(acc):
+            frame = tk.Frame(rows_frame, pady=5)
             frame.pack(fill=tk.X, padx=20)
-
             label = tk.Label(frame, text=f"{acc['type'].capitalize()} - ${acc['balance']:.2f}", anchor="w", width=40)
             label.pack(side=tk.LEFT)
+            rows[acc["account_id"]] = (frame, label)
+
+        def update(added, changed, removed):
+            for acc_id in removed:
+                rows.pop(acc_id)[0].destroy()
+            for acc_id in changed:
+                acc = self.accounts[acc_id]
+                rows[acc_id][1].config(text=f"{acc['type'].capitalize()} - ${acc['balance']:.2f}")
+            for acc_id in added:
+                add_row(self.accounts[acc_id])
+            if self.accounts:
+                empty_label.pack_forget()
+            else:
+                empty_label.pack(pady=5)
+
+        update(list(self.accounts), [], [])
+        self.view_updaters.append(update)
 
-        separator = tk.Frame(self.content_frame, height=2, bd=1, relief=tk.SUNKEN)
+        separator = tk.Frame(parent, height=2, bd=1, relief=tk.SUNKEN)
         separator.pack(fill=tk.X, padx=5, pady=10)
 
-        tk.Button(self.content_frame, text="Create New Account", command=self.create_account_popup).pack(pady=10)
+        tk.Button(parent, text="Create New Account", command=self.create_account_popup).pack(pady=10)
 
     def create_account_popup(self):
         popup = tk.Toplevel(self.window)
@@ -119,7 +166,7 @@ class UserWindow:
         def submit():
             name = name_var.get().strip()
             try:
-                balance = float(balance_var.get().strip())
+                balance = Money.parse(balance_var.get())
             except ValueError:
                 messagebox.showerror("Invalid Input", "Balance must be a valid number.")
                 return
@@ -130,133 +177,136 @@ class UserWindow:
 
             acc_id = create_account(self.user_id, name)
             if acc_id:
-                deposit(acc_id, balance, note="Initial Balance")
+                try:
+                    deposit(acc_id, balance, note="Initial Balance")
+                except VelocityLimitExceeded:
+                    messagebox.showwarning("Account Created",
+                                           f"Created '{name}', but the opening deposit was blocked. Try it again later.")
+                    popup.destroy()
+                    self.refresh_accounts()
+                    return
                 messagebox.showinfo("Success", f"Created '{name}' with ${balance:.2f}")
                 popup.destroy()
-                self.show_accounts()
+                # A zero opening balance posts nothing, so no event would arrive
+                self.refresh_accounts()
             else:
                 messagebox.showerror("Error", "Failed to create account.")
 
-        tk.Button(popup, text="Create", command=submit).pack(pady=10)
+        tk.Button(popup, text="Create", command=metrics.tracked("user.create_account", submit)).pack(pady=10)
 
     # -------------------- Deposit / Withdraw --------------------
     def show_deposit(self):
-        self.clear_content()
-        self.current_view = "deposit"
-        tk.Label(self.content_frame, text="Deposit / Withdraw Funds", font=("Arial", 14)).pack(pady=10)
+        self.show_view("deposit", self.build_deposit_view)
 
-        accounts = get_accounts(self.user_id)
-        if not accounts:
-            tk.Label(self.content_frame, text="You have no accounts to use.").pack(pady=10)
-            return
+    def build_deposit_view(self, parent):
+        tk.Label(parent, text="Deposit / Withdraw Funds", font=("Arial", 14)).pack(pady=10)
 
-        tk.Label(self.content_frame, text="Select Account").pack()
-        selected_account = tk.StringVar()
-        display_options = [f"{acc['type'].capitalize()} - ${acc['balance']:.2f} (#{acc['account_id']})" for acc in accounts]
-        acc_map = {label: acc['account_id'] for label, acc in zip(display_options, accounts)}
-        selected_account.set(display_options[0])
+        placeholder = tk.Label(parent, text="You have no accounts to use.")
+        form = tk.Frame(parent)
 
-        tk.OptionMenu(self.content_frame, selected_account, *acc_map.keys()).pack(pady=5)
+        tk.Label(form, text="Select Account").pack()
+        account_menu = AccountMenu(form, self.account_list())
+        account_menu.pack(pady=5)
 
-        tk.Label(self.content_frame, text="Amount").pack()
+        tk.Label(form, text="Amount").pack()
         amount_var = tk.StringVar()
-        tk.Entry(self.content_frame, textvariable=amount_var).pack(pady=5)
+        tk.Entry(form, textvariable=amount_var).pack(pady=5)
+
+        def update(added, changed, removed):
+            account_menu.apply(self.accounts, added, changed, removed)
+            self.toggle(placeholder, form, bool(self.accounts))
+
+        self.toggle(placeholder, form, bool(self.accounts))
+        self.view_updaters.append(update)
 
         def do_deposit():
-            acc_id = acc_map[selected_account.get()]
+            acc_id = account_menu.selected_id
             try:
-                amount = float(amount_var.get())
-                if amount <= 0:
+                amount = Money.parse(amount_var.get())
+                if amount <= ZERO:
                     raise ValueError
             except ValueError:
                 messagebox.showerror("Error", "Enter a valid deposit amount.")
                 return
 
-            if deposit(acc_id, amount, note="Manual Deposit"):
+            try:
+                deposited = deposit(acc_id, amount, note="Manual Deposit")
+            except VelocityLimitExceeded:
+                messagebox.showerror("Error", "Too many transactions right now. Please try again later.")
+                return
+            if deposited:
                 messagebox.showinfo("Success", f"Deposited ${amount:.2f}")
-                self.show_deposit()
             else:
                 messagebox.showerror("Error", "Deposit failed.")
 
         def do_withdraw():
-            acc_id = acc_map[selected_account.get()]
+            acc_id = account_menu.selected_id
             try:
-                amount = float(amount_var.get())
-                if amount <= 0:
+                amount = Money.parse(amount_var.get())
+                if amount <= ZERO:
                     raise ValueError
             except ValueError:
                 messagebox.showerror("Error", "Enter a valid withdrawal amount.")
                 return
 
-            balance = get_account_balance(acc_id)
-            if balance is None or balance < amount:
-                messagebox.showerror("Error", "Insufficient funds.")
+            # The debit itself checks the balance, so there is no pre-check
+            try:
+                withdrawn = record_withdrawal(acc_id, amount)
+            except VelocityLimitExceeded:
+                messagebox.showerror("Error", "Too many transactions right now. Please try again later.")
                 return
-
-            if record_withdrawal(acc_id, amount):
+            if withdrawn:
                 messagebox.showinfo("Success", f"Withdrew ${amount:.2f}")
-                self.show_deposit()
             else:
-                messagebox.showerror("Error", "Withdrawal failed.")
+                messagebox.showerror("Error", "Insufficient funds.")
 
-        tk.Button(self.content_frame, text="Deposit", command=do_deposit).pack(pady=5)
-        tk.Button(self.content_frame, text="Withdraw", command=do_withdraw).pack(pady=5)
+        tk.Button(form, text="Deposit", command=metrics.tracked("user.deposit", do_deposit)).pack(pady=5)
+        tk.Button(form, text="Withdraw", command=metrics.tracked("user.withdraw", do_withdraw)).pack(pady=5)
 
     # -------------------- Transactions --------------------
     def show_transactions_tab(self):
-        self.clear_content()
-        self.current_view = "transactions"
-        accounts = get_accounts(self.user_id)
-        if not accounts:
-            tk.Label(self.content_frame, text="No accounts to view.").pack(pady=20)
-            return
-
-        tk.Label(self.content_frame, text="Select Account to View Transactions", font=("Arial", 14)).pack(pady=10)
+        self.show_view("transactions", self.build_transactions_view)
 
-        self.transaction_account_map = {
-            f"{acc['type'].capitalize()} - ${acc['balance']:.2f} (#{acc['account_id']})": acc['account_id']
-            for acc in accounts
-        }
+    def build_transactions_view(self, parent):
+        placeholder = tk.Label(parent, text="No accounts to view.")
+        form = tk.Frame(parent)
 
-        options = list(self.transaction_account_map.keys())
-        self.transaction_account_var.set(options[0])
+        tk.Label(form, text="Select Account to View Transactions", font=("Arial", 14)).pack(pady=10)
 
-        dropdown = tk.OptionMenu(self.content_frame, self.transaction_account_var, *options, command=self.refresh_transaction_list)
-        dropdown.pack(pady=5)
+        history_frame = tk.Frame(form)
+        history = {}
 
-        self.transaction_list_frame = tk.Frame(self.content_frame)
-        self.transaction_list_frame.pack(fill=tk.BOTH, expand=True)
+        def show_history(account_id):
+            if "view" in history:
+                history.pop("view").destroy()
+            if account_id is not None:
+                history["view"] = transaction_history_view(history_frame, account_id)
+                history["view"].pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
 
-        self.refresh_transaction_list(self.transaction_account_var.get())
+        account_menu = AccountMenu(form, self.account_list(), on_select=show_history)
+        account_menu.pack(pady=5)
+        history_frame.pack(fill=tk.BOTH, expand=True)
+        show_history(account_menu.selected_id)
 
-    def refresh_transaction_list(self, selected_label):
-        for widget in self.transaction_list_frame.winfo_children():
-            widget.destroy()
+        def update(added, changed, removed):
+            selected = account_menu.selected_id
+            account_menu.apply(self.accounts, added, changed, removed)
+            if account_menu.selected_id == selected and selected in changed:
+                # Same account, new postings: re-read its first page only
+                history["view"].reload()
+            self.toggle(placeholder, form, bool(self.accounts))
 
-        account_id = self.transaction_account_map.get(selected_label)
-        transactions = get_transaction_history(account_id)
+        self.toggle(placeholder, form, bool(self.accounts))
+        self.view_updaters.append(update)
 
-        if not transactions:
-            tk.Label(self.transaction_list_frame, text="No transactions found.").pack(pady=10)
-            return
-
-        for tx in transactions:
-            text = f"[{tx['timestamp']}] {tx['type']} ${tx['amount']:.2f}"
-            if tx['note']:
-                text += f" - {tx['note']}"
-            if tx['related_account_id']:
-                text += f" (to/from Acc #{tx['related_account_id']})"
-            tk.Label(self.transaction_list_frame, text=text, anchor="w", justify="left").pack(anchor="w", padx=10, pady=2)
-
-    # -------------------- Transfer Placeholder --------------------
+    # -------------------- Transfer --------------------
     def show_transfer(self):
-        from tkinter import ttk
-        self.clear_content()
-        self.current_view = "transfer"
+        self.show_view("transfer", self.build_transfer_view)
 
-        tk.Label(self.content_frame, text="Transfer Funds", font=("Arial", 14)).pack(pady=5)
+    def build_transfer_view(self, parent):
+        tk.Label(parent, text="Transfer Funds", font=("Arial", 14)).pack(pady=5)
 
-        notebook = ttk.Notebook(self.content_frame)
+        notebook = ttk.Notebook(parent)
         internal_frame = tk.Frame(notebook)
         external_frame = tk.Frame(notebook)
 
@@ -268,65 +318,63 @@ class UserWindow:
         self.build_external_transfer_ui(external_frame)
 
     def build_internal_transfer_ui(self, parent):
-        accounts = get_accounts(self.user_id)
-        if len(accounts) < 2:
-            tk.Label(parent, text="You need at least two accounts to transfer funds.").pack(pady=10)
-            return
-
-        display_options = [f"{acc['type'].capitalize()} - ${acc['balance']:.2f} (#{acc['account_id']})" for acc in accounts]
-        acc_map = {label: acc['account_id'] for label, acc in zip(display_options, accounts)}
+        placeholder = tk.Label(parent, text="You need at least two accounts to transfer funds.")
+        form = tk.Frame(parent)
 
-        from_var = tk.StringVar(value=display_options[0])
-        to_var = tk.StringVar(value=next(opt for opt in display_options if opt != from_var.get()))
+        accounts = self.account_list()
+        tk.Label(form, text="From Account").pack()
+        from_menu = AccountMenu(form, accounts)
+        from_menu.pack()
 
-        def update_to_options(*_):
-            to_menu = to_dropdown["menu"]
-            to_menu.delete(0, "end")
-            for option in display_options:
-                if option != from_var.get():
-                    to_menu.add_command(label=option, command=lambda val=option: to_var.set(val))
+        tk.Label(form, text="To Account").pack()
+        to_menu = AccountMenu(form, accounts)
+        to_menu.pack()
+        if len(accounts) > 1:
+            to_menu.select(accounts[1]["account_id"], notify=False)
 
-        tk.Label(parent, text="From Account").pack()
-        tk.OptionMenu(parent, from_var, *display_options, command=lambda _: update_to_options()).pack()
+        tk.Label(form, text="Amount").pack()
+        amount_var = tk.StringVar()
+        tk.Entry(form, textvariable=amount_var).pack(pady=5)
 
-        tk.Label(parent, text="To Account").pack()
-        to_dropdown = tk.OptionMenu(parent, to_var, *[opt for opt in display_options if opt != from_var.get()])
-        to_dropdown.pack()
+        def update(added, changed, removed):
+            from_menu.apply(self.accounts, added, changed, removed)
+            to_menu.apply(self.accounts, added, changed, removed)
+            self.toggle(placeholder, form, len(self.accounts) >= 2)
 
-        tk.Label(parent, text="Amount").pack()
-        amount_var = tk.StringVar()
-        tk.Entry(parent, textvariable=amount_var).pack(pady=5)
+        self.toggle(placeholder, form, len(self.accounts) >= 2)
+        self.view_updaters.append(update)
 
         def do_transfer():
-            from_id = acc_map[from_var.get()]
-            to_id = acc_map[to_var.get()]
+            from_id = from_menu.selected_id
+            to_id = to_menu.selected_id
             if from_id == to_id:
                 messagebox.showerror("Error", "Cannot transfer to the same account.")
                 return
 
             try:
-                amount = float(amount_var.get())
-                if amount <= 0:
+                amount = Money.parse(amount_var.get())
+                if amount <= ZERO:
                     raise ValueError
             except ValueError:
                 messagebox.showerror("Error", "Invalid amount.")
                 return
 
-            balance = get_account_balance(from_id)
-            if balance is None or balance < amount:
-                messagebox.showerror("Error", "Insufficient funds.")
-                return
-
-            from_type = from_var.get().split(" - ")[0]
-            to_type = to_var.get().split(" - ")[0]
+            from_type = self.accounts[from_id]["type"].capitalize()
+            to_type = self.accounts[to_id]["type"].capitalize()
             note_out = f"Transfer to {self.username} - {to_type}"
             note_in = f"Transfer from {self.username} - {from_type}"
 
-            if record_withdrawal(from_id, amount, note=note_out) and deposit(to_id, amount, note=note_in):
+            try:
+                result = transfer_funds(from_id, to_id, amount, note=note_out, note_in=note_in)
+            except VelocityLimitExceeded:
+                messagebox.showerror("Error", "Too many transactions right now. Please try again later.")
+                return
+            if result:
                 messagebox.showinfo("Success", f"Transferred ${amount:.2f}")
-                self.show_transfer()
+            else:
+                self.show_transfer_error(result)
 
-        tk.Button(parent, text="Transfer Funds", command=do_transfer).pack(pady=10)
+        tk.Button(form, text="Transfer Funds", command=metrics.tracked("user.transfer", do_transfer)).pack(pady=10)
 
     def build_external_transfer_ui(self, parent):
         tk.Label(parent, text="Recipient Username").pack()
@@ -334,19 +382,22 @@ class UserWindow:
         tk.Entry(parent, textvariable=recipient_var).pack()
 
         tk.Label(parent, text="Your Sending Account").pack()
-        user_accounts = get_accounts(self.user_id)
-        if not user_accounts:
-            tk.Label(parent, text="You have no accounts to send from.").pack()
-            return
+        placeholder = tk.Label(parent, text="You have no accounts to send from.")
+        form = tk.Frame(parent)
 
-        from_options = [f"{acc['type'].capitalize()} - ${acc['balance']:.2f} (#{acc['account_id']})" for acc in user_accounts]
-        acc_map = {label: acc['account_id'] for label, acc in zip(from_options, user_accounts)}
-        from_var = tk.StringVar(value=from_options[0])
-        tk.OptionMenu(parent, from_var, *from_options).pack()
+        from_menu = AccountMenu(form, self.account_list())
+        from_menu.pack()
 
-        tk.Label(parent, text="Amount").pack()
+        tk.Label(form, text="Amount").pack()
         amount_var = tk.StringVar()
-        tk.Entry(parent, textvariable=amount_var).pack(pady=5)
+        tk.Entry(form, textvariable=amount_var).pack(pady=5)
+
+        def update(added, changed, removed):
+            from_menu.apply(self.accounts, added, changed, removed)
+            self.toggle(placeholder, form, bool(self.accounts))
+
+        self.toggle(placeholder, form, bool(self.accounts))
+        self.view_updaters.append(update)
 
         def do_external_transfer():
             recipient = recipient_var.get().strip()
@@ -354,37 +405,43 @@ class UserWindow:
                 messagebox.showerror("Error", "Enter a valid recipient username.")
                 return
 
-            from database.db_helper import get_user_accounts_by_username
             target_accounts = get_user_accounts_by_username(recipient)
             if not target_accounts:
                 messagebox.showerror("Error", "Recipient not found or has no accounts.")
                 return
 
             try:
-                amount = float(amount_var.get())
-                if amount <= 0:
+                amount = Money.parse(amount_var.get())
+                if amount <= ZERO:
                     raise ValueError
             except ValueError:
                 messagebox.showerror("Error", "Invalid amount.")
                 return
 
-            from_id = acc_map[from_var.get()]
+            from_id = from_menu.selected_id
             to_id = target_accounts[0]["account_id"]
             to_type = target_accounts[0]["type"]
 
-            balance = get_account_balance(from_id)
-            if balance is None or balance < amount:
-                messagebox.showerror("Error", "Insufficient funds.")
-                return
-
             note_out = f"Transfer to {recipient} - {to_type}"
-            note_in = f"Transfer from {self.username} - {from_var.get().split(' - ')[0]}"
+            note_in = f"Transfer from {self.username} - {self.accounts[from_id]['type'].capitalize()}"
 
-            if record_withdrawal(from_id, amount, note=note_out) and deposit(to_id, amount, note=note_in):
+            try:
+                result = transfer_funds(from_id, to_id, amount, note=note_out, note_in=note_in)
+            except VelocityLimitExceeded:
+                messagebox.showerror("Error", "Too many transactions right now. Please try again later.")
+                return
+            if result:
                 messagebox.showinfo("Success", f"Transferred ${amount:.2f} to {recipient}")
-                self.show_transfer()
+            else:
+                self.show_transfer_error(result)
+
+        tk.Button(form, text="Send Transfer", command=metrics.tracked("user.external_transfer", do_external_transfer)).pack(pady=10)
 
-        tk.Button(parent, text="Send Transfer", command=do_external_transfer).pack(pady=10)
+    def show_transfer_error(self, result):
+        if result.error == INSUFFICIENT_FUNDS:
+            messagebox.showerror("Error", "Insufficient funds.")
+        else:
+            messagebox.showerror("Error", "Transfer failed.")
 
 
 def open_user_window(username, user_id):
@@ -0,0 +1 @@
+"""Headless command line for the bank: python -m banking --help"""
@@ -0,0 +1,400 @@
+"""Headless command line for the bank, for scripts and cron.
+
+    python -m banking user create alice --password-stdin < password.txt
+    python -m banking account create alice Savings --initial 100.00
+    python -m banking deposit 12 25.00
+    python -m banking transfer 12 31 5.00 --note Rent
+    python -m banking --json balance 12
+    python -m banking history 12 --limit 20
+    python -m banking export --user 3 -o ledger.csv
+    python -m banking reconcile
+
+Modules are imported by the command that needs them, so `balance` loads
+sqlite3 and db_helper but never Tkinter or bcrypt (benchmarks/bench_cli.py
+holds it to a cold-start budget). Status messages go to stderr. With
+--json, stdout gets a single JSON object, {"ok": true, ...} or
+{"ok": false, "error": ...}, with amounts as exact decimal strings.
+Exit codes: 0 done, 1 refused or failed, 2 bad usage.
+"""
+import argparse
+import sys
+
+
+class CommandError(Exception):
+    # A refused operation: {"ok": false, "error": ...} and exit code 1
+    def __init__(self, error, detail=None, **payload):
+        super().__init__(error)
+        self.error = error
+        self.detail = detail
+        self.payload = payload
+
+
+def _amount(text):
+    from database.money import Money, ZERO
+
+    try:
+        amount = Money.parse(text)
+    except ValueError:
+        raise CommandError("invalid_amount", f"'{text}' is not an amount")
+    if amount <= ZERO:
+        raise CommandError("invalid_amount", "the amount must be positive")
+    return amount
+
+
+def _user_id(username):
+    from database import db_helper
+
+    user_id = db_helper.get_user_id_by_username(username)
+    if user_id is None:
+        raise CommandError("user_not_found", f"no user named '{username}'")
+    return user_id
+
+
+def _balance(account_id):
+    from database import db_helper
+
+    balance = db_helper.get_account_balance(account_id)
+    if balance is None:
+        raise CommandError("account_not_found", f"no account #{account_id}")
+    return balance
+
+
+def _posting(fn, *args, **kwargs):
+    # Runs a deposit, withdrawal or transfer, turning a velocity block into an error
+    from database.velocity import VelocityLimitExceeded
+
+    try:
+        return fn(*args, **kwargs)
+    except VelocityLimitExceeded as e:
+        raise CommandError("velocity_limit", str(e))
+
+
+# ------------------------ Users and Accounts ------------------------
+
+def run_user_create(args):
+    from database import db_helper
+
+    if args.password_stdin:
+        password = sys.stdin.readline().rstrip("\n")
+    else:
+        import getpass
+        password = getpass.getpass("Password: ")
+    if not args.username or not password:
+        raise CommandError("invalid_input", "username and password cannot be empty")
+    if not db_helper.create_user(args.username, password):
+        raise CommandError("username_taken", f"'{args.username}' already exists")
+    user_id = db_helper.get_user_id_by_username(args.username)
+    return {"user_id": user_id, "username": args.username}, f"Created user '{args.username}' (#{user_id})"
+
+
+def run_user_list(args):
+    from database import db_helper
+
+    users = db_helper.search_users(args.query, limit=args.limit)
+    lines = [f"{user['id']:>8}  {user['username']:<24}{user['accounts']:>4} accounts  {user['total_balance']:>14}"
+             for user in users]
+    return {"users": users}, "\n".join(lines) or "No users found."
+
+
+def run_user_delete(args):
+    from database import db_helper
+
+    user_id = _user_id(args.username)
+    db_helper.delete_user_by_id(user_id)
+    return {"user_id": user_id, "username": args.username}, f"Deleted user '{args.username}' (#{user_id})"
+
+
+def run_account_create(args):
+    from database import db_helper
+
+    initial = _amount(args.initial) if args.initial is not None else None
+    user_id = _user_id(args.username)
+    account_id = db_helper.create_account(user_id, args.name)
+    if initial is not None:
+        _posting(db_helper.deposit, account_id, initial, note="Initial Balance")
+    return ({"account_id": account_id, "user_id": user_id, "type": args.name, "balance": _balance(account_id)},
+            f"Created account #{account_id} ({args.name}) for '{args.username}'")
+
+
+def run_account_list(args):
+    from database import db_helper
+
+    _user_id(args.username)
+    accounts = db_helper.get_user_accounts_by_username(args.username)
+    lines = [f"{account['account_id']:>8}  {account['type']:<20}{account['balance']:>14}" for account in accounts]
+    return {"username": args.username, "accounts": accounts}, "\n".join(lines) or "No accounts."
+
+
+# ------------------------ Money ------------------------
+
+def run_balance(args):
+    balance = _balance(args.account_id)
+    return {"account_id": args.account_id, "balance": balance}, str(balance)
+
+
+def run_deposit(args):
+    from database import db_helper
+
+    amount = _amount(args.amount)
+    if not _posting(db_helper.deposit, args.account_id, amount, note=args.note):
+        _balance(args.account_id)
+        raise CommandError("balance_limit", f"account #{args.account_id} can't hold another {amount}")
+    balance = _balance(args.account_id)
+    return ({"account_id": args.account_id, "amount": amount, "balance": balance},
+            f"Deposited {amount} into #{args.account_id}, balance {balance}")
+
+
+def run_withdraw(args):
+    from database import db_helper
+
+    amount = _amount(args.amount)
+    if not _posting(db_helper.record_withdrawal, args.account_id, amount, note=args.note):
+        _balance(args.account_id)
+        raise CommandError("insufficient_funds", f"account #{args.account_id} can't cover {amount}")
+    balance = _balance(args.account_id)
+    return ({"account_id": args.account_id, "amount": amount, "balance": balance},
+            f"Withdrew {amount} from #{args.account_id}, balance {balance}")
+
+
+def run_transfer(args):
+    from database import db_helper
+
+    amount = _amount(args.amount)
+    result = _posting(db_helper.transfer_funds, args.from_account, args.to_account, amount, note=args.note)
+    if not result:
+        raise CommandError(result.error, f"transfer of {amount} from #{args.from_account} to #{args.to_account}")
+    return ({"from_account": args.from_account, "to_account": args.to_account, "amount": amount,
+             "from_balance": result.from_balance},
+            f"Transferred {amount} from #{args.from_account} to #{args.to_account}, "
+            f"balance {result.from_balance}")
+
+
+def run_history(args):
+    from database import db_helper
+
+    _balance(args.account_id)
+    page = db_helper.get_transaction_page(args.account_id, before=args.before, limit=args.limit)
+    # Pass "next" back as --before for the following page
+    following = [page[-1]["timestamp"], page[-1]["id"]] if len(page) == args.limit else None
+    lines = [f"{tx['timestamp']}  {tx['type']:<13}{tx['amount']:>12}  {tx['note'] or ''}" for tx in page]
+    return {"account_id": args.account_id, "transactions": page, "next": following}, \
+        "\n".join(lines) or "No transactions."
+
+
+# ------------------------ Ledger ------------------------
+
+def run_export(args):
+    from database.export import export_transactions
+
+    fmt = args.format or ("ndjson" if args.output and args.output.endswith((".ndjson", ".jsonl", ".json")) else "csv")
+    filters = {"account_ids": args.account, "user_id": args.user, "since": args.since, "until": args.until}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as out:
+            count = export_transactions(out, fmt, **filters)
+        return {"exported": count, "path": args.output}, f"Exported {count} transactions to {args.output}"
+    # Rows go to stdout, so the summary can't
+    count = export_transactions(args.stdout, fmt, **filters)
+    print(f"[INFO] Exported {count} transactions", file=sys.stderr)
+    return None, None
+
+
+def run_reconcile(args):
+    from database import db_helper
+
+    result = db_helper.reconcile_balances(args.account)
+    if result["mismatches"]:
+        raise CommandError("balance_mismatch", f"{len(result['mismatches'])} of {result['accounts']} accounts "
+                                               "don't match their ledger", **result)
+    return result, f"All {result['accounts']} balances match the ledger"
+
+
+# ------------------------ Entry Point ------------------------
+
+def add_user_arguments(parser):
+    user = parser.add_subparsers(dest="action", required=True)
+    create = user.add_parser("create")
+    create.add_argument("username")
+    create.add_argument("--password-stdin", action="store_true", help="read the password from stdin's first line")
+    create.set_defaults(run=run_user_create)
+    listing = user.add_parser("list")
+    listing.add_argument("query", nargs="?", default="", help="username prefix")
+    listing.add_argument("--limit", type=_page_size, default=100)
+    listing.set_defaults(run=run_user_list)
+    delete = user.add_parser("delete", help="delete a user and their accounts (transactions are kept)")
+    delete.add_argument("username")
+    delete.set_defaults(run=run_user_delete)
+
+
+def add_account_arguments(parser):
+    account = parser.add_subparsers(dest="action", required=True)
+    create = account.add_parser("create")
+    create.add_argument("username")
+    create.add_argument("name", help="account type, e.g. Checking")
+    create.add_argument("--initial", help="opening deposit")
+    create.set_defaults(run=run_account_create)
+    listing = account.add_parser("list")
+    listing.add_argument("username")
+    listing.set_defaults(run=run_account_list)
+
+
+def add_balance_arguments(parser):
+    parser.add_argument("account_id", type=int)
+    parser.set_defaults(run=run_balance)
+
+
+def add_deposit_arguments(parser):
+    parser.add_argument("account_id", type=int)
+    parser.add_argument("amount")
+    parser.add_argument("--note", default="Deposit")
+    parser.set_defaults(run=run_deposit)
+
+
+def add_withdraw_arguments(parser):
+    parser.add_argument("account_id", type=int)
+    parser.add_argument("amount")
+    parser.add_argument("--note", default="Withdrawal")
+    parser.set_defaults(run=run_withdraw)
+
+
+def add_transfer_arguments(parser):
+    parser.add_argument("from_account", type=int)
+    parser.add_argument("to_account", type=int)
+    parser.add_argument("amount")
+    parser.add_argument("--note", default="Transfer")
+    parser.set_defaults(run=run_transfer)
+
+
+def _page_size(text):
+    limit = int(text) if text.lstrip("-").isdigit() else 0
+    if limit < 1:
+        raise argparse.ArgumentTypeError(f"expected a whole number of at least 1, got {text!r}")
+    return limit
+
+
+class _Cursor(argparse.Action):
+    # --before TIMESTAMP ID -> (timestamp, id), a bad id being a usage error
+    def __call__(self, parser, namespace, values, option_string=None):
+        timestamp, row_id = values
+        if not row_id.isdigit():
+            parser.error(f"argument {option_string}: invalid ID '{row_id}'")
+        setattr(namespace, self.dest, (timestamp, int(row_id)))
+
+
+def add_history_arguments(parser):
+    parser.add_argument("account_id", type=int)
+    parser.add_argument("--limit", type=_page_size, default=50)
+    parser.add_argument("--before", nargs=2, metavar=("TIMESTAMP", "ID"), action=_Cursor,
+                        help="continue after this row")
+    parser.set_defaults(run=run_history)
+
+
+def add_export_arguments(parser):
+    parser.add_argument("-o", "--output", help="file to write (default: stdout)")
+    parser.add_argument("--format", choices=("csv", "ndjson"), help="default: from the file extension, else csv")
+    parser.add_argument("--account", type=int, action="append", help="only this account (repeatable)")
+    parser.add_argument("--user", type=int, help="only this user's accounts")
+    parser.add_argument("--since", help="earliest timestamp, e.g. 2025-01-01")
+    parser.add_argument("--until", help="timestamp to stop before (exclusive)")
+    parser.set_defaults(run=run_export)
+
+
+def add_reconcile_arguments(parser):
+    parser.add_argument("--account", type=int, action="append", help="only this account (repeatable)")
+    parser.set_defaults(run=run_reconcile)
+
+
+COMMANDS = {
+    "user": ("create, list and delete users", add_user_arguments),
+    "account": ("create and list accounts", add_account_arguments),
+    "balance": ("an account's balance", add_balance_arguments),
+    "deposit": ("put money into an account", add_deposit_arguments),
+    "withdraw": ("take money out of an account", add_withdraw_arguments),
+    "transfer": ("move money between two accounts", add_transfer_arguments),
+    "history": ("an account's transactions, newest first", add_history_arguments),
+    "export": ("stream transactions as CSV or NDJSON", add_export_arguments),
+    "reconcile": ("check balances against the ledger (exit 1 on a mismatch)", add_reconcile_arguments),
+}
+
+
+class _HelpFormatter(argparse.RawDescriptionHelpFormatter):
+    # argparse makes a formatter for every add_argument(), and without a width
+    # the default one imports shutil (and with it bz2, lzma, ...) to ask the
+    # terminal; 80 columns is what it falls back to anyway
+    def __init__(self, prog):
+        super().__init__(prog, width=78)
+
+
+def parse_arguments(argv=None):
+    # Two passes: the global options and the command name, then only that
+    # command's arguments. Building every subparser up front costs more
+    # than a `balance` call itself.
+    parser = argparse.ArgumentParser(prog="python -m banking", description="Headless banking commands.",
+                                     formatter_class=_HelpFormatter,
+                                     epilog="commands:\n" + "\n".join(f"  {name:<12}{help_text}"
+                                                                      for name, (help_text, _) in COMMANDS.items()))
+    parser.add_argument("--db", help="database file (default: banking.db)")
+    parser.add_argument("--json", action="store_true", help="print one JSON object on stdout")
+    parser.add_argument("command", choices=COMMANDS, metavar="COMMAND", help="one of the commands below")
+    parser.add_argument("arguments", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    help_text, add_arguments = COMMANDS[args.command]
+    command = argparse.ArgumentParser(prog=f"python -m banking {args.command}", description=help_text,
+                                      formatter_class=_HelpFormatter)
+    add_arguments(command)
+    return command.parse_args(args.arguments, namespace=args)
+
+
+def _json_default(value):
+    from database.money import Money
+
+    if isinstance(value, Money):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _emit(out, as_json, payload, text):
+    if as_json:
+        import json
+        out.write(json.dumps(payload, default=_json_default) + "\n")
+    elif text:
+        out.write(text + "\n")
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    from contextlib import redirect_stdout
+    from database import database
+
+    if args.db:
+        database.set_database_path(args.db)
+    # Library code reports with print(); keep stdout for results
+    args.stdout = sys.stdout
+    try:
+        with redirect_stdout(sys.stderr):
+            database.initialize_database()
+            payload, text = args.run(args)
+    except CommandError as e:
+        _emit(args.stdout, args.json, {"ok": False, "error": e.error, "detail": e.detail, **e.payload}, None)
+        if not args.json:
+            print(f"[ERROR] {e.error}: {e.detail}" if e.detail else f"[ERROR] {e.error}", file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        return 0
+    except Exception as e:
+        import sqlite3
+        if not isinstance(e, sqlite3.Error):
+            raise
+        _emit(args.stdout, args.json, {"ok": False, "error": "database_error", "detail": str(e)}, None)
+        if not args.json:
+            print(f"[ERROR] database_error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        database.close_all_connections()
+    if payload is not None or text is not None:
+        _emit(args.stdout, args.json, {"ok": True, **(payload or {})}, text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
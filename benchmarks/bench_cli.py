@@ -0,0 +1,86 @@
+"""Cold-start time of the headless CLI against a budget.
+
+    python -m benchmarks.bench_cli
+    python -m benchmarks.bench_cli --runs 50 --budget-ms 50 -- --json history 1
+
+Runs `python -m banking --db <synthetic db> balance 1` (or the command
+after --) as a fresh process each time and reports the median and p90
+wall time. The budget is on the median minus a bare `python -c pass`,
+since interpreter startup alone varies several-fold between machines;
+the run fails (exit 1) when that is over --budget-ms, or when the
+command imports a module the CLI should never load (Tkinter, bcrypt).
+Run `python -m compileall -q .` first when PYTHONDONTWRITEBYTECODE is
+set, or every run pays for compiling.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import build_database
+
+# Modules the CLI must not load, with their submodules
+FORBIDDEN_IMPORTS = ("tkinter", "_tkinter", "bcrypt", "app.ui")
+
+
+def time_runs(command, runs, env):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, env=env, stdout=subprocess.DEVNULL, check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)
+
+
+def imported_modules(command, env):
+    # -X importtime writes one line per module to stderr
+    result = subprocess.run([command[0], "-X", "importtime"] + command[1:], env=env, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True, check=True)
+    return {line.rsplit("|", 1)[1].strip() for line in result.stderr.splitlines() if line.startswith("import time:")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="allowed median time over a bare interpreter")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=475)
+    parser.add_argument("cli_args", nargs="*", help="CLI arguments after --db (default: balance 1)")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "PYTHONPATH": root}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench_cli.db")
+        build_database(path, args.users, bcrypt_rounds=4, seed=args.seed)
+        command = [sys.executable, "-m", "banking", "--db", path] + (args.cli_args or ["balance", "1"])
+        # One warm-up run so the page cache, not the disk, serves the database
+        subprocess.run(command, env=env, stdout=subprocess.DEVNULL, check=True)
+        timings = time_runs(command, args.runs, env)
+        baseline = time_runs([sys.executable, "-c", "pass"], args.runs, env)
+        forbidden = sorted(name for name in imported_modules(command, env)
+                           if name in FORBIDDEN_IMPORTS or name.startswith(tuple(f"{m}." for m in FORBIDDEN_IMPORTS)))
+
+    median = statistics.median(timings)
+    p90 = timings[int(len(timings) * 0.9) - 1]
+    interpreter = statistics.median(baseline)
+    print(f"banking {' '.join(command[5:])}: median {median:.1f} ms, p90 {p90:.1f} ms over {args.runs} runs")
+    print(f"Bare interpreter {interpreter:.1f} ms, so {median - interpreter:.1f} ms is the CLI's own")
+    failed = False
+    if forbidden:
+        print(f"[REGRESSION] imports {', '.join(forbidden)}")
+        failed = True
+    if median - interpreter > args.budget_ms:
+        print(f"[REGRESSION] {median - interpreter:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if failed:
+        return 1
+    print(f"[OK] Within the {args.budget_ms:.0f} ms budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""Deposits and history reads per second: per-call connections vs. the pool.
+
+    python -m benchmarks.bench_connections [--ops 2000]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from database import database, db_helper
+from database.migrate import list_migrations
+
+
+# ------------------------ Legacy (per-call connect) ------------------------
+
+def legacy_deposit(path, account_id, amount, note="Deposit"):
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("UPDATE accounts SET balance = balance + ? WHERE id = ?", (amount, account_id))
+        cursor.execute("""
+            INSERT INTO transactions (account_id, type, amount, note)
+            VALUES (?, 'deposit', ?, ?)
+        """, (account_id, amount, note))
+        cursor.execute("SELECT user_id FROM accounts WHERE id = ?", (account_id,))
+        cursor.fetchone()
+        conn.commit()
+        return True
+    finally:
+        conn.close()
+
+
+def legacy_history(path, account_id):
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT type, amount, timestamp, note, related_account_id
+        FROM transactions
+        WHERE account_id = ?
+        ORDER BY timestamp DESC
+    """, (account_id,))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+# ------------------------ Harness ------------------------
+
+def _rate(fn, ops):
+    start = time.perf_counter()
+    for _ in range(ops):
+        fn()
+    return ops / (time.perf_counter() - start)
+
+
+def _fresh_database(directory, name):
+    path = os.path.join(directory, name)
+    database.set_database_path(path)
+    database.initialize_database()
+    user_id = _create_user()
+    account_id = db_helper.create_account(user_id, "Checking")
+    # Give the history query something to read
+    for _ in range(50):
+        db_helper.deposit(account_id, 1.0)
+    return path, account_id
+
+
+def _create_user():
+    # Skip bcrypt, it is not what is being measured here
+    with database.transaction() as cursor:
+        cursor.execute("INSERT INTO users (username, password_hash) VALUES ('bench', 'x')")
+        return cursor.lastrowid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # The legacy path runs against a rollback-journal database, like the old code did
+        legacy_path = os.path.join(directory, "legacy.db")
+        with open(list_migrations()[0][2]) as f:
+            conn = sqlite3.connect(legacy_path)
+            conn.executescript(f.read())
+            conn.execute("INSERT INTO users (username, password_hash) VALUES ('bench', 'x')")
+            conn.execute("INSERT INTO accounts (user_id, account_type, balance) VALUES (1, 'Checking', 0)")
+            conn.commit()
+            conn.close()
+        for _ in range(50):
+            legacy_deposit(legacy_path, 1, 1.0)
+
+        # Reads first, so both sides page through the same 50-row history
+        before_history = _rate(lambda: legacy_history(legacy_path, 1), args.ops)
+        before_deposit = _rate(lambda: legacy_deposit(legacy_path, 1, 1.0), args.ops)
+
+        _, account_id = _fresh_database(directory, "pooled.db")
+        after_history = _rate(lambda: db_helper.get_transaction_history(account_id), args.ops)
+        after_deposit = _rate(lambda: db_helper.deposit(account_id, 1.0), args.ops)
+        database.close_all_connections()
+
+    print(f"{'operation':<16}{'before/s':>12}{'after/s':>12}{'speedup':>10}")
+    for name, before, after in (
+        ("deposit", before_deposit, after_deposit),
+        ("history read", before_history, after_history),
+    ):
+        print(f"{name:<16}{before:>12.0f}{after:>12.0f}{after / before:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
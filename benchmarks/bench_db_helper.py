@@ -0,0 +1,206 @@
+"""Latency and throughput of every db_helper hot path.
+
+    python -m benchmarks.bench_db_helper --users 1000 --transactions-per-account 50
+    python -m benchmarks.bench_db_helper --compare benchmarks/results/baseline.json
+
+Each operation is measured --repeat times, in rounds over all of them,
+and the median of each figure is reported, so one noisy stretch doesn't
+decide the result. Results are written as JSON (--output). With
+--compare, the run fails (exit 1) when any operation's p50 latency
+grows, or its ops/sec drops, by more than --threshold relative to the
+saved run. p99 is gated only with --p99-threshold: it follows fsync
+stalls, and identical runs on one machine were seen 10x apart. A saved run with another database shape, cache
+setting or bcrypt work factor isn't comparable and is refused (exit 2).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import BENCH_PASSWORD, build_database, username_for
+from database import database, db_helper
+from database.cache import account_cache
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(__file__), "results", "latest.json")
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure(fn, iterations):
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        began = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - began)
+    elapsed = time.perf_counter() - start
+    return {
+        "iterations": iterations,
+        "ops_per_sec": iterations / elapsed,
+        "p50_us": percentile(latencies, 0.50) * 1e6,
+        "p99_us": percentile(latencies, 0.99) * 1e6,
+    }
+
+
+def median_of(runs):
+    # Figure by figure, so each is the middle of its own spread
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def scenarios(rng, shape):
+    users = shape["users"]
+    accounts = shape["accounts"]
+
+    def random_user():
+        return rng.randint(1, users)
+
+    def random_account():
+        return rng.randint(1, accounts)
+
+    def transfer():
+        source, target = rng.sample(range(1, accounts + 1), 2)
+        db_helper.transfer_funds(source, target, 0.01)
+
+    # delete_user_by_id consumes users, so it walks down from the top
+    doomed = iter(range(users, 0, -1))
+
+    return {
+        "authenticate_user": lambda: db_helper.authenticate_user(username_for(random_user()), BENCH_PASSWORD),
+        "get_accounts": lambda: db_helper.get_accounts(random_user()),
+        "get_transaction_history": lambda: db_helper.get_transaction_history(random_account()),
+        "get_transaction_page": lambda: db_helper.get_transaction_page(random_account(), limit=50),
+        "get_user_accounts_by_username": lambda: db_helper.get_user_accounts_by_username(username_for(random_user())),
+        "deposit": lambda: db_helper.deposit(random_account(), 1.0),
+        "record_withdrawal": lambda: db_helper.record_withdrawal(random_account(), 0.01),
+        "transfer_funds": transfer,
+        "delete_user_by_id": lambda: db_helper.delete_user_by_id(next(doomed)),
+    }
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        started = time.perf_counter()
+        shape = build_database(path, args.users, args.accounts_per_user, args.transactions_per_account,
+                               bcrypt_rounds=args.bcrypt_rounds, seed=args.seed)
+        build_seconds = time.perf_counter() - started
+
+        account_cache.enabled = not args.no_cache
+        operations = scenarios(rng, shape)
+        runs = {}
+        for _ in range(args.repeat):
+            for name, fn in operations.items():
+                if args.only and name not in args.only:
+                    continue
+                iterations = args.iterations
+                if name == "authenticate_user":
+                    iterations = max(1, min(iterations, args.auth_iterations))
+                elif name == "delete_user_by_id":
+                    # Across all rounds, at most a quarter of the users
+                    iterations = max(1, min(iterations, shape["users"] // (4 * args.repeat)))
+                runs.setdefault(name, []).append(measure(fn, iterations))
+        database.close_all_connections()
+        results = {name: median_of(measured) for name, measured in runs.items()}
+
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "cache": not args.no_cache,
+        "bcrypt_rounds": args.bcrypt_rounds,
+        "repeat": args.repeat,
+        "shape": shape,
+        "build_seconds": build_seconds,
+        "results": results,
+    }
+
+
+# Settings two runs must share for their timings to be comparable
+COMPARABLE = ("shape", "cache", "bcrypt_rounds")
+
+
+def compare(current, baseline, threshold, p99_threshold=None):
+    # Returns human-readable regressions; empty means the run is acceptable.
+    # p99 is only checked given its own allowance. Raises ValueError when
+    # the runs measured different things.
+    for key in COMPARABLE:
+        if key in baseline and baseline[key] != current[key]:
+            raise ValueError(f"baseline has {key} {baseline[key]}, this run {current[key]}")
+    regressions = []
+    for name, now in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            continue
+        for key, allowed in (("p50_us", threshold), ("p99_us", p99_threshold)):
+            if allowed is not None and now[key] > before[key] * (1 + allowed):
+                regressions.append(f"{name}: {key} {before[key]:.1f} -> {now[key]:.1f}")
+        if now["ops_per_sec"] < before["ops_per_sec"] * (1 - threshold):
+            regressions.append(f"{name}: ops/sec {before['ops_per_sec']:.0f} -> {now['ops_per_sec']:.0f}")
+    return regressions
+
+
+def print_report(report):
+    shape = report["shape"]
+    print(f"{shape['users']} users, {shape['accounts']} accounts, {shape['transactions']} transactions "
+          f"(built in {report['build_seconds']:.1f}s, cache {'on' if report['cache'] else 'off'})")
+    print(f"{'operation':<32}{'ops/sec':>12}{'p50 us':>12}{'p99 us':>12}")
+    for name, result in report["results"].items():
+        print(f"{name:<32}{result['ops_per_sec']:>12.0f}{result['p50_us']:>12.1f}{result['p99_us']:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--accounts-per-user", type=int, default=2)
+    parser.add_argument("--transactions-per-account", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5, help="rounds per operation; the median is reported")
+    parser.add_argument("--auth-iterations", type=int, default=20, help="bcrypt is slow, cap its iterations")
+    parser.add_argument("--bcrypt-rounds", type=int, default=db_helper.BCRYPT_ROUNDS)
+    parser.add_argument("--only", action="append", help="run just this operation (repeatable)")
+    parser.add_argument("--no-cache", action="store_true", help="measure with the account cache disabled")
+    parser.add_argument("--seed", type=int, default=475)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--compare", help="earlier results JSON to check against")
+    # Identical runs on a shared machine differ by up to about 40% at p50
+    parser.add_argument("--threshold", type=float, default=0.5, help="allowed relative regression")
+    parser.add_argument("--p99-threshold", type=float, default=None, help="allowed p99 regression (default: not checked)")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[INFO] Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        try:
+            regressions = compare(report, baseline, args.threshold, args.p99_threshold)
+        except ValueError as e:
+            print(f"[ERROR] Not comparable with {args.compare}: {e}")
+            return 2
+        for regression in regressions:
+            print(f"[REGRESSION] {regression}")
+        if regressions:
+            return 1
+        print(f"[OK] No regression beyond {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""Deposits per second with and without group commit.
+
+    python -m benchmarks.bench_group_commit [--duration 3] [--submitters 1 8 64]
+
+Each submitter thread posts deposits back to back for --duration seconds.
+"direct" is every thread calling db_helper.deposit and committing on its
+own; "group" sends the same call through one GroupCommitWriter. Both run
+with the same --synchronous level, so each reported deposit is equally
+durable.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.synthetic import build_database
+from database import database, db_helper
+from database.group_commit import DEFAULT_MAX_BATCH, DEFAULT_MAX_DELAY_MS, GroupCommitWriter
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_submitters(count, duration, post, accounts):
+    latencies = [[] for _ in range(count)]
+    errors = [0] * count
+    start = threading.Barrier(count + 1)
+
+    def submitter(index):
+        account_id = index % accounts + 1
+        samples = latencies[index]
+        start.wait()
+        deadline = time.perf_counter() + duration
+        while True:
+            began = time.perf_counter()
+            if began >= deadline:
+                break
+            try:
+                post(account_id)
+            except Exception:
+                errors[index] += 1
+            samples.append(time.perf_counter() - began)
+        database.close_connection()
+
+    threads = [threading.Thread(target=submitter, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    began = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    samples = [sample for per_thread in latencies for sample in per_thread]
+    return {
+        "tps": len(samples) / elapsed,
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+        "errors": sum(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--submitters", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--accounts", type=int, default=64)
+    parser.add_argument("--synchronous", default="FULL", choices=("OFF", "NORMAL", "FULL", "EXTRA"))
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument("--max-delay-ms", type=float, default=DEFAULT_MAX_DELAY_MS)
+    parser.add_argument("--output", help="also write the results as JSON here")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        build_database(os.path.join(directory, "group.db"), users=args.accounts, accounts_per_user=1,
+                       transactions_per_account=0, bcrypt_rounds=4)
+        database.close_all_connections()
+        # Direct callers open their own connections, give them the same durability
+        database.PRAGMAS["synchronous"] = args.synchronous
+
+        print(f"synchronous={args.synchronous}, max_batch={args.max_batch}, max_delay_ms={args.max_delay_ms}")
+        print(f"{'submitters':>10}{'mode':>8}{'tps':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}{'batch':>8}")
+        for count in args.submitters:
+            direct = run_submitters(count, args.duration, lambda account_id: db_helper.deposit(account_id, 1),
+                                    args.accounts)
+            writer = GroupCommitWriter(max_batch=args.max_batch, max_delay_ms=args.max_delay_ms,
+                                       synchronous=args.synchronous)
+            try:
+                group = run_submitters(count, args.duration,
+                                       lambda account_id: writer.submit(db_helper.deposit, account_id, 1).result(),
+                                       args.accounts)
+            finally:
+                writer.close()
+            group["average_batch"] = writer.stats()["average_batch"]
+
+            for mode, result in (("direct", direct), ("group", group)):
+                batch = f"{result['average_batch']:.1f}" if "average_batch" in result else "1"
+                print(f"{count:>10}{mode:>8}{result['tps']:>10.0f}{result['p50_ms']:>10.2f}"
+                      f"{result['p99_ms']:>10.2f}{result['errors']:>8}{batch:>8}")
+                results.append({"submitters": count, "mode": mode, **result})
+        database.close_all_connections()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"synchronous": args.synchronous, "max_batch": args.max_batch,
+                       "max_delay_ms": args.max_delay_ms, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""Write throughput with the ledger in one file versus split across shards.
+
+    python -m benchmarks.bench_sharding [--processes 4] [--shards 1 2 4] [--cross 0.1]
+
+Each worker process posts back to back for --duration seconds against
+random accounts: deposits, plus a --cross fraction of transfers between
+accounts on different shards (two-phase, so they cost two commits). With
+one shard every process queues on the same write lock; with K shards
+writers only meet when they pick the same file, so throughput should grow
+with K until the CPUs or the disk run out.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+from database import db_helper
+from database.money import Money
+from database.sharding import ShardedLedger, shard_paths
+
+
+def build(paths, users, bcrypt_rounds):
+    db_helper.set_bcrypt_rounds(bcrypt_rounds)
+    ledger = ShardedLedger.open(paths)
+    accounts = []
+    for index in range(users):
+        username = f"shard_user_{index:05d}"
+        ledger.create_user(username, "bench")
+        account_id = ledger.create_account(ledger.get_user_id_by_username(username), "Checking")
+        ledger.deposit(account_id, Money.parse(1000))
+        accounts.append(account_id)
+    ledger.close()
+    return accounts
+
+
+def worker(paths, accounts, duration, cross, seed, results):
+    rng = random.Random(seed)
+    ledger = ShardedLedger(paths)
+    by_shard = {}
+    for account_id in accounts:
+        by_shard.setdefault(ledger.shard_of(account_id), []).append(account_id)
+    posted = errors = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        account_id = rng.choice(accounts)
+        try:
+            if cross and len(by_shard) > 1 and rng.random() < cross:
+                other = rng.choice([s for s in by_shard if s != ledger.shard_of(account_id)])
+                ok = ledger.transfer_funds(account_id, rng.choice(by_shard[other]), Money(1)).ok
+            else:
+                ok = ledger.deposit(account_id, Money(1))
+        except Exception:
+            ok = False
+        posted += ok
+        errors += not ok
+    ledger.close()
+    results.put((posted, errors))
+
+
+def run(shards, args):
+    with tempfile.TemporaryDirectory() as directory:
+        paths = shard_paths(directory, shards)
+        accounts = build(paths, args.users, args.bcrypt_rounds)
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=worker,
+                                           args=(paths, accounts, args.duration, args.cross, args.seed + i, results))
+                   for i in range(args.processes)]
+        began = time.perf_counter()
+        for process in workers:
+            process.start()
+        totals = [results.get() for _ in workers]
+        for process in workers:
+            process.join()
+        elapsed = time.perf_counter() - began
+    posted = sum(t[0] for t in totals)
+    return {"shards": shards, "processes": args.processes, "tps": posted / elapsed,
+            "posted": posted, "errors": sum(t[1] for t in totals)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--users", type=int, default=256)
+    parser.add_argument("--cross", type=float, default=0.0, help="fraction of posts that are cross-shard transfers")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="also write the results as JSON here")
+    args = parser.parse_args()
+
+    print(f"cpus={os.cpu_count()}, processes={args.processes}, cross={args.cross}")
+    print(f"{'shards':>8}{'tps':>10}{'posted':>10}{'errors':>8}")
+    results = []
+    for shards in args.shards:
+        result = run(shards, args)
+        print(f"{shards:>8}{result['tps']:>10.0f}{result['posted']:>10}{result['errors']:>8}")
+        results.append(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"cpus": os.cpu_count(), "cross": args.cross, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""Scripted UI session under the profiler: view builds, re-shows and popups.
+
+    xvfb-run python -m benchmarks.bench_ui --users 2000 --transactions-per-account 200
+    xvfb-run python -m benchmarks.bench_ui --compare benchmarks/results/ui_baseline.json
+
+Opens a user window and the admin window on a synthetic database and
+drives them through Tk (button.invoke(), so callbacks take the same path
+as clicks), letting the event loop run between steps. Prints the
+profiler's per-frame table, worst frames and stalls, and writes the
+report as JSON. With --compare, the run fails (exit 1) when a frame's
+mean time grows by more than --threshold. Needs a display; xvfb-run
+provides one on a headless machine.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tkinter as tk
+
+from benchmarks.synthetic import build_database, username_for
+from database import database, db_helper
+from database.money import Money
+from app.event_bus import EventBus
+from app.ui import profiler
+from app.ui.admin_window import AdminWindow
+from app.ui.user_window import UserWindow
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(__file__), "results", "ui_latest.json")
+
+
+def settle(root, seconds=0.0):
+    # Let the event loop run: idle jobs, redraws, the EventBus pump, the watchdog
+    deadline = time.perf_counter() + seconds
+    root.update()
+    while time.perf_counter() < deadline:
+        time.sleep(0.005)
+        root.update()
+
+
+def buttons(widget, text):
+    found = []
+    for child in widget.winfo_children():
+        if isinstance(child, tk.Button) and child.cget("text") == text:
+            found.append(child)
+        found.extend(buttons(child, text))
+    return found
+
+
+def drive_user_window(root, user_id, rounds):
+    with profiler.frame("UserWindow.__init__"):
+        window = UserWindow(username_for(user_id), user_id)
+    settle(root, 0.1)
+    # First round builds each view, later ones only re-show it
+    for _ in range(rounds):
+        for nav_button in window.nav_frame.winfo_children():
+            nav_button.invoke()
+            settle(root, 0.06)
+    # A posting from elsewhere: the EventBus pump refreshes the built views
+    db_helper.deposit(window.account_list()[0]["account_id"], Money(1))
+    settle(root, 0.2)
+    window.cleanup()
+    settle(root)
+
+
+def drive_admin_window(root, rounds):
+    with profiler.frame("AdminWindow.__init__"):
+        admin = AdminWindow()
+    settle(root, 0.1)
+    tree = admin.directory.tree
+    view_accounts = buttons(admin.users_tab, "View Accounts")[0]
+    for item in tree.get_children()[:rounds]:
+        tree.selection_set(item)
+        view_accounts.invoke()
+        settle(root, 0.06)
+        accounts_popup = admin.window.winfo_children()[-1]
+        history = buttons(accounts_popup, "All Transactions")
+        if history:
+            history[0].invoke()
+            settle(root, 0.06)
+            admin.window.winfo_children()[-1].destroy()
+        accounts_popup.destroy()
+        settle(root)
+    # Type-ahead search: one query once the typing pauses
+    for prefix in ("u", "us", "user0000"):
+        admin.search_var.set(prefix)
+        settle(root, 0.02)
+    settle(root, 0.4)
+    admin.window.destroy()
+    settle(root)
+
+
+def run(args):
+    with tempfile.TemporaryDirectory() as directory:
+        shape = build_database(os.path.join(directory, "bench_ui.db"), args.users, args.accounts_per_user,
+                               args.transactions_per_account, bcrypt_rounds=4, seed=args.seed)
+        root = tk.Tk()
+        root.withdraw()
+        ui_profiler = profiler.UIProfiler(root, stall_ms=args.stall_ms)
+        ui_profiler.install()
+        EventBus.attach_tk(root)
+        try:
+            drive_user_window(root, 1, args.rounds)
+            drive_admin_window(root, args.rounds)
+            report = ui_profiler.report(worst=args.worst)
+        finally:
+            EventBus.detach()
+            ui_profiler.uninstall()
+            root.destroy()
+            database.close_all_connections()
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "tk": tk.TkVersion,
+        "shape": shape,
+        "report": report,
+    }
+
+
+def compare(current, baseline, threshold, min_ms):
+    # Frames under min_ms on both runs are too short to compare reliably
+    regressions = []
+    for name, now in current["report"]["frames"].items():
+        before = baseline.get("report", {}).get("frames", {}).get(name)
+        if not before or max(now["mean_ms"], before["mean_ms"]) < min_ms:
+            continue
+        if now["mean_ms"] > before["mean_ms"] * (1 + threshold):
+            regressions.append(f"{name}: mean_ms {before['mean_ms']:.1f} -> {now['mean_ms']:.1f}")
+    stalls_before = len(baseline.get("report", {}).get("stalls", []))
+    stalls_now = len(current["report"]["stalls"])
+    if stalls_now > stalls_before:
+        regressions.append(f"stalls: {stalls_before} -> {stalls_now}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--accounts-per-user", type=int, default=3)
+    parser.add_argument("--transactions-per-account", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=3, help="passes over the views and admin popups")
+    parser.add_argument("--stall-ms", type=float, default=profiler.STALL_MS)
+    parser.add_argument("--worst", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=475)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--compare", help="earlier results JSON to check against")
+    parser.add_argument("--threshold", type=float, default=0.5, help="allowed relative regression of a frame's mean")
+    parser.add_argument("--min-ms", type=float, default=2.0, help="ignore frames faster than this")
+    args = parser.parse_args()
+
+    result = run(args)
+    shape = result["shape"]
+    print(f"{shape['users']} users, {shape['accounts']} accounts, {shape['transactions']} transactions")
+    ui_report = result["report"]
+    print(f"{'frame':<48}{'count':>7}{'mean ms':>10}{'max ms':>10}{'db ms':>10}{'widget ms':>11}")
+    for name, totals in ui_report["frames"].items():
+        print(f"{name[:47]:<48}{totals['count']:>7}{totals['mean_ms']:>10.1f}{totals['max_ms']:>10.1f}"
+              f"{totals['db_ms']:>10.1f}{totals['widget_ms']:>11.1f}")
+    print(f"Stalls over {ui_report['stall_ms']} ms: {len(ui_report['stalls'])}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"[INFO] Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.threshold, args.min_ms)
+        for regression in regressions:
+            print(f"[REGRESSION] {regression}")
+        if regressions:
+            return 1
+        print(f"[OK] No regression beyond {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+import random
+
+import bcrypt
+
+from database import database
+from database.migrate import migrate
+
+BENCH_PASSWORD = "bench-password"
+TRANSACTION_TYPES = ("deposit", "transfer_in", "transfer_out")
+
+
+def build_database(path, users=1000, accounts_per_user=2, transactions_per_account=50,
+                   bcrypt_rounds=12, seed=475):
+    """Create a migrated database at `path` filled with synthetic data.
+
+    Rows are inserted with executemany straight into the tables, so building
+    millions of transactions takes seconds. Every user's password is
+    BENCH_PASSWORD (hashed once with `bcrypt_rounds`) and usernames are
+    user000000, user000001, ...
+    """
+    rng = random.Random(seed)
+    database.set_database_path(path)
+    migrate()
+
+    password_hash = bcrypt.hashpw(BENCH_PASSWORD.encode(), bcrypt.gensalt(rounds=bcrypt_rounds))
+    with database.transaction() as cursor:
+        cursor.executemany(
+            "INSERT INTO users (id, username, password_hash) VALUES (?, ?, ?)",
+            ((user_id, username_for(user_id), password_hash) for user_id in range(1, users + 1)),
+        )
+        account_rows = []
+        account_id = 0
+        for user_id in range(1, users + 1):
+            for index in range(accounts_per_user):
+                account_id += 1
+                account_rows.append((account_id, user_id, "Checking" if index == 0 else "Savings",
+                                     rng.randint(100_000, 100_000_000)))
+        cursor.executemany("INSERT INTO accounts (id, user_id, account_type, balance) VALUES (?, ?, ?, ?)",
+                           account_rows)
+
+    total_accounts = account_id
+    chunk = []
+    for account in range(1, total_accounts + 1):
+        for n in range(transactions_per_account):
+            tx_type = rng.choice(TRANSACTION_TYPES)
+            related = rng.randint(1, total_accounts) if tx_type != "deposit" else None
+            # Spread over ~a year so history ordering has real work to do
+            chunk.append((account, tx_type, rng.randint(1, 50_000),
+                          f"-{rng.randint(0, 365 * 24 * 3600)} seconds", f"bench {n}", related))
+            if len(chunk) >= 50_000:
+                _insert_transactions(chunk)
+                chunk = []
+    if chunk:
+        _insert_transactions(chunk)
+
+    return {"users": users, "accounts": total_accounts,
+            "transactions": total_accounts * transactions_per_account}
+
+
+def _insert_transactions(rows):
+    with database.transaction() as cursor:
+        cursor.executemany("""
+            INSERT INTO transactions (account_id, type, amount, timestamp, note, related_account_id)
+            VALUES (?, ?, ?, datetime('now', ?), ?, ?)
+        """, rows)
+
+
+def username_for(user_id):
+    return f"user{user_id:06d}"
@@ -0,0 +1,204 @@
+"""Month-end interest and fees for every account, in set-based batches.
+
+run_accrual("2025-01") walks the accounts table in id order, chunk by
+chunk. For each chunk one SELECT computes every account's interest and
+fee from its type and balance, the ledger rows go in with executemany and
+a single UPDATE moves all the balances, all in one transaction. Runs are
+keyed by period (migration 0007), so re-running a period is a no-op and
+an interrupted run picks up after its last committed chunk. Each chunk
+re-reads the run's cursor under the write lock, so two runs of one
+period started together never post the same accounts.
+"""
+import json
+
+from database.database import transaction, after_commit
+from database.cache import account_cache
+from database.money import Money, ZERO
+from app.event_bus import EventBus
+
+# Accounts per committed transaction
+ACCRUAL_CHUNK = 50_000
+
+# Per account type: annual interest in basis points, paid monthly on a
+# positive balance; a flat monthly fee; and the balance from which the fee
+# is waived. "*" covers every other type. A fee never takes a balance
+# below zero.
+DEFAULT_RULES = {
+    "Savings": {"interest_bps": 200, "monthly_fee": ZERO, "fee_waived_from": ZERO},
+    "Checking": {"interest_bps": 0, "monthly_fee": Money.parse("5.00"), "fee_waived_from": Money.parse("1500.00")},
+    "*": {"interest_bps": 0, "monthly_fee": ZERO, "fee_waived_from": ZERO},
+}
+
+
+def load_rules(path) -> dict:
+    # Same shape as DEFAULT_RULES, money given as strings: "5.00"
+    with open(path, "r") as f:
+        raw = json.load(f)
+    return {
+        account_type: {
+            "interest_bps": int(rule.get("interest_bps", 0)),
+            "monthly_fee": Money.parse(rule.get("monthly_fee", 0)),
+            "fee_waived_from": Money.parse(rule.get("fee_waived_from", 0)),
+        }
+        for account_type, rule in raw.items()
+    }
+
+
+def _rule_sql(rules):
+    # (interest, fee) SQL expressions over an accounts row, plus the
+    # account type parameters each one binds. The numbers are inlined as
+    # integer literals; only the type names are parameters.
+    default = rules.get("*", {"interest_bps": 0, "monthly_fee": ZERO, "fee_waived_from": ZERO})
+    named = [(name, rule) for name, rule in rules.items() if name != "*"]
+
+    def case(value):
+        whens = "".join(f" WHEN ? THEN {int(value(rule))}" for _, rule in named)
+        return f"(CASE account_type{whens} ELSE {int(value(default))} END)" if named else f"{int(value(default))}"
+
+    bps = case(lambda rule: rule["interest_bps"])
+    fee = case(lambda rule: rule["monthly_fee"].cents)
+    waived_from = case(lambda rule: rule["fee_waived_from"].cents)
+    types = [name for name, _ in named]
+
+    # Monthly interest in whole cents, rounded half up: balance * bps / 10000 / 12
+    interest_sql = f"(CASE WHEN balance > 0 THEN (balance * {bps} + 60000) / 120000 ELSE 0 END)"
+    fee_sql = f"(CASE WHEN balance < {waived_from} THEN MIN({fee}, MAX(balance, 0)) ELSE 0 END)"
+    return interest_sql, types, fee_sql, types + types
+
+
+# ------------------------ Runs ------------------------
+
+def preview_accrual(period: str, rules: dict | None = None) -> dict:
+    """What run_accrual(period) would post, without writing anything."""
+    interest_sql, interest_params, fee_sql, fee_params = _rule_sql(rules or DEFAULT_RULES)
+    with transaction() as cursor:
+        cursor.execute(f"""
+            SELECT account_type, SUM(interest > 0 OR fee > 0), SUM(interest), SUM(fee)
+            FROM (SELECT account_type, {interest_sql} AS interest, {fee_sql} AS fee FROM accounts)
+            GROUP BY account_type
+        """, interest_params + fee_params)
+        rows = cursor.fetchall()
+        cursor.execute(f"""
+            SELECT COUNT(DISTINCT user_id) FROM accounts
+            WHERE {interest_sql} > 0 OR {fee_sql} > 0
+        """, interest_params + fee_params)
+        users = cursor.fetchone()[0]
+        cursor.execute("SELECT status FROM accrual_runs WHERE period = ?", (period,))
+        run = cursor.fetchone()
+
+    by_type = {
+        row[0]: {"accounts": row[1], "interest": Money(row[2] or 0), "fees": Money(row[3] or 0)}
+        for row in rows
+    }
+    return {
+        "period": period,
+        "dry_run": True,
+        "status": run[0] if run else None,
+        "accounts": sum(entry["accounts"] for entry in by_type.values()),
+        "users": users,
+        "interest": Money(sum(row[2] or 0 for row in rows)),
+        "fees": Money(sum(row[3] or 0 for row in rows)),
+        "by_type": by_type,
+    }
+
+
+def run_accrual(period: str, rules: dict | None = None, dry_run: bool = False,
+                chunk_size: int = ACCRUAL_CHUNK) -> dict:
+    """Post interest and fees for `period` (any key, e.g. "2025-01").
+
+    Returns {"period", "dry_run", "status", "accounts", "users",
+    "interest", "fees"}; "users" counts the users notified by this call.
+    Once the run completes, account_updated is sent once per affected
+    user. A period that already completed posts nothing.
+    """
+    if dry_run:
+        return preview_accrual(period, rules)
+    interest_sql, interest_params, fee_sql, fee_params = _rule_sql(rules or DEFAULT_RULES)
+
+    with transaction(immediate=True) as cursor:
+        cursor.execute("INSERT OR IGNORE INTO accrual_runs (period) VALUES (?)", (period,))
+        cursor.execute("SELECT status, last_account_id FROM accrual_runs WHERE period = ?", (period,))
+        status, last_account_id = cursor.fetchone()
+    if status == "completed":
+        print(f"[INFO] Accrual for {period} already completed, nothing posted")
+        return _run_summary(period, users=0)
+
+    # Users notified at the end; after a resume this only covers the chunks
+    # posted by this call
+    users = set()
+    expected = last_account_id
+    while True:
+        with transaction(immediate=True) as cursor:
+            # Another run of the same period may have posted since our last
+            # chunk; the row, read under the write lock, is what counts
+            cursor.execute("SELECT status, last_account_id FROM accrual_runs WHERE period = ?", (period,))
+            status, last_account_id = cursor.fetchone()
+            if status == "completed" or last_account_id != expected:
+                print(f"[INFO] Accrual for {period} continued by another run, stopping this one")
+                after_commit(_notify_users, users)
+                break
+            cursor.execute(f"""
+                SELECT id, user_id, {interest_sql}, {fee_sql}
+                FROM accounts
+                WHERE id > ?
+                ORDER BY id
+                LIMIT ?
+            """, interest_params + fee_params + [last_account_id, chunk_size])
+            rows = cursor.fetchall()
+            if not rows:
+                cursor.execute("""
+                    UPDATE accrual_runs SET status = 'completed', completed_at = CURRENT_TIMESTAMP
+                    WHERE period = ?
+                """, (period,))
+                after_commit(_notify_users, users)
+                break
+
+            postings = []
+            posted = interest_total = fee_total = 0
+            for account_id, user_id, interest, fee in rows:
+                if interest:
+                    postings.append((account_id, "deposit", interest, f"Interest {period}"))
+                    interest_total += interest
+                if fee:
+                    postings.append((account_id, "transfer_out", fee, f"Fee {period}"))
+                    fee_total += fee
+                if interest or fee:
+                    users.add(user_id)
+                    posted += 1
+            cursor.executemany("INSERT INTO transactions (account_id, type, amount, note) VALUES (?, ?, ?, ?)",
+                               postings)
+            # SET sees the balance before the update, the same one the
+            # SELECT above computed the postings from
+            cursor.execute(f"""
+                UPDATE accounts SET balance = balance + {interest_sql} - {fee_sql}
+                WHERE id > ? AND id <= ? AND {interest_sql} != {fee_sql}
+            """, interest_params + fee_params + [last_account_id, rows[-1][0]] + interest_params + fee_params)
+            last_account_id = expected = rows[-1][0]
+            after_commit(account_cache.clear)
+            cursor.execute("""
+                UPDATE accrual_runs
+                SET last_account_id = ?, accounts = accounts + ?, interest = interest + ?, fees = fees + ?
+                WHERE period = ?
+            """, (last_account_id, posted, interest_total, fee_total, period))
+
+    return _run_summary(period, users=len(users))
+
+
+def _notify_users(user_ids):
+    for user_id in user_ids:
+        EventBus.notify("account_updated", user_id)
+
+
+def _run_summary(period, users):
+    with transaction() as cursor:
+        cursor.execute("SELECT status, accounts, interest, fees FROM accrual_runs WHERE period = ?", (period,))
+        status, accounts, interest, fees = cursor.fetchone()
+    return {
+        "period": period,
+        "dry_run": False,
+        "status": status,
+        "accounts": accounts,
+        "users": users,
+        "interest": Money(interest),
+        "fees": Money(fees),
+    }
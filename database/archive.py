@@ -0,0 +1,284 @@
+"""Hot/cold ledger: old transactions move to one archive file per month.
+
+archive_transactions() moves every transaction older than the horizon
+(the first day of the oldest month kept) out of the hot table into
+<database>-archive/ledger-YYYY-MM.db, and adds them to ledger_rollups
+(migration 0008). Balances live on accounts and past balances come from
+balance_snapshots, so neither needs the archived rows; ledger totals read
+the rollups, and history and statements open an archive only when the
+rows asked for are in it.
+
+Moving a month takes two commits: the rows are copied into the archive
+file first, then the main database drops exactly the rows the archive
+holds, in the same transaction that updates the rollups and lists the
+partition. A crash in between leaves the rows in both files, and the next
+run finishes the move.
+"""
+import datetime
+import os
+import re
+
+from database import database
+from database.database import transaction
+from database.money import Money
+
+# Months kept in the hot table, counting the current one
+DEFAULT_KEEP_MONTHS = 12
+
+# Free pages handed back to the filesystem per incremental vacuum step
+VACUUM_PAGES = 2000
+
+ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    account_id INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    timestamp DATETIME,
+    note TEXT,
+    related_account_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_archive_account_time ON transactions (account_id, timestamp, id);
+"""
+
+_COLUMNS = "id, account_id, type, amount, timestamp, note, related_account_id"
+
+_ARCHIVE_FILE = re.compile(r"^ledger-\d{4}-\d{2}\.db$")
+
+
+def archive_directory() -> str:
+    # Next to whichever database this thread is using (shards included)
+    main = database.get_connection().execute("PRAGMA database_list").fetchone()
+    return os.path.splitext(main[2])[0] + "-archive"
+
+
+def horizon_for(keep_months: int = DEFAULT_KEEP_MONTHS, today: datetime.date | None = None) -> str:
+    # First day of the oldest month that stays hot
+    today = today or datetime.date.today()
+    months = today.year * 12 + today.month - 1 - (keep_months - 1)
+    return datetime.date(months // 12, months % 12 + 1, 1).isoformat()
+
+
+def list_partitions() -> list[dict]:
+    directory = archive_directory()
+    with transaction() as cursor:
+        cursor.execute("SELECT period, filename, rows, archived_at FROM archive_partitions ORDER BY period DESC")
+        rows = cursor.fetchall()
+    return [
+        {"period": row[0], "path": os.path.join(directory, row[1]), "rows": row[2], "archived_at": row[3]}
+        for row in rows
+    ]
+
+
+def has_partitions(cursor) -> bool:
+    # MAX() is a single index lookup
+    cursor.execute("SELECT MAX(period) FROM archive_partitions")
+    return cursor.fetchone()[0] is not None
+
+
+def archived_before(cursor) -> str | None:
+    """The end of the newest archived month, which every archived row is
+    older than; None when nothing is archived.
+
+    Hot rows aren't all newer: a backdated import stays in the hot table
+    until the next archive run moves it.
+    """
+    from database.statements import month_bounds
+
+    cursor.execute("SELECT MAX(period) FROM archive_partitions")
+    period = cursor.fetchone()[0]
+    return month_bounds(period)[1] if period is not None else None
+
+
+# ------------------------ Archiving ------------------------
+
+def archive_transactions(keep_months: int = DEFAULT_KEEP_MONTHS, today: datetime.date | None = None,
+                         vacuum_pages: int = VACUUM_PAGES) -> dict:
+    """Move transactions older than the horizon into monthly archives.
+
+    Returns {"horizon", "periods", "rows", "freed_pages"}. Only rows the
+    balance snapshots already include are moved, so snapshots are caught
+    up first.
+    """
+    from database.statements import catch_up_snapshots
+
+    if keep_months < 1:
+        raise ValueError("keep at least the current month")
+    horizon = horizon_for(keep_months, today)
+    catch_up_snapshots()
+
+    with transaction() as cursor:
+        cursor.execute("SELECT last_transaction_id FROM snapshot_state WHERE id = 1")
+        watermark = cursor.fetchone()[0]
+        cursor.execute("""
+            SELECT DISTINCT substr(timestamp, 1, 7) FROM transactions
+            WHERE timestamp < ? AND id <= ?
+        """, (horizon, watermark))
+        periods = sorted(row[0] for row in cursor.fetchall())
+
+    moved = 0
+    for period in periods:
+        moved += _archive_month(period, watermark)
+    return {"horizon": horizon, "periods": periods, "rows": moved, "freed_pages": vacuum_step(vacuum_pages)}
+
+
+def _archive_month(period, watermark):
+    from database.statements import month_bounds
+
+    start, end = month_bounds(period)
+    directory = archive_directory()
+    os.makedirs(directory, exist_ok=True)
+    filename = f"ledger-{period}.db"
+    path = os.path.join(directory, filename)
+    database.get_connection(path).executescript(ARCHIVE_SCHEMA)
+    database.close_connection(path)
+
+    conn = database.get_connection()
+    conn.execute("ATTACH DATABASE ? AS archive", (path,))
+    try:
+        with transaction(immediate=True) as cursor:
+            cursor.execute(f"""
+                INSERT OR IGNORE INTO archive.transactions ({_COLUMNS})
+                SELECT {_COLUMNS} FROM main.transactions
+                WHERE timestamp >= ? AND timestamp < ? AND id <= ?
+            """, (start, end, watermark))
+
+        with transaction(immediate=True) as cursor:
+            # The hot rows the archive now holds are exactly the ones being
+            # moved, whatever an earlier, interrupted run left behind
+            cursor.execute("""
+                INSERT INTO main.ledger_rollups (account_id, day, type, amount, count)
+                SELECT account_id, substr(timestamp, 1, 10), type, SUM(amount), COUNT(*)
+                FROM main.transactions
+                WHERE id IN (SELECT id FROM archive.transactions)
+                GROUP BY account_id, substr(timestamp, 1, 10), type
+                ON CONFLICT (account_id, day, type)
+                DO UPDATE SET amount = amount + excluded.amount, count = count + excluded.count
+            """)
+            cursor.execute("DELETE FROM main.transactions WHERE id IN (SELECT id FROM archive.transactions)")
+            moved = cursor.rowcount
+            cursor.execute("""
+                INSERT INTO main.archive_partitions (period, filename, rows) VALUES (?, ?, ?)
+                ON CONFLICT (period) DO UPDATE SET rows = rows + excluded.rows, archived_at = CURRENT_TIMESTAMP
+            """, (period, filename, moved))
+    finally:
+        conn.execute("DETACH DATABASE archive")
+    print(f"[INFO] Archived {moved} transactions from {period}")
+    return moved
+
+
+def clear_archives() -> int:
+    """Empty every monthly archive file of the current database.
+
+    Left full, their old rows would come back in archived reads once their
+    month is archived again. (Transaction ids are AUTOINCREMENT and keep
+    counting after a DELETE, so new rows never collide with them.) The
+    files are emptied in place rather than deleted: archived reads keep
+    pooled connections to them, which would go on reading a deleted file.
+    Returns the number of rows removed.
+    """
+    directory = archive_directory()
+    if not os.path.isdir(directory):
+        return 0
+    removed = 0
+    for filename in sorted(os.listdir(directory)):
+        if not _ARCHIVE_FILE.match(filename):
+            continue
+        with transaction(immediate=True, path=os.path.join(directory, filename)) as cursor:
+            cursor.execute("DELETE FROM transactions")
+            removed += cursor.rowcount
+    return removed
+
+
+# ------------------------ Reading Archives ------------------------
+
+def _row_dict(row):
+    return {
+        "id": row[0],
+        "type": row[1],
+        "amount": Money(row[2]),
+        "timestamp": row[3],
+        "note": row[4],
+        "related_account_id": row[5]
+    }
+
+
+def archived_page(account_id: int, before: tuple[str, int] | None = None, limit: int = 100) -> list[dict]:
+    """Continue get_transaction_page() into the archives, newest first."""
+    page = []
+    for partition in list_partitions():
+        if before is not None and partition["period"] > before[0][:7]:
+            continue
+        with transaction(path=partition["path"]) as cursor:
+            if before is None:
+                cursor.execute("""
+                    SELECT id, type, amount, timestamp, note, related_account_id
+                    FROM transactions
+                    WHERE account_id = ?
+                    ORDER BY timestamp DESC, id DESC
+                    LIMIT ?
+                """, (account_id, limit - len(page)))
+            else:
+                cursor.execute("""
+                    SELECT id, type, amount, timestamp, note, related_account_id
+                    FROM transactions
+                    WHERE account_id = ? AND (timestamp, id) < (?, ?)
+                    ORDER BY timestamp DESC, id DESC
+                    LIMIT ?
+                """, (account_id, before[0], before[1], limit - len(page)))
+            page.extend(_row_dict(row) for row in cursor.fetchall())
+        if len(page) >= limit:
+            break
+    return page
+
+
+def archived_rows(account_id: int, since: str | None = None, until: str | None = None) -> list[tuple]:
+    """(id, type, amount, timestamp, note, related_account_id) rows of one
+    account from the archives overlapping [since, until), oldest first."""
+    rows = []
+    for partition in reversed(list_partitions()):
+        if (since is not None and partition["period"] < since[:7]) or \
+                (until is not None and partition["period"] > until[:7]):
+            continue
+        with transaction(path=partition["path"]) as cursor:
+            cursor.execute("""
+                SELECT id, type, amount, timestamp, note, related_account_id
+                FROM transactions
+                WHERE account_id = ? AND timestamp >= ? AND timestamp < ?
+                ORDER BY timestamp, id
+            """, (account_id, since or "0000-00-00", until or "9999-12-31"))
+            rows.extend(cursor.fetchall())
+    return rows
+
+
+# ------------------------ Vacuum ------------------------
+
+def enable_incremental_vacuum() -> bool:
+    """Switch an existing database to incremental auto-vacuum.
+
+    New databases get it from PRAGMAS; an older file needs one full VACUUM
+    to convert, which rewrites the whole file. Returns False if it was
+    already on.
+    """
+    conn = database.get_connection()
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return False
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    return True
+
+
+def vacuum_step(pages: int = VACUUM_PAGES) -> int:
+    """Return up to `pages` free pages to the filesystem; returns how many.
+
+    Meant to run on a schedule (after each archive run, or from cron via
+    `ledger.py vacuum`) so the file shrinks a bounded amount at a time.
+    """
+    conn = database.get_connection()
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        print("[WARN] Incremental vacuum is off for this database, see enable_incremental_vacuum()")
+        return 0
+    free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    # Through executescript: a plain execute() frees only the first page
+    conn.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+    return free_before - conn.execute("PRAGMA freelist_count").fetchone()[0]
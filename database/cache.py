@@ -0,0 +1,164 @@
+import threading
+import time
+from collections import OrderedDict
+
+from database.database import current_path, get_connection
+from app.event_bus import EventBus
+
+DEFAULT_MAX_ENTRIES = 10_000
+# How often a connection asks SQLite whether another connection committed.
+# Our own writers invalidate as they commit; this only bounds how long a
+# write from another process can go unnoticed, at one PRAGMA per interval
+# instead of one per lookup.
+EXTERNAL_CHECK_INTERVAL = 0.1
+
+
+class AccountCache:
+    """Bounded LRU read-through cache for account lookups.
+
+    Keys are ("accounts", user_id), ("balance", account_id) and
+    ("username", username), stored per database file so shards and
+    --db switches never share entries. Writers invalidate after they
+    commit; a load that overlapped an invalidation is not stored, so a
+    reader can never put back a value that was read before a concurrent
+    commit. Commits from other connections (another process, or a
+    writer that bypasses db_helper) are caught by PRAGMA data_version,
+    polled at most every EXTERNAL_CHECK_INTERVAL seconds per connection.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, check_interval=EXTERNAL_CHECK_INTERVAL):
+        self.max_entries = max_entries
+        self.check_interval = check_interval
+        self.enabled = True
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (path, kind, id) -> value
+        self._paths = {}  # (kind, id) -> paths it is cached for
+        self._usernames = {}  # user_id -> usernames cached for that user
+        self._generation = 0
+        self._data_versions = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    # ------------------------ Lookups ------------------------
+
+    def get_or_load(self, key, loader):
+        if not self.enabled:
+            return loader()
+        path = current_path()
+        self._check_external_writes(path)
+        entry = (path,) + key
+
+        with self._lock:
+            if entry in self._entries:
+                self._entries.move_to_end(entry)
+                self.hits += 1
+                return self._entries[entry]
+            self.misses += 1
+            generation = self._generation
+
+        value = loader()
+
+        with self._lock:
+            if generation == self._generation:
+                self._store(entry, key, value)
+        return value
+
+    def _store(self, entry, key, value):
+        self._entries[entry] = value
+        self._entries.move_to_end(entry)
+        self._paths.setdefault(key, set()).add(entry[0])
+        if key[0] == "username" and value is not None:
+            self._usernames.setdefault(value[0], set()).add(key[1])
+        while len(self._entries) > self.max_entries:
+            (path, *evicted), _ = self._entries.popitem(last=False)
+            self._paths.get(tuple(evicted), set()).discard(path)
+            self.evictions += 1
+
+    def _check_external_writes(self, path):
+        # data_version only moves when another connection commits, and it is
+        # per connection, so remember the last value seen on each one. A
+        # connection seen for the first time has no baseline to compare, so
+        # anything cached may predate it.
+        conn = get_connection(path)
+        seen = getattr(self._data_versions, "by_connection", None)
+        if seen is None:
+            seen = self._data_versions.by_connection = {}
+        now = time.monotonic()
+        last_version, checked_at = seen.get(conn, (None, None))
+        if checked_at is not None and now - checked_at < self.check_interval:
+            return
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        seen[conn] = (version, now)
+        if version != last_version:
+            self.clear()
+
+    # ------------------------ Invalidation ------------------------
+
+    # Invalidations drop a key for every database file: they may run on a
+    # thread that doesn't know which file the write went to (EventBus)
+
+    def invalidate_account(self, account_id, user_id=None):
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            self._drop(("balance", account_id))
+            if user_id is not None:
+                self._drop_user(user_id)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            self._drop_user(user_id)
+
+    def invalidate_username(self, username):
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            self._drop(("username", username))
+
+    def _drop(self, key):
+        for path in self._paths.pop(key, ()):
+            self._entries.pop((path,) + key, None)
+
+    def _drop_user(self, user_id):
+        self._drop(("accounts", user_id))
+        for username in self._usernames.pop(user_id, ()):
+            self._drop(("username", username))
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            self._entries.clear()
+            self._paths.clear()
+            self._usernames.clear()
+
+    # ------------------------ Reporting ------------------------
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+
+account_cache = AccountCache()
+
+# Anything that announces a change through the bus also drops stale entries
+EventBus.subscribe("account_updated", account_cache.invalidate_user)
+EventBus.subscribe("user_deleted", account_cache.invalidate_user)
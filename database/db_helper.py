@@ -1,66 +1,286 @@
+import json
+import os
 import sqlite3
-import bcrypt
-from database.database import get_connection
+from database.database import transaction, after_commit, in_transaction
+from database.cache import account_cache
+from database import archive, metrics
+from database.velocity import velocity_engine, VelocityLimitExceeded
+from database.money import MAX_CENTS, Money, ZERO
 from app.event_bus import EventBus
 
+# Reasons a transfer can be rejected, see TransferResult.error
+INVALID_AMOUNT = "invalid_amount"
+SAME_ACCOUNT = "same_account"
+INSUFFICIENT_FUNDS = "insufficient_funds"
+ACCOUNT_NOT_FOUND = "account_not_found"
+BALANCE_LIMIT = "balance_limit"  # the credit would take a balance past MAX_CENTS
+# What the API and CLI call a VelocityLimitExceeded, which every posting
+# raises rather than returns (see database.velocity)
+VELOCITY_LIMIT = "velocity_limit"
+
+# bcrypt work factor for new password hashes (each +1 doubles the cost).
+# Existing hashes keep the factor they were created with.
+BCRYPT_ROUNDS = int(os.environ.get("BANKING_BCRYPT_ROUNDS", "12"))
+
+
+class TransferResult:
+    # Written out rather than a @dataclass: importing dataclasses (and the
+    # inspect module behind it) costs more startup time than all of db_helper
+    __slots__ = ("ok", "error", "from_user_id", "to_user_id", "from_balance")
+
+    def __init__(self, ok: bool, error: str | None = None, from_user_id: int | None = None,
+                 to_user_id: int | None = None, from_balance: Money | None = None):
+        self.ok = ok
+        self.error = error
+        self.from_user_id = from_user_id
+        self.to_user_id = to_user_id
+        self.from_balance = from_balance
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"TransferResult({fields})"
+
+    def __eq__(self, other):
+        if not isinstance(other, TransferResult):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __bool__(self):
+        return self.ok
+
+
+class _TransferAborted(Exception):
+    def __init__(self, error):
+        super().__init__(error)
+        self.error = error
+
+
 # ------------------------ Admin Functions ------------------------
 
 def get_all_users() -> list[dict]:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, username FROM users")
-    users = cursor.fetchall()
-    conn.close()
+    with transaction() as cursor:
+        cursor.execute("SELECT id, username FROM users")
+        users = cursor.fetchall()
     return [{"id": row[0], "username": row[1]} for row in users]
 
 
-def delete_user_by_id(user_id: int):
-    conn = get_connection()
-    cursor = conn.cursor()
+def get_dashboard_snapshot(user_ids: list[int] | None = None, recent_n: int = 5) -> list[dict]:
+    """Users with their accounts and each account's last `recent_n` transactions.
+
+    One query for any number of users (all of them when `user_ids` is
+    None), instead of one per user and one more per account. Returns users
+    in id order as {"id", "username", "accounts": [{"account_id", "type",
+    "balance", "recent": [...]}]}, recent rows shaped like
+    get_transaction_page's.
+    """
+    if user_ids is None:
+        chosen = "SELECT id, username FROM users"
+        params = [recent_n]
+    else:
+        chosen = "SELECT id, username FROM users WHERE id IN (SELECT value FROM json_each(?))"
+        params = [json.dumps(list(user_ids)), recent_n]
+
+    # The correlated LIMIT is a top-N per account: an index seek that reads
+    # recent_n rows, where ROW_NUMBER() would number the whole history
+    with transaction() as cursor:
+        cursor.execute(f"""
+            SELECT u.id, u.username, a.id, a.account_type, a.balance,
+                   t.id, t.type, t.amount, t.timestamp, t.note, t.related_account_id
+            FROM ({chosen}) AS u
+            LEFT JOIN accounts a ON a.user_id = u.id
+            LEFT JOIN transactions t ON t.id IN (
+                SELECT id FROM transactions
+                WHERE account_id = a.id
+                ORDER BY timestamp DESC, id DESC
+                LIMIT ?
+            )
+            ORDER BY u.id, a.id, t.timestamp DESC, t.id DESC
+        """, params)
+        rows = cursor.fetchall()
+
+    users = []
+    user = account = None
+    for row in rows:
+        if user is None or user["id"] != row[0]:
+            user = {"id": row[0], "username": row[1], "accounts": []}
+            users.append(user)
+            account = None
+        if row[2] is None:
+            continue  # No accounts
+        if account is None or account["account_id"] != row[2]:
+            account = {"account_id": row[2], "type": row[3], "balance": Money(row[4]), "recent": []}
+            user["accounts"].append(account)
+        if row[5] is not None:
+            account["recent"].append({
+                "id": row[5],
+                "type": row[6],
+                "amount": Money(row[7]),
+                "timestamp": row[8],
+                "note": row[9],
+                "related_account_id": row[10]
+            })
+    return users
+
+
+# SQLite's NOCASE folds only ASCII letters; str.lower() would also fold
+# "É" to "é", which NOCASE orders and compares as different characters
+_NOCASE = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
+def fold_nocase(text: str) -> str:
+    """`text` as COLLATE NOCASE compares it, for sorting in Python."""
+    return text.translate(_NOCASE)
+
+
+def search_users(query: str = "", after: tuple[str, int] | None = None, limit: int = 100,
+                 substring: bool = False) -> list[dict]:
+    """One page of users whose username starts with (or contains) `query`.
+
+    Case-insensitive, ordered by username then id. Pass the (username, id)
+    of the last row you have as `after` for the next page. Prefix search
+    is an index range; substring search uses the trigram index when
+    enable_username_trigram_index() has created it, else a LIKE scan.
+    """
+    conditions = []
+    params = []
+    query = query.strip()
+    source = "users"
+    if query and substring:
+        if len(query) >= 3 and _has_username_trigram_index():
+            # Trigrams need at least three characters to match on
+            source = "users_fts JOIN users ON users.id = users_fts.rowid"
+            conditions.append("users_fts MATCH ?")
+            params.append('"' + query.replace('"', '""') + '"')
+        else:
+            conditions.append("users.username LIKE ? ESCAPE '\\'")
+            params.append("%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+    elif query:
+        # Bumping the last character of the folded prefix gives the end of
+        # the range
+        prefix = fold_nocase(query)
+        conditions.append("users.username >= ? COLLATE NOCASE AND users.username < ? COLLATE NOCASE")
+        params.extend([prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)])
+    if after is not None:
+        # The plain >= bound is what lets SQLite seek instead of scanning
+        conditions.append("users.username >= ? COLLATE NOCASE AND (users.username COLLATE NOCASE, users.id) > (?, ?)")
+        params.extend([after[0], after[0], after[1]])
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    with transaction() as cursor:
+        cursor.execute(f"""
+            SELECT users.id, users.username,
+                   (SELECT COUNT(*) FROM accounts WHERE user_id = users.id),
+                   (SELECT TOTAL(balance) FROM accounts WHERE user_id = users.id)
+            FROM {source}
+            {where}
+            ORDER BY users.username COLLATE NOCASE, users.id
+            LIMIT ?
+        """, params + [limit])
+        rows = cursor.fetchall()
+
+    return [
+        {"id": row[0], "username": row[1], "accounts": row[2], "total_balance": Money(int(row[3]))}
+        for row in rows
+    ]
+
+
+def enable_username_trigram_index() -> bool:
+    """Create the FTS5 trigram index search_users(substring=True) uses.
+
+    Optional: without it substring search scans the usernames. Returns
+    False when this SQLite build has no FTS5 trigram tokenizer.
+    """
+    try:
+        with transaction(immediate=True) as cursor:
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS users_fts
+                USING fts5(username, content='users', content_rowid='id', tokenize='trigram')
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+                    INSERT INTO users_fts (rowid, username) VALUES (new.id, new.username);
+                END
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+                    INSERT INTO users_fts (users_fts, rowid, username) VALUES ('delete', old.id, old.username);
+                END
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF username ON users BEGIN
+                    INSERT INTO users_fts (users_fts, rowid, username) VALUES ('delete', old.id, old.username);
+                    INSERT INTO users_fts (rowid, username) VALUES (new.id, new.username);
+                END
+            """)
+            cursor.execute("INSERT INTO users_fts (users_fts) VALUES ('rebuild')")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _has_username_trigram_index():
+    with transaction() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'")
+        return cursor.fetchone() is not None
 
-    # Delete accounts (transactions remain, due to FK)
-    cursor.execute("DELETE FROM accounts WHERE user_id = ?", (user_id,))
-    cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
 
-    from app.event_bus import EventBus
-    EventBus.notify("user_deleted", user_id)
+def delete_user_by_id(user_id: int):
+    # Delete accounts (transactions remain, so FK enforcement is off for this one)
+    with transaction(foreign_keys=False) as cursor:
+        cursor.execute("DELETE FROM accounts WHERE user_id = ? RETURNING id", (user_id,))
+        account_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
 
-    conn.commit()
-    conn.close()
+        for account_id in account_ids:
+            after_commit(account_cache.invalidate_account, account_id)
+        after_commit(account_cache.invalidate_user, user_id)
+        after_commit(EventBus.notify, "user_deleted", user_id)
 
 
 def delete_all_users():
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM transactions")
-    cursor.execute("DELETE FROM accounts")
-    cursor.execute("DELETE FROM users")
-    conn.commit()
-    conn.close()
+    # Archives first, so a failure in between leaves a reset that running
+    # again completes, never full archive files without partition rows
+    archive.clear_archives()
+    with transaction() as cursor:
+        cursor.execute("DELETE FROM transactions")
+        cursor.execute("DELETE FROM balance_snapshots")
+        cursor.execute("DELETE FROM ledger_rollups")
+        cursor.execute("DELETE FROM archive_partitions")
+        cursor.execute("DELETE FROM accounts")
+        cursor.execute("DELETE FROM users")
+        after_commit(account_cache.clear)
 
 
 # ------------------------ User Functions ------------------------
 
 def create_user(username: str, password: str) -> bool:
-    conn = get_connection()
-    cursor = conn.cursor()
+    # bcrypt is imported where it is used, so commands that never hash a
+    # password don't pay for loading it
+    import bcrypt
+
+    password_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS))
     try:
-        password_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
-        cursor.execute("INSERT INTO users (username, password_hash) VALUES (?, ?)", (username, password_hash))
-        conn.commit()
+        with transaction() as cursor:
+            cursor.execute("INSERT INTO users (username, password_hash) VALUES (?, ?)", (username, password_hash))
+            after_commit(account_cache.invalidate_username, username)
         return True
     except sqlite3.IntegrityError:
         return False  # Username already exists
-    finally:
-        conn.close()
+
+
+def set_bcrypt_rounds(rounds: int):
+    global BCRYPT_ROUNDS
+    if not 4 <= rounds <= 31:
+        raise ValueError("bcrypt rounds must be between 4 and 31")
+    BCRYPT_ROUNDS = rounds
 
 
 def authenticate_user(username: str, password: str) -> int | None:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, password_hash FROM users WHERE username = ?", (username,))
-    row = cursor.fetchone()
-    conn.close()
+    import bcrypt
+
+    with transaction() as cursor:
+        cursor.execute("SELECT id, password_hash FROM users WHERE username = ?", (username,))
+        row = cursor.fetchone()
 
     if row and bcrypt.checkpw(password.encode(), row[1]):
         return row[0]  # Return user ID
@@ -70,185 +290,509 @@ def authenticate_user(username: str, password: str) -> int | None:
 # ------------------------ Account Functions ------------------------
 
 def create_account(user_id: int, account_type: str) -> int:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO accounts (user_id, account_type, balance) VALUES (?, ?, ?)", (user_id, account_type, 0.0))
-    conn.commit()
-    account_id = cursor.lastrowid
-    conn.close()
-    return account_id
+    with transaction() as cursor:
+        cursor.execute("INSERT INTO accounts (user_id, account_type, balance) VALUES (?, ?, ?)", (user_id, account_type, 0))
+        after_commit(account_cache.invalidate_user, user_id)
+        return cursor.lastrowid
 
 
-def get_accounts(user_id: int) -> list[dict]:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, account_type, balance FROM accounts WHERE user_id = ?", (user_id,))
-    rows = cursor.fetchall()
-    conn.close()
+def _cached(key, loader):
+    # Reads inside an open write transaction must see its own changes
+    if in_transaction():
+        return loader()
+    return account_cache.get_or_load(key, loader)
+
 
+def get_accounts(user_id: int) -> list[dict]:
+    rows = _cached(("accounts", user_id), lambda: _load_accounts(user_id))
     return [
-        {"account_id": row[0], "type": row[1], "balance": row[2]}
+        {"account_id": row[0], "type": row[1], "balance": Money(row[2])}
         for row in rows
     ]
 
 
-def get_account_balance(account_id: int) -> float | None:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT balance FROM accounts WHERE id = ?", (account_id,))
-    row = cursor.fetchone()
-    conn.close()
+def _load_accounts(user_id):
+    with transaction() as cursor:
+        cursor.execute("SELECT id, account_type, balance FROM accounts WHERE user_id = ?", (user_id,))
+        return tuple(cursor.fetchall())
+
+
+def get_account_balance(account_id: int) -> Money | None:
+    cents = _cached(("balance", account_id), lambda: _load_balance(account_id))
+    return Money(cents) if cents is not None else None
+
+
+def _load_balance(account_id):
+    with transaction() as cursor:
+        cursor.execute("SELECT balance FROM accounts WHERE id = ?", (account_id,))
+        row = cursor.fetchone()
     return row[0] if row else None
 
 
-# ------------------------ Transaction Functions ------------------------
+def get_user_id_by_username(username: str) -> int | None:
+    entry = _cached(("username", username), lambda: _load_username(username))
+    return entry[0] if entry else None
 
-def deposit(account_id: int, amount: float, note: str = "Deposit") -> bool:
-    if amount <= 0:
-        return False
 
-    conn = get_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("UPDATE accounts SET balance = balance + ? WHERE id = ?", (amount, account_id))
+def get_user_accounts_by_username(username: str) -> list[dict]:
+    entry = _cached(("username", username), lambda: _load_username(username))
+    if not entry:
+        return []
+    return [
+        {"account_id": row[0], "type": row[1], "balance": Money(row[2])}
+        for row in entry[1]
+    ]
+
+
+def _load_username(username):
+    with transaction() as cursor:
+        cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
+        user = cursor.fetchone()
+        if not user:
+            return None
         cursor.execute("""
-            INSERT INTO transactions (account_id, type, amount, note)
-            VALUES (?, 'deposit', ?, ?)
-        """, (account_id, amount, note))
+            SELECT id, account_type, balance
+            FROM accounts
+            WHERE user_id = ?
+            ORDER BY id ASC
+        """, (user[0],))
+        return (user[0], tuple(cursor.fetchall()))
 
-        # Find user ID and notify event
-        cursor.execute("SELECT user_id FROM accounts WHERE id = ?", (account_id,))
-        row = cursor.fetchone()
-        if row:
-            EventBus.notify("account_updated", row[0])
 
-        conn.commit()
-        return True
-    finally:
-        conn.close()
+# ------------------------ Transaction Functions ------------------------
+
+def _amount(value) -> Money | None:
+    # Postings take Money or anything Money.parse accepts; None means invalid
+    try:
+        amount = Money.parse(value)
+    except ValueError:
+        return None
+    return amount if amount > ZERO else None
 
 
-def transfer_funds(from_account: int, to_account: int, amount: float, note: str = "Transfer") -> bool:
-    if amount <= 0 or from_account == to_account:
+def deposit(account_id: int, amount: Money, note: str = "Deposit") -> bool:
+    amount = _amount(amount)
+    if amount is None:
         return False
 
-    conn = get_connection()
-    cursor = conn.cursor()
+    try:
+        with transaction() as cursor:
+            cursor.execute("UPDATE accounts SET balance = balance + ? WHERE id = ? RETURNING user_id",
+                           (amount.cents, account_id))
+            row = cursor.fetchone()
+            if not row:
+                return False  # No such account
+            if velocity_engine.enabled:
+                velocity_engine.check("deposit", account_id, row[0], amount.cents)  # Raising rolls back
+            cursor.execute("""
+                INSERT INTO transactions (account_id, type, amount, note)
+                VALUES (?, 'deposit', ?, ?)
+            """, (account_id, amount.cents, note))
+
+            # Notify the owner once committed
+            after_commit(account_cache.invalidate_account, account_id, row[0])
+            after_commit(EventBus.notify, "account_updated", row[0])
+    except sqlite3.IntegrityError:
+        return False  # The balance would pass MAX_CENTS (migration 0009's CHECK)
 
-    # Check sufficient funds
-    cursor.execute("SELECT balance FROM accounts WHERE id = ?", (from_account,))
-    from_balance = cursor.fetchone()
-    if not from_balance or from_balance[0] < amount:
-        conn.close()
+    return True
+
+
+def record_withdrawal(account_id: int, amount: Money, note: str = "Withdrawal") -> bool:
+    amount = _amount(amount)
+    if amount is None:
         return False
 
     try:
-        # Withdraw from source
-        cursor.execute("UPDATE accounts SET balance = balance - ? WHERE id = ?", (amount, from_account))
-        cursor.execute("""
-            INSERT INTO transactions (account_id, type, amount, note, related_account_id)
-            VALUES (?, 'transfer_out', ?, ?, ?)
-        """, (from_account, amount, note, to_account))
-
-        # Deposit into destination
-        cursor.execute("UPDATE accounts SET balance = balance + ? WHERE id = ?", (amount, to_account))
-        cursor.execute("""
-            INSERT INTO transactions (account_id, type, amount, note, related_account_id)
-            VALUES (?, 'transfer_in', ?, ?, ?)
-        """, (to_account, amount, note, from_account))
-
-        # Notify both users
-        cursor.execute("SELECT user_id FROM accounts WHERE id = ?", (from_account,))
-        from_user = cursor.fetchone()
-        cursor.execute("SELECT user_id FROM accounts WHERE id = ?", (to_account,))
-        to_user = cursor.fetchone()
-
-        if from_user:
-            EventBus.notify("account_updated", from_user[0])
-        if to_user and to_user != from_user:
-            EventBus.notify("account_updated", to_user[0])
-
-        conn.commit()
+        with transaction() as cursor:
+            # Conditional debit, so concurrent callers can't overdraw the account
+            cursor.execute("""
+                UPDATE accounts SET balance = balance - ?
+                WHERE id = ? AND balance >= ?
+                RETURNING user_id
+            """, (amount.cents, account_id, amount.cents))
+            row = cursor.fetchone()
+            if not row:
+                return False  # Unknown account or insufficient funds
+            if velocity_engine.enabled:
+                velocity_engine.check("withdrawal", account_id, row[0], amount.cents)
+            cursor.execute("""
+                INSERT INTO transactions (account_id, type, amount, note)
+                VALUES (?, 'transfer_out', ?, ?)
+            """, (account_id, amount.cents, note))
+
+            # Notify the owner once committed
+            after_commit(account_cache.invalidate_account, account_id, row[0])
+            after_commit(EventBus.notify, "account_updated", row[0])
         return True
+    except (sqlite3.OperationalError, VelocityLimitExceeded):
+        raise  # Locked/busy database or a velocity rule: not a failed posting, let the caller see it
     except Exception as e:
-        print("[ERROR]", e)
-        conn.rollback()
+        print("[ERROR] withdrawal:", e)
         return False
-    finally:
-        conn.close()
+
+
+def transfer_funds(from_account: int, to_account: int, amount: Money, note: str = "Transfer",
+                   note_in: str | None = None) -> TransferResult:
+    amount = _amount(amount)
+    if amount is None:
+        return TransferResult(False, INVALID_AMOUNT)
+    if from_account == to_account:
+        return TransferResult(False, SAME_ACCOUNT)
+
+    try:
+        with transaction(immediate=True) as cursor:
+            # Conditional debit: only succeeds when the funds are there
+            cursor.execute("""
+                UPDATE accounts SET balance = balance - ?
+                WHERE id = ? AND balance >= ?
+                RETURNING user_id, balance
+            """, (amount.cents, from_account, amount.cents))
+            debited = cursor.fetchone()
+            if not debited:
+                cursor.execute("SELECT 1 FROM accounts WHERE id = ?", (from_account,))
+                error = INSUFFICIENT_FUNDS if cursor.fetchone() else ACCOUNT_NOT_FOUND
+                return TransferResult(False, error)
+            if velocity_engine.enabled:
+                velocity_engine.check("transfer", from_account, debited[0], amount.cents, to_account)  # Raising rolls back
+
+            cursor.execute("UPDATE accounts SET balance = balance + ? WHERE id = ? RETURNING user_id",
+                           (amount.cents, to_account))
+            credited = cursor.fetchone()
+            if not credited:
+                raise _TransferAborted(ACCOUNT_NOT_FOUND)
+
+            cursor.executemany("""
+                INSERT INTO transactions (account_id, type, amount, note, related_account_id)
+                VALUES (?, ?, ?, ?, ?)
+            """, [
+                (from_account, "transfer_out", amount.cents, note, to_account),
+                (to_account, "transfer_in", amount.cents, note_in or note, from_account),
+            ])
+
+            # Notify both users once the transfer is committed
+            after_commit(account_cache.invalidate_account, from_account, debited[0])
+            after_commit(account_cache.invalidate_account, to_account, credited[0])
+            after_commit(EventBus.notify, "account_updated", debited[0])
+            if credited[0] != debited[0]:
+                after_commit(EventBus.notify, "account_updated", credited[0])
+
+        return TransferResult(True, from_user_id=debited[0], to_user_id=credited[0], from_balance=Money(debited[1]))
+    except _TransferAborted as e:
+        return TransferResult(False, e.error)
+    except sqlite3.IntegrityError:
+        return TransferResult(False, BALANCE_LIMIT)
+    except sqlite3.Error as e:
+        print("[ERROR] transfer:", e)
+        return TransferResult(False, str(e))
 
 
 def get_transaction_history(account_id: int) -> list[dict]:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT type, amount, timestamp, note, related_account_id
-        FROM transactions
-        WHERE account_id = ?
-        ORDER BY timestamp DESC
-    """, (account_id,))
-    rows = cursor.fetchall()
-    conn.close()
+    with transaction() as cursor:
+        cursor.execute("""
+            SELECT id, type, amount, timestamp, note, related_account_id
+            FROM transactions
+            WHERE account_id = ?
+            ORDER BY timestamp DESC, id DESC
+        """, (account_id,))
+        rows = cursor.fetchall()
+        if archive.has_partitions(cursor):
+            # Merged, not appended: backdated hot rows can be older than archived ones
+            rows = sorted(rows + archive.archived_rows(account_id), key=lambda row: (row[3], row[0]), reverse=True)
 
     return [
         {
-            "type": row[0],
-            "amount": row[1],
-            "timestamp": row[2],
-            "note": row[3],
-            "related_account_id": row[4]
+            "type": row[1],
+            "amount": Money(row[2]),
+            "timestamp": row[3],
+            "note": row[4],
+            "related_account_id": row[5]
         }
         for row in rows
     ]
 
-def get_account_balance(account_id: int) -> float | None:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT balance FROM accounts WHERE id = ?", (account_id,))
-    row = cursor.fetchone()
-    conn.close()
-    return row[0] if row else None
-
-
-def record_withdrawal(account_id: int, amount: float, note: str = "Withdrawal") -> bool:
-    conn = get_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("UPDATE accounts SET balance = balance - ? WHERE id = ?", (amount, account_id))
-        cursor.execute("""
-            INSERT INTO transactions (account_id, type, amount, note)
-            VALUES (?, 'transfer_out', ?, ?)
-        """, (account_id, amount, note))
-
-        # Find user ID and notify
-        cursor.execute("SELECT user_id FROM accounts WHERE id = ?", (account_id,))
-        row = cursor.fetchone()
-        if row:
-            EventBus.notify("account_updated", row[0])
-
-        conn.commit()
-        return True
-    except Exception as e:
-        print("[ERROR] withdrawal:", e)
-        conn.rollback()
-        return False
-    finally:
-        conn.close()
-
-def get_user_accounts_by_username(username: str) -> list[dict]:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT a.id, a.account_type, a.balance
-        FROM accounts a
-        JOIN users u ON a.user_id = u.id
-        WHERE u.username = ?
-        ORDER BY a.id ASC
-    """, (username,))
-    rows = cursor.fetchall()
-    conn.close()
 
-    return [
-        {"account_id": row[0], "type": row[1], "balance": row[2]}
+def get_transaction_page(account_id: int, before: tuple[str, int] | None = None, limit: int = 100) -> list[dict]:
+    # Keyset pagination, newest first: pass the (timestamp, id) of the last
+    # row you have as `before` to get the next page. Cost depends on `limit`,
+    # not on how long the account's history is. Archives are only opened
+    # once the page reaches the archived months.
+    if limit < 1:
+        raise ValueError("limit must be at least 1")  # LIMIT -1 would read everything
+    with transaction() as cursor:
+        if before is None:
+            cursor.execute("""
+                SELECT id, type, amount, timestamp, note, related_account_id
+                FROM transactions
+                WHERE account_id = ?
+                ORDER BY timestamp DESC, id DESC
+                LIMIT ?
+            """, (account_id, limit))
+        else:
+            cursor.execute("""
+                SELECT id, type, amount, timestamp, note, related_account_id
+                FROM transactions
+                WHERE account_id = ? AND (timestamp, id) < (?, ?)
+                ORDER BY timestamp DESC, id DESC
+                LIMIT ?
+            """, (account_id, before[0], before[1], limit))
+        rows = cursor.fetchall()
+        boundary = archive.archived_before(cursor)
+        archived = boundary is not None and (len(rows) < limit or rows[-1][3] < boundary)
+
+    page = [
+        {
+            "id": row[0],
+            "type": row[1],
+            "amount": Money(row[2]),
+            "timestamp": row[3],
+            "note": row[4],
+            "related_account_id": row[5]
+        }
         for row in rows
-    ]
\ No newline at end of file
+    ]
+    if archived:
+        if rows and rows[-1][3] >= boundary:
+            # Every hot row is newer than the archives, which just continue the page
+            page += archive.archived_page(account_id, (rows[-1][3], rows[-1][0]), limit - len(page))
+        else:
+            # Backdated hot rows sit among the archived ones: merge by (timestamp, id)
+            page = sorted(page + archive.archived_page(account_id, before, limit),
+                          key=lambda row: (row["timestamp"], row["id"]), reverse=True)[:limit]
+    return page
+
+# ------------------------ Ledger Totals ------------------------
+
+# Columns get_ledger_totals can group by; at most one period at a time.
+# Timestamps are SQLite's "YYYY-MM-DD HH:MM:SS" text, so a prefix is the
+# period and is much cheaper than strftime over millions of rows.
+_TOTAL_GROUPS = {
+    "account": "account_id",
+    "type": "type",
+    "day": "substr(timestamp, 1, 10)",
+    "month": "substr(timestamp, 1, 7)",
+    "year": "substr(timestamp, 1, 4)",
+}
+_PERIODS = ("day", "month", "year")
+
+
+def get_ledger_totals(group_by: tuple[str, ...] = ("account",), account_ids: list[int] | None = None,
+                      since: str | None = None, until: str | None = None) -> list[dict]:
+    """Exact ledger totals, summed by SQLite over integer cents.
+
+    `group_by` takes any of "account", "type" and one of "day", "month" or
+    "year". Each result has those keys plus "credits", "debits", "net"
+    (Money) and "count". `account_ids` limits the accounts and
+    `since`/`until` ("YYYY-MM-DD[ HH:MM:SS]") bound the timestamps, until
+    being exclusive.
+    """
+    unknown = [name for name in group_by if name not in _TOTAL_GROUPS]
+    if unknown:
+        raise ValueError(f"can't group ledger totals by {', '.join(unknown)}")
+    if sum(name in _PERIODS for name in group_by) > 1:
+        raise ValueError("group by at most one of day, month and year")
+
+    conditions = []
+    params = []
+    if account_ids is not None:
+        conditions.append("account_id IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps(list(account_ids)))
+    if since is not None:
+        conditions.append("timestamp >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append("timestamp < ?")
+        params.append(until)
+
+    columns = [_TOTAL_GROUPS[name] for name in group_by]
+    select = "".join(f"{column}, " for column in columns)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    grouping = f"GROUP BY {', '.join(columns)} ORDER BY {', '.join(columns)}" if columns else ""
+
+    with transaction() as cursor:
+        cursor.execute(f"""
+            SELECT {select}
+                   SUM(CASE WHEN type = 'transfer_out' THEN 0 ELSE amount END),
+                   SUM(CASE WHEN type = 'transfer_out' THEN amount ELSE 0 END),
+                   COUNT(*)
+            FROM transactions
+            {where}
+            {grouping}
+        """, params)
+        rows = cursor.fetchall()
+        if archive.has_partitions(cursor):
+            # Archived rows are summed per day, so they count by day against
+            # since/until
+            cursor.execute(f"""
+                SELECT {select}
+                       SUM(CASE WHEN type = 'transfer_out' THEN 0 ELSE amount END),
+                       SUM(CASE WHEN type = 'transfer_out' THEN amount ELSE 0 END),
+                       SUM(count)
+                FROM (SELECT account_id, type, day AS timestamp, amount, count FROM ledger_rollups)
+                {where}
+                {grouping}
+            """, params)
+            rows = _merge_totals(rows, cursor.fetchall(), len(columns))
+
+    totals = []
+    for row in rows:
+        credits, debits, count = row[-3] or 0, row[-2] or 0, row[-1]
+        entry = dict(zip(group_by, row))
+        entry.update(credits=Money(credits), debits=Money(debits), net=Money(credits - debits), count=count)
+        totals.append(entry)
+    return totals
+
+
+def _merge_totals(rows, more, width):
+    merged = {}
+    for row in rows + more:
+        key = tuple(row[:width])
+        sums = merged.get(key, (0, 0, 0))
+        merged[key] = tuple(total + (value or 0) for total, value in zip(sums, row[width:]))
+    return [key + merged[key] for key in sorted(merged)]
+
+
+def reconcile_balances(account_ids: list[int] | None = None) -> dict:
+    """Check stored account balances against the ledger.
+
+    The ledger side is get_ledger_totals()'s net per account, archived
+    rows included, read in the same transaction as the balances. Returns
+    {"accounts": number checked, "mismatches": [{"account_id", "balance",
+    "ledger", "difference"}]}, by account id.
+    """
+    with transaction() as cursor:
+        if account_ids is None:
+            cursor.execute("SELECT id, balance FROM accounts ORDER BY id")
+        else:
+            cursor.execute("SELECT id, balance FROM accounts WHERE id IN (SELECT value FROM json_each(?)) ORDER BY id",
+                           (json.dumps(list(account_ids)),))
+        balances = cursor.fetchall()
+        ledger = {row["account"]: row["net"] for row in get_ledger_totals(("account",), account_ids)}
+
+    mismatches = []
+    for account_id, cents in balances:
+        balance, net = Money(cents), ledger.get(account_id, ZERO)
+        if balance != net:
+            mismatches.append({"account_id": account_id, "balance": balance, "ledger": net,
+                               "difference": balance - net})
+    return {"accounts": len(balances), "mismatches": mismatches}
+
+# ------------------------ Batch Posting ------------------------
+
+def post_batch(operations: list[dict]) -> list[dict]:
+    """Apply many deposits/withdrawals/transfers in one transaction.
+
+    Each operation is a dict with a "type" of "deposit", "withdrawal" or
+    "transfer" plus "account_id" (or "from_account"/"to_account" for
+    transfers), "amount" (Money or anything Money.parse accepts) and an
+    optional "note". Rows are applied in order
+    against running balances; a rejected row does not affect the others.
+    Returns one {"ok": bool, "error": str | None} per operation.
+    """
+    results = [_validate_batch_operation(op) for op in operations]
+
+    account_ids = set()
+    for op, result in zip(operations, results):
+        if result["ok"]:
+            account_ids.update(_batch_accounts(op))
+
+    touched_users = set()
+    if account_ids:
+        with transaction(immediate=True) as cursor:
+            cursor.execute("""
+                SELECT id, user_id, balance FROM accounts
+                WHERE id IN (SELECT value FROM json_each(?))
+            """, (json.dumps(sorted(account_ids)),))
+            owners = {}
+            balances = {}
+            for account_id, user_id, balance in cursor.fetchall():
+                owners[account_id] = user_id
+                balances[account_id] = balance
+
+            deltas = {}
+            ledger_rows = []
+            for op, result in zip(operations, results):
+                if not result["ok"]:
+                    continue
+                if any(account_id not in balances for account_id in _batch_accounts(op)):
+                    result.update(ok=False, error=ACCOUNT_NOT_FOUND)
+                    continue
+
+                amount = Money.parse(op["amount"]).cents
+                note = op.get("note")
+                if op["type"] == "deposit":
+                    account_id = op["account_id"]
+                    changes = [(account_id, amount)]
+                    rows = [(account_id, "deposit", amount, note or "Deposit", None)]
+                elif op["type"] == "withdrawal":
+                    account_id = op["account_id"]
+                    changes = [(account_id, -amount)]
+                    rows = [(account_id, "transfer_out", amount, note or "Withdrawal", None)]
+                else:
+                    from_account, to_account = op["from_account"], op["to_account"]
+                    changes = [(from_account, -amount), (to_account, amount)]
+                    rows = [
+                        (from_account, "transfer_out", amount, note or "Transfer", to_account),
+                        (to_account, "transfer_in", amount, op.get("note_in") or note or "Transfer", from_account),
+                    ]
+
+                debit_account, debit = changes[0]
+                if debit < 0 and balances[debit_account] + debit < 0:
+                    result.update(ok=False, error=INSUFFICIENT_FUNDS)
+                    continue
+                if any(change > 0 and balances[account_id] + change > MAX_CENTS for account_id, change in changes):
+                    result.update(ok=False, error=BALANCE_LIMIT)
+                    continue
+
+                ledger_rows.extend(rows)
+                for account_id, change in changes:
+                    balances[account_id] += change
+                    deltas[account_id] = deltas.get(account_id, 0) + change
+                    touched_users.add(owners[account_id])
+
+            cursor.executemany("UPDATE accounts SET balance = balance + ? WHERE id = ?",
+                               [(delta, account_id) for account_id, delta in deltas.items()])
+            for account_id in deltas:
+                after_commit(account_cache.invalidate_account, account_id, owners[account_id])
+            cursor.executemany("""
+                INSERT INTO transactions (account_id, type, amount, note, related_account_id)
+                VALUES (?, ?, ?, ?, ?)
+            """, ledger_rows)
+
+    # One combined notification per affected user
+    for user_id in sorted(touched_users):
+        after_commit(EventBus.notify, "account_updated", user_id)
+
+    return results
+
+
+_BATCH_TYPES = ("deposit", "withdrawal", "transfer")
+
+
+def _validate_batch_operation(op):
+    op_type = op.get("type")
+    if op_type not in _BATCH_TYPES:
+        return {"ok": False, "error": "unknown_type"}
+    if _amount(op.get("amount")) is None:
+        return {"ok": False, "error": INVALID_AMOUNT}
+    if op_type == "transfer":
+        if op.get("from_account") is None or op.get("to_account") is None:
+            return {"ok": False, "error": ACCOUNT_NOT_FOUND}
+        if op["from_account"] == op["to_account"]:
+            return {"ok": False, "error": SAME_ACCOUNT}
+    elif op.get("account_id") is None:
+        return {"ok": False, "error": ACCOUNT_NOT_FOUND}
+    return {"ok": True, "error": None}
+
+
+def _batch_accounts(op):
+    if op["type"] == "transfer":
+        return (op["from_account"], op["to_account"])
+    return (op["account_id"],)
+
+
+# ------------------------ Instrumentation ------------------------
+
+# Every public function above reports to database.metrics (a flag check
+# while metrics are off)
+metrics.instrument_module(globals())
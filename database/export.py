@@ -0,0 +1,257 @@
+import csv
+import datetime
+import json
+
+from database import archive
+from database.database import transaction, after_commit
+from database.cache import account_cache
+from database.money import MAX_CENTS, Money
+from app.event_bus import EventBus
+
+EXPORT_COLUMNS = ("id", "account_id", "type", "amount", "timestamp", "note", "related_account_id")
+FORMATS = ("csv", "ndjson")
+
+# Rows per fetchmany() on export and per committed batch on import
+CHUNK_SIZE = 10_000
+
+_TRANSACTION_TYPES = ("deposit", "transfer_in", "transfer_out")
+
+# SQLite's CURRENT_TIMESTAMP format, which every timestamp query compares as text
+_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+# ------------------------ Export ------------------------
+
+def iter_transactions(account_ids: list[int] | None = None, user_id: int | None = None,
+                      since: str | None = None, until: str | None = None, chunk_size: int = CHUNK_SIZE):
+    """Yield ledger rows as tuples in EXPORT_COLUMNS order, amount in cents.
+
+    Rows are read in keyset-paged chunks of `chunk_size`, each in its own
+    short read transaction, so memory stays flat however many match and a
+    slow consumer never holds a snapshot open (which would stop WAL
+    checkpoints). The export is therefore not one snapshot: a row
+    committed meanwhile appears if it sorts after the rows already read.
+    `until` is exclusive. Archived months (database/archive.py) come
+    first, oldest first, then the hot table.
+    """
+    # With an account filter, rows go out per account in (timestamp, id)
+    # order, each account one index range; otherwise in id order
+    accounts = None
+    if account_ids is not None or user_id is not None:
+        accounts = set(account_ids) if account_ids is not None else None
+        if user_id is not None:
+            with transaction() as cursor:
+                cursor.execute("SELECT id FROM accounts WHERE user_id = ?", (user_id,))
+                owned = {row[0] for row in cursor.fetchall()}
+            accounts = owned if accounts is None else accounts & owned
+        accounts = sorted(accounts)
+
+    conditions = []
+    params = []
+    if since is not None:
+        conditions.append("timestamp >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append("timestamp < ?")
+        params.append(until)
+
+    with transaction() as cursor:
+        archived = archive.has_partitions(cursor)
+    paths = []
+    if archived:
+        for partition in reversed(archive.list_partitions()):
+            if (since is not None and partition["period"] < since[:7]) or \
+                    (until is not None and partition["period"] > until[:7]):
+                continue
+            paths.append(partition["path"])
+    paths.append(None)  # the hot table
+
+    for path in paths:
+        if accounts is None:
+            yield from _paged(path, None, conditions, params, chunk_size)
+        else:
+            for account_id in accounts:
+                yield from _paged(path, account_id, conditions, params, chunk_size)
+
+
+def _paged(path, account_id, conditions, params, chunk_size):
+    # Each chunk resumes after the last row of the previous one
+    if account_id is not None:
+        conditions = ["account_id = ?"] + conditions
+        params = [account_id] + params
+        order, after = "timestamp, id", "(timestamp, id) > (?, ?)"
+    else:
+        order, after = "id", "id > ?"
+    last = None
+    while True:
+        where = conditions + [after] if last is not None else conditions
+        with transaction(path=path) as cursor:
+            cursor.execute(f"""
+                SELECT {', '.join(EXPORT_COLUMNS)}
+                FROM transactions
+                {f"WHERE {' AND '.join(where)}" if where else ""}
+                ORDER BY {order}
+                LIMIT ?
+            """, params + (last or []) + [chunk_size])
+            rows = cursor.fetchall()
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last = [rows[-1][4], rows[-1][0]] if account_id is not None else [rows[-1][0]]
+
+
+def export_transactions(out, fmt: str = "csv", **filters) -> int:
+    """Write matching transactions to the text stream `out`; returns the row count.
+
+    Amounts are written in dollars ("12.34"). `filters` are those of
+    iter_transactions.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown export format '{fmt}'")
+
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(EXPORT_COLUMNS)
+        for row in iter_transactions(**filters):
+            writer.writerow(_with_dollars(row))
+            count += 1
+    else:
+        for row in iter_transactions(**filters):
+            out.write(json.dumps(dict(zip(EXPORT_COLUMNS, _with_dollars(row))), separators=(",", ":")))
+            out.write("\n")
+            count += 1
+    return count
+
+
+def _with_dollars(row):
+    return row[:3] + (str(Money(row[3])),) + row[4:]
+
+
+# ------------------------ Import ------------------------
+
+def import_transactions(source, fmt: str = "csv", apply_balances: bool = True,
+                        chunk_size: int = CHUNK_SIZE) -> dict:
+    """Load transactions from the text stream `source` (CSV or NDJSON).
+
+    Takes the columns export_transactions writes; "id" is ignored and new
+    ids are assigned, and a missing "timestamp" means now. Rows are
+    inserted with executemany, one transaction per `chunk_size` rows. With
+    `apply_balances`, each chunk also moves the account balances by its
+    net amount, so the ledger and balances stay in step. Rows for unknown
+    accounts are skipped. Returns {"imported", "skipped"}. A malformed row,
+    a timestamp not in "YYYY-MM-DD HH:MM:SS" form, or (with
+    `apply_balances`) a row that would take its account below zero or
+    past MAX_CENTS raises ImportFormatError naming its line, after the
+    earlier chunks were committed.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown import format '{fmt}'")
+
+    records = _csv_records(source) if fmt == "csv" else _ndjson_records(source)
+    imported = skipped = 0
+    chunk = []
+    for line, record in records:
+        chunk.append((line, _parse_record(record, line)))
+        if len(chunk) >= chunk_size:
+            added, missing = _insert_chunk(chunk, apply_balances)
+            imported, skipped = imported + added, skipped + missing
+            chunk = []
+    if chunk:
+        added, missing = _insert_chunk(chunk, apply_balances)
+        imported, skipped = imported + added, skipped + missing
+    return {"imported": imported, "skipped": skipped}
+
+
+def _csv_records(source):
+    reader = csv.DictReader(source)
+    for record in reader:
+        yield reader.line_num, record
+
+
+def _ndjson_records(source):
+    for line, text in enumerate(source, start=1):
+        text = text.strip()
+        if not text:
+            continue
+        try:
+            yield line, json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ImportFormatError(f"line {line}: {e}")
+
+
+def _parse_record(record, line):
+    if not isinstance(record, dict):
+        raise ImportFormatError(f"line {line}: expected a transaction object")
+    try:
+        account_id = int(record["account_id"])
+        tx_type = record["type"]
+        amount = Money.parse(record["amount"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ImportFormatError(f"line {line}: {e}")
+    if tx_type not in _TRANSACTION_TYPES:
+        raise ImportFormatError(f"line {line}: unknown transaction type '{tx_type}'")
+    if amount.cents <= 0:
+        raise ImportFormatError(f"line {line}: amount must be positive")
+
+    timestamp = record.get("timestamp") or None
+    if timestamp is not None:
+        try:
+            datetime.datetime.strptime(timestamp, _TIMESTAMP_FORMAT)
+        except (TypeError, ValueError):
+            raise ImportFormatError(f"line {line}: timestamp must look like 2025-01-31 09:30:00, not {timestamp!r}")
+    try:
+        related = record.get("related_account_id")
+        related = int(related) if related not in (None, "") else None
+    except (TypeError, ValueError) as e:
+        raise ImportFormatError(f"line {line}: {e}")
+    return account_id, tx_type, amount.cents, timestamp, record.get("note") or None, related
+
+
+def _insert_chunk(chunk, apply_balances):
+    # The ledger keeps rows whose related account was deleted since (see
+    # delete_user_by_id), so FK checks are off and the owning account is
+    # checked here instead
+    with transaction(immediate=True, foreign_keys=False) as cursor:
+        cursor.execute("""
+            SELECT id, user_id, balance FROM accounts
+            WHERE id IN (SELECT value FROM json_each(?))
+        """, (json.dumps(sorted({row[0] for _, row in chunk})),))
+        owners = {}
+        balances = {}
+        for account_id, user_id, balance in cursor.fetchall():
+            owners[account_id] = user_id
+            balances[account_id] = balance
+
+        known = [row for _, row in chunk if row[0] in owners]
+        if apply_balances:
+            # Running balances in file order; raising rolls the chunk back
+            for line, (account_id, tx_type, cents, *_) in chunk:
+                if account_id not in balances:
+                    continue
+                balances[account_id] += -cents if tx_type == "transfer_out" else cents
+                if not 0 <= balances[account_id] <= MAX_CENTS:
+                    raise ImportFormatError(f"line {line}: account #{account_id} would have a balance of "
+                                            f"{Money(balances[account_id])}")
+        cursor.executemany("""
+            INSERT INTO transactions (account_id, type, amount, timestamp, note, related_account_id)
+            VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?, ?)
+        """, known)
+
+        if apply_balances:
+            deltas = {}
+            for account_id, tx_type, cents, *_ in known:
+                deltas[account_id] = deltas.get(account_id, 0) + (-cents if tx_type == "transfer_out" else cents)
+            cursor.executemany("UPDATE accounts SET balance = balance + ? WHERE id = ?",
+                               [(delta, account_id) for account_id, delta in deltas.items()])
+            for account_id in deltas:
+                after_commit(account_cache.invalidate_account, account_id, owners[account_id])
+            for user_id in sorted({owners[account_id] for account_id in deltas}):
+                after_commit(EventBus.notify, "account_updated", user_id)
+
+    return len(known), len(chunk) - len(known)
+
@@ -0,0 +1,142 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from database import database
+
+# Most operations one commit may carry
+DEFAULT_MAX_BATCH = 256
+
+# How long the writer waits for more operations once it has one. 0 takes
+# only what is already queued, which still batches well under load because
+# callers keep queueing while the previous commit is being synced.
+DEFAULT_MAX_DELAY_MS = 0.0
+
+# The writer's own connection setting. FULL syncs the WAL on every commit,
+# so a resolved future means the write survives a power cut; NORMAL only
+# survives an application crash.
+DEFAULT_SYNCHRONOUS = "FULL"
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """A single writer thread that commits many callers' writes together.
+
+    submit(fn, *args) queues fn to run on the writer thread and returns a
+    Future. The writer takes up to `max_batch` queued operations (waiting
+    at most `max_delay_ms` for more), runs each in its own SAVEPOINT of one
+    transaction and commits once. Futures resolve only after that commit;
+    an operation that raises is rolled back alone and its future gets the
+    exception.
+
+    fn is typically a db_helper posting: its own transaction() nests as
+    the savepoint, on `path` when one is given. Calls that need foreign_keys=False (delete_user_by_id)
+    can't run here, the pragma can't change inside a transaction.
+    """
+
+    def __init__(self, path=None, max_batch=DEFAULT_MAX_BATCH, max_delay_ms=DEFAULT_MAX_DELAY_MS,
+                 synchronous=DEFAULT_SYNCHRONOUS):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.path = path
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.synchronous = synchronous
+        self.queue = queue.SimpleQueue()
+        self.closed = False
+        self.commits = 0
+        self.operations = 0
+        self.thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self.thread.start()
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        if self.closed:
+            raise RuntimeError("group commit writer is closed")
+        future = Future()
+        self.queue.put((future, fn, args, kwargs))
+        return future
+
+    def close(self):
+        # Operations queued before close() are still committed
+        if not self.closed:
+            self.closed = True
+            self.queue.put(_STOP)
+            self.thread.join()
+
+    def stats(self):
+        return {
+            "commits": self.commits,
+            "operations": self.operations,
+            "average_batch": self.operations / self.commits if self.commits else 0.0,
+        }
+
+    # ------------------------ Writer Thread ------------------------
+
+    def _run(self):
+        # Bound so the submitted functions' own transaction() calls, which
+        # pass no path, land in this writer's transaction on self.path
+        with database.bind_database_path(self.path):
+            self._loop()
+
+    def _loop(self):
+        database.get_connection(self.path).execute(f"PRAGMA synchronous = {self.synchronous}")
+        try:
+            stopping = False
+            while not stopping:
+                item = self.queue.get()
+                if item is _STOP:
+                    break
+                batch = [item]
+                deadline = time.monotonic() + self.max_delay
+                while len(batch) < self.max_batch:
+                    try:
+                        remaining = deadline - time.monotonic()
+                        item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                self._commit(batch)
+        finally:
+            database.close_connection(self.path)
+
+    def _commit(self, batch):
+        results = []
+        committed = []
+        try:
+            with database.transaction(immediate=True, path=self.path):
+                # Queued first, so it runs first once COMMIT has succeeded
+                database.after_commit(committed.append, True, path=self.path)
+                for future, fn, args, kwargs in batch:
+                    if not future.set_running_or_notify_cancel():
+                        results.append(None)
+                        continue
+                    try:
+                        with database.transaction(path=self.path):
+                            results.append((True, fn(*args, **kwargs)))
+                    except Exception as e:
+                        results.append((False, e))
+        except Exception as e:
+            if not committed:
+                # BEGIN or COMMIT failed: nothing in the batch was written
+                for future, *_ in batch:
+                    if future.running():
+                        future.set_exception(e)
+                return
+            # Committed, only an after-commit callback failed
+            print("[ERROR] group commit callback:", e)
+
+        self.commits += 1
+        self.operations += len(batch)
+        for (future, *_), result in zip(batch, results):
+            if result is None:
+                continue
+            ok, value = result
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
@@ -0,0 +1,437 @@
+"""Call and query metrics for the database layer.
+
+Every public db_helper function is wrapped at import (instrument_module),
+and while metrics are on, every cursor that transaction() hands out times
+its statements from execute() through the last fetch. The registry keeps:
+
+- per db_helper function: call count, errors and a latency histogram
+- per SQL statement (whitespace-normalized): executions, rows fetched and
+  a latency histogram
+- connections opened
+- per action (a UI view or button, see action()): duration, time spent in
+  db_helper, db_helper calls, statements and connections opened
+- a slow-query log: statements over the threshold, with their
+  EXPLAIN QUERY PLAN
+
+Dump it with to_prometheus() or to_json(), or GET /metrics on the API
+server. Metrics are off unless BANKING_METRICS is set (or enable() is
+called). Off, a db_helper call costs one extra function frame and a flag
+check, and cursors are plain sqlite3 cursors.
+"""
+import atexit
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+import types
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+from database import database
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Statements slower than this go to the slow-query log
+DEFAULT_SLOW_QUERY_MS = 50.0
+
+# Entries kept in the slow-query log, oldest dropped first
+SLOW_LOG_SIZE = 200
+
+# Only statements that have a query plan worth capturing
+_EXPLAINED_PREFIXES = ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH")
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def cumulative(self):
+        # (upper bound, observations at or below it), ending with +Inf
+        total = 0
+        for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": {_le(bound): total for bound, total in self.cumulative()},
+        }
+
+
+class _Action:
+    __slots__ = ("latency", "db_seconds", "calls", "statements", "rows", "connections")
+
+    def __init__(self):
+        self.latency = _Histogram()
+        self.db_seconds = 0.0
+        self.calls = self.statements = self.rows = self.connections = 0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.enabled = False
+        self.slow_query_seconds = DEFAULT_SLOW_QUERY_MS / 1000
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.calls = {}             # function -> _Histogram
+            self.errors = {}            # function -> count
+            self.statements = {}        # normalized SQL -> [_Histogram, rows]
+            self.actions = {}           # action name -> _Action
+            self.connections_opened = 0
+            self.slow_queries = deque(maxlen=SLOW_LOG_SIZE)
+            self.normalized = {}        # raw SQL -> normalized SQL
+
+    def enable(self, slow_query_ms: float | None = None):
+        if slow_query_ms is not None:
+            self.slow_query_seconds = slow_query_ms / 1000
+        database.cursor_factory = _TimedCursor
+        database.on_connect = self.connection_opened
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        database.cursor_factory = sqlite3.Cursor
+        database.on_connect = None
+
+    # ------------------------ Recording ------------------------
+
+    def _current(self):
+        # This thread's open action, if any
+        return getattr(self.local, "action", None)
+
+    def call(self, name, fn, args, kwargs):
+        local = self.local
+        depth = getattr(local, "depth", 0)
+        local.depth = depth + 1
+        failed = False
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            local.depth = depth
+            with self.lock:
+                histogram = self.calls.get(name)
+                if histogram is None:
+                    histogram = self.calls[name] = _Histogram()
+                histogram.observe(elapsed)
+                if failed:
+                    self.errors[name] = self.errors.get(name, 0) + 1
+            # Nested db_helper calls are already inside the outer one's time
+            if depth == 0:
+                local.db_seconds = getattr(local, "db_seconds", 0.0) + elapsed
+            action = self._current()
+            if action is not None:
+                action["calls"] += 1
+                if depth == 0:
+                    action["db_seconds"] += elapsed
+
+    def statement(self, sql, parameters, elapsed, rows, conn):
+        normalized = self.normalized.get(sql)
+        if normalized is None:
+            normalized = " ".join(sql.split())
+            if len(self.normalized) < 10_000:
+                self.normalized[sql] = normalized
+        with self.lock:
+            entry = self.statements.get(normalized)
+            if entry is None:
+                entry = self.statements[normalized] = [_Histogram(), 0]
+            entry[0].observe(elapsed)
+            entry[1] += rows
+        action = self._current()
+        if action is not None:
+            action["statements"] += 1
+            action["rows"] += rows
+        if elapsed >= self.slow_query_seconds:
+            self._log_slow(sql, normalized, parameters, elapsed, rows, conn)
+
+    def _log_slow(self, sql, normalized, parameters, elapsed, rows, conn):
+        plan = None
+        if parameters is not None and normalized.upper().startswith(_EXPLAINED_PREFIXES):
+            try:
+                plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()]
+            except sqlite3.Error as e:
+                plan = [f"(no plan: {e})"]
+        entry = {
+            "sql": normalized,
+            "ms": round(elapsed * 1000, 3),
+            "rows": rows,
+            "plan": plan,
+            "action": getattr(self.local, "action_name", None),
+            "at": time.time(),
+        }
+        with self.lock:
+            self.slow_queries.append(entry)
+        print(f"[WARN] Slow query ({entry['ms']:.1f} ms, {rows} rows): {normalized[:200]}")
+
+    def db_seconds(self) -> float:
+        """Time this thread has spent in db_helper while metrics were on."""
+        return getattr(self.local, "db_seconds", 0.0)
+
+    def connection_opened(self, path):
+        with self.lock:
+            self.connections_opened += 1
+        action = self._current()
+        if action is not None:
+            action["connections"] += 1
+
+    @contextmanager
+    def action(self, name):
+        """Attribute what this thread does inside the block to action `name`.
+
+        A modal dialog shown inside the block counts toward the action's
+        duration, not toward its db_seconds.
+        """
+        if not self.enabled or self._current() is not None:
+            # Off, or already inside an action: the outer one gets it all
+            yield
+            return
+        counters = {"db_seconds": 0.0, "calls": 0, "statements": 0, "rows": 0, "connections": 0}
+        self.local.action, self.local.action_name = counters, name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.local.action = self.local.action_name = None
+            with self.lock:
+                action = self.actions.get(name)
+                if action is None:
+                    action = self.actions[name] = _Action()
+                action.latency.observe(elapsed)
+                action.db_seconds += counters["db_seconds"]
+                action.calls += counters["calls"]
+                action.statements += counters["statements"]
+                action.rows += counters["rows"]
+                action.connections += counters["connections"]
+
+    # ------------------------ Output ------------------------
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "enabled": self.enabled,
+                "connections_opened": self.connections_opened,
+                "functions": {
+                    name: {"errors": self.errors.get(name, 0), **histogram.to_dict()}
+                    for name, histogram in sorted(self.calls.items())
+                },
+                "statements": {
+                    sql: {"rows": rows, **histogram.to_dict()}
+                    for sql, (histogram, rows) in sorted(self.statements.items())
+                },
+                "actions": {
+                    name: {
+                        "db_seconds": action.db_seconds,
+                        "calls": action.calls,
+                        "statements": action.statements,
+                        "rows": action.rows,
+                        "connections": action.connections,
+                        **action.latency.to_dict(),
+                    }
+                    for name, action in sorted(self.actions.items())
+                },
+                "slow_queries": list(self.slow_queries),
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """The registry in the Prometheus text exposition format."""
+        with self.lock:
+            lines = [
+                "# HELP banking_db_connections_opened_total SQLite connections opened.",
+                "# TYPE banking_db_connections_opened_total counter",
+                f"banking_db_connections_opened_total {self.connections_opened}",
+            ]
+            _histogram_lines(lines, "banking_db_call_seconds", "db_helper call latency.", "function",
+                             self.calls.items())
+            _counter_lines(lines, "banking_db_call_errors_total", "db_helper calls that raised.", "function",
+                           self.errors.items())
+            _histogram_lines(lines, "banking_sql_statement_seconds",
+                             "SQL statement latency, execute through last fetch.", "statement",
+                             ((sql, entry[0]) for sql, entry in self.statements.items()))
+            _counter_lines(lines, "banking_sql_rows_total", "Rows fetched per SQL statement.", "statement",
+                           ((sql, entry[1]) for sql, entry in self.statements.items()))
+            _histogram_lines(lines, "banking_action_seconds", "Action duration.", "action",
+                             ((name, action.latency) for name, action in self.actions.items()))
+            for suffix, help_text in (("db_seconds", "Time actions spent in db_helper."),
+                                      ("calls", "db_helper calls made by actions."),
+                                      ("statements", "SQL statements run by actions."),
+                                      ("connections", "Connections opened by actions.")):
+                _counter_lines(lines, f"banking_action_{suffix}_total", help_text, "action",
+                               ((name, getattr(action, suffix)) for name, action in self.actions.items()))
+            lines.append("# HELP banking_slow_queries Statements in the slow-query log.")
+            lines.append("# TYPE banking_slow_queries gauge")
+            lines.append(f"banking_slow_queries {len(self.slow_queries)}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        # .prom gets the Prometheus text format, anything else JSON
+        with open(path, "w") as f:
+            f.write(self.to_prometheus() if path.endswith(".prom") else self.to_json())
+
+
+def _le(bound):
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _histogram_lines(lines, metric, help_text, label, items):
+    lines.append(f"# HELP {metric} {help_text}")
+    lines.append(f"# TYPE {metric} histogram")
+    for key, histogram in sorted(items, key=lambda item: item[0]):
+        name = _label(key)
+        for bound, total in histogram.cumulative():
+            lines.append(f'{metric}_bucket{{{label}="{name}",le="{_le(bound)}"}} {total}')
+        lines.append(f'{metric}_sum{{{label}="{name}"}} {histogram.sum}')
+        lines.append(f'{metric}_count{{{label}="{name}"}} {histogram.count}')
+
+
+def _counter_lines(lines, metric, help_text, label, items):
+    lines.append(f"# HELP {metric} {help_text}")
+    lines.append(f"# TYPE {metric} counter")
+    for key, value in sorted(items, key=lambda item: item[0]):
+        lines.append(f'{metric}{{{label}="{_label(key)}"}} {value}')
+
+
+registry = MetricsRegistry()
+
+
+class _TimedCursor(sqlite3.Cursor):
+    # Times each statement from execute() until the next statement or close(),
+    # counting only the time spent inside sqlite3 calls, and the rows fetched
+    _sql = None
+    _parameters = None
+    _elapsed = 0.0
+    _rows = 0
+
+    def _finish(self):
+        sql = self._sql
+        if sql is not None:
+            self._sql = None
+            registry.statement(sql, self._parameters, self._elapsed, self._rows, self.connection)
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        self._sql, self._parameters, self._elapsed, self._rows = sql, parameters, 0.0, 0
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._elapsed += time.perf_counter() - start
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        # No single parameter set to explain it with
+        self._sql, self._parameters, self._elapsed, self._rows = sql, None, 0.0, 0
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._elapsed += time.perf_counter() - start
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._elapsed += time.perf_counter() - start
+        if row is not None:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._elapsed += time.perf_counter() - start
+        self._rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._elapsed += time.perf_counter() - start
+        self._rows += len(rows)
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        finally:
+            self._elapsed += time.perf_counter() - start
+        self._rows += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+
+# ------------------------ Instrumentation ------------------------
+
+def _timed(name, fn):
+    @functools.wraps(fn)
+    def timed(*args, **kwargs):
+        if not registry.enabled:
+            return fn(*args, **kwargs)
+        return registry.call(name, fn, args, kwargs)
+    return timed
+
+
+def instrument_module(namespace: dict):
+    """Wrap every public function defined in a module (pass its globals())."""
+    for name, value in list(namespace.items()):
+        if isinstance(value, types.FunctionType) and value.__module__ == namespace["__name__"] and not name.startswith("_"):
+            namespace[name] = _timed(name, value)
+
+
+def action(name):
+    return registry.action(name)
+
+
+def tracked(name, fn):
+    # fn wrapped to run as action `name`, for Tk button commands
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        with registry.action(name):
+            return fn(*args, **kwargs)
+    return run
+
+
+def configure_from_environment() -> bool:
+    # BANKING_METRICS=1 turns metrics on; BANKING_SLOW_QUERY_MS sets the
+    # slow-query threshold; BANKING_METRICS_FILE gets a dump at exit
+    if os.environ.get("BANKING_METRICS", "") in ("", "0"):
+        return False
+    slow_query_ms = os.environ.get("BANKING_SLOW_QUERY_MS")
+    registry.enable(float(slow_query_ms) if slow_query_ms else None)
+    path = os.environ.get("BANKING_METRICS_FILE")
+    if path:
+        atexit.register(registry.dump, path)
+    return True
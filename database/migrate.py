@@ -0,0 +1,90 @@
+import os
+import re
+import sqlite3
+
+from database.database import get_connection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+
+_MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+def list_migrations() -> list[tuple[int, str, str]]:
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = _MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    migrations.sort()
+    return migrations
+
+
+def get_schema_version(path=None) -> int:
+    conn = get_connection(path)
+    _ensure_version_table(conn)
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(path=None) -> list[int]:
+    """Apply every migration newer than the database's schema_version.
+
+    Safe to run from several processes at once: each migration re-checks
+    schema_version once it holds the write lock, so a migration another
+    process has just applied is skipped rather than run twice.
+    """
+    conn = get_connection(path)
+    current = get_schema_version(path)
+    applied = []
+
+    for version, name, filename in list_migrations():
+        if version <= current:
+            continue
+        with open(filename, "r") as f:
+            script = f.read()
+
+        # Table rebuilds need FK enforcement off, and it can't change mid-transaction.
+        # executescript() would commit first, so statements run one at a time.
+        conn.execute("PRAGMA foreign_keys = OFF")
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,)).fetchone():
+                conn.execute("ROLLBACK")
+                continue
+            for statement in _statements(script):
+                conn.execute(statement)
+            conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)", (version, name))
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.execute("PRAGMA foreign_keys = ON")
+        applied.append(version)
+
+    return applied
+
+
+def _statements(script):
+    # Split on the semicolons SQLite itself would end a statement at, not
+    # those inside strings, comments or trigger bodies
+    statement = ""
+    for piece in script.split(";"):
+        statement += piece + ";"
+        if sqlite3.complete_statement(statement):
+            if statement.strip(" \t\n;"):
+                yield statement
+            statement = ""
+    if statement.strip(" \t\n;"):
+        yield statement
+
+
+def _ensure_version_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
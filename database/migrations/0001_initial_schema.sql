@@ -1,14 +1,10 @@
-DROP TABLE IF EXISTS users;
-DROP TABLE IF EXISTS accounts;
-DROP TABLE IF EXISTS transactions;
-
-CREATE TABLE users (
+CREATE TABLE IF NOT EXISTS users (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     username TEXT NOT NULL UNIQUE,
     password_hash TEXT NOT NULL
 );
 
-CREATE TABLE accounts (
+CREATE TABLE IF NOT EXISTS accounts (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     user_id INTEGER NOT NULL,
     account_type TEXT NOT NULL,
@@ -16,7 +12,7 @@ CREATE TABLE accounts (
     FOREIGN KEY (user_id) REFERENCES users(id)
 );
 
-CREATE TABLE transactions (
+CREATE TABLE IF NOT EXISTS transactions (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     account_id INTEGER NOT NULL,
     type TEXT NOT NULL, -- deposit, transfer_in, transfer_out
@@ -26,4 +22,4 @@ CREATE TABLE transactions (
     related_account_id INTEGER,
     FOREIGN KEY (account_id) REFERENCES accounts(id),
     FOREIGN KEY (related_account_id) REFERENCES accounts(id)
-);
\ No newline at end of file
+);
@@ -0,0 +1,7 @@
+-- get_accounts, get_user_accounts_by_username and delete_user_by_id filter on
+-- user_id; the implicit rowid suffix keeps each user's accounts in id order.
+CREATE INDEX IF NOT EXISTS idx_accounts_user_id ON accounts (user_id);
+
+-- Transaction history is always read per account, newest first. The rowid
+-- suffix makes (timestamp, id) a stable keyset for paging.
+CREATE INDEX IF NOT EXISTS idx_transactions_account_timestamp ON transactions (account_id, timestamp);
@@ -0,0 +1,48 @@
+-- Money moves from REAL dollars to INTEGER cents so balances and sums are
+-- exact. SQLite can't change a column's type in place, so both tables are
+-- rebuilt and the existing values rounded to the nearest cent.
+
+CREATE TABLE accounts_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    account_type TEXT NOT NULL,
+    balance INTEGER NOT NULL DEFAULT 0, -- cents
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+INSERT INTO accounts_new (id, user_id, account_type, balance)
+SELECT id, user_id, account_type, CAST(ROUND(balance * 100) AS INTEGER) FROM accounts;
+
+CREATE TABLE transactions_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id INTEGER NOT NULL,
+    type TEXT NOT NULL, -- deposit, transfer_in, transfer_out
+    amount INTEGER NOT NULL, -- cents, always positive; the type gives the sign
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+    note TEXT,
+    related_account_id INTEGER,
+    FOREIGN KEY (account_id) REFERENCES accounts(id),
+    FOREIGN KEY (related_account_id) REFERENCES accounts(id)
+);
+
+INSERT INTO transactions_new (id, account_id, type, amount, timestamp, note, related_account_id)
+SELECT id, account_id, type, CAST(ROUND(amount * 100) AS INTEGER), timestamp, note, related_account_id
+FROM transactions;
+
+-- Keep AUTOINCREMENT from reusing ids of rows deleted before the rebuild
+UPDATE sqlite_sequence SET seq = (SELECT seq FROM sqlite_sequence WHERE name = 'accounts')
+WHERE name = 'accounts_new' AND EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'accounts');
+UPDATE sqlite_sequence SET seq = (SELECT seq FROM sqlite_sequence WHERE name = 'transactions')
+WHERE name = 'transactions_new' AND EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'transactions');
+
+DROP TABLE transactions;
+DROP TABLE accounts;
+ALTER TABLE accounts_new RENAME TO accounts;
+ALTER TABLE transactions_new RENAME TO transactions;
+
+-- Dropping the old tables dropped their indexes (see 0002)
+CREATE INDEX idx_accounts_user_id ON accounts (user_id);
+CREATE INDEX idx_transactions_account_timestamp ON transactions (account_id, timestamp);
+
+-- Covers get_ledger_totals, so totals read only this index, never the rows
+CREATE INDEX idx_transactions_totals ON transactions (account_id, type, timestamp, amount);
@@ -0,0 +1,3 @@
+-- The admin directory pages through users by case-insensitive username
+-- prefix; this index serves both the prefix range and the keyset order.
+CREATE INDEX IF NOT EXISTS idx_users_username_nocase ON users (username COLLATE NOCASE);
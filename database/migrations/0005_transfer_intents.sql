@@ -0,0 +1,20 @@
+-- Cross-shard transfers (database/sharding.py). The source shard logs an
+-- intent in the same transaction as the debit; the target shard records
+-- each intent it has credited, so re-applying one after a crash is a no-op.
+-- Unused when the ledger is a single file.
+CREATE TABLE IF NOT EXISTS transfer_intents (
+    id TEXT PRIMARY KEY,
+    from_account INTEGER NOT NULL,
+    to_account INTEGER NOT NULL,
+    amount INTEGER NOT NULL, -- cents
+    note_in TEXT,
+    status TEXT NOT NULL DEFAULT 'debited', -- debited, completed, reversed
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_transfer_intents_status ON transfer_intents (status);
+
+CREATE TABLE IF NOT EXISTS applied_intents (
+    id TEXT PRIMARY KEY,
+    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
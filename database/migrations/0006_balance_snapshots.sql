@@ -0,0 +1,19 @@
+-- End-of-day balances computed from the ledger (database/statements.py),
+-- one row per account per day with activity. The balance at any date is
+-- the latest snapshot on or before it, so statements only read the rows
+-- after that instead of replaying the whole history.
+CREATE TABLE IF NOT EXISTS balance_snapshots (
+    account_id INTEGER NOT NULL,
+    day TEXT NOT NULL, -- YYYY-MM-DD
+    balance INTEGER NOT NULL, -- cents, after the day's last transaction
+    PRIMARY KEY (account_id, day)
+) WITHOUT ROWID;
+
+-- Snapshots include every transaction with id <= last_transaction_id;
+-- catch_up_snapshots() folds in the rest.
+CREATE TABLE IF NOT EXISTS snapshot_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    last_transaction_id INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO snapshot_state (id, last_transaction_id) VALUES (1, 0);
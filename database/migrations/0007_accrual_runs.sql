@@ -0,0 +1,14 @@
+-- One row per interest/fee run (database/accrual.py), keyed by period.
+-- Accounts are processed in id order and last_account_id is committed
+-- with each chunk, so an interrupted run resumes where it stopped and a
+-- completed one is never posted twice.
+CREATE TABLE IF NOT EXISTS accrual_runs (
+    period TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'running', -- running, completed
+    last_account_id INTEGER NOT NULL DEFAULT 0,
+    accounts INTEGER NOT NULL DEFAULT 0, -- accounts with a posting
+    interest INTEGER NOT NULL DEFAULT 0, -- cents
+    fees INTEGER NOT NULL DEFAULT 0, -- cents
+    started_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    completed_at DATETIME
+);
@@ -0,0 +1,21 @@
+-- Cold ledger partitions (database/archive.py). Transactions older than
+-- the archive horizon move to one SQLite file per month; a partition is
+-- only read once its row here exists, which commits together with the
+-- delete from the hot table.
+CREATE TABLE IF NOT EXISTS archive_partitions (
+    period TEXT PRIMARY KEY, -- YYYY-MM
+    filename TEXT NOT NULL, -- inside the archive directory next to the database
+    rows INTEGER NOT NULL DEFAULT 0,
+    archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Archived rows summed per account, day and type, so ledger totals stay
+-- exact without opening the archives.
+CREATE TABLE IF NOT EXISTS ledger_rollups (
+    account_id INTEGER NOT NULL,
+    day TEXT NOT NULL, -- YYYY-MM-DD
+    type TEXT NOT NULL,
+    amount INTEGER NOT NULL, -- cents
+    count INTEGER NOT NULL,
+    PRIMARY KEY (account_id, day, type)
+) WITHOUT ROWID;
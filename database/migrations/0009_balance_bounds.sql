@@ -0,0 +1,24 @@
+-- Balances must stay INTEGER cents within +/- MAX_CENTS (database/money.py).
+-- Without the check, a balance + ? that overflows 64 bits is silently
+-- stored as REAL, and every later read of that account fails. SQLite can't
+-- add a CHECK to an existing table, so accounts is rebuilt as in 0003.
+
+CREATE TABLE accounts_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    account_type TEXT NOT NULL,
+    balance INTEGER NOT NULL DEFAULT 0 -- cents
+        CHECK (typeof(balance) = 'integer' AND balance BETWEEN -1000000000000000 AND 1000000000000000),
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+INSERT INTO accounts_new (id, user_id, account_type, balance)
+SELECT id, user_id, account_type, balance FROM accounts;
+
+UPDATE sqlite_sequence SET seq = (SELECT seq FROM sqlite_sequence WHERE name = 'accounts')
+WHERE name = 'accounts_new' AND EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'accounts');
+
+DROP TABLE accounts;
+ALTER TABLE accounts_new RENAME TO accounts;
+
+CREATE INDEX idx_accounts_user_id ON accounts (user_id);
@@ -0,0 +1,134 @@
+from decimal import Decimal, InvalidOperation
+
+# Minor units per major unit: amounts are stored and summed as integer cents
+CENTS = 100
+
+# Largest amount Money.parse accepts, and the largest balance the accounts
+# table allows (migration 0009): $10 trillion. Far enough below SQLite's
+# 64-bit integers that adding one to a balance can't overflow.
+MAX_CENTS = 10**15
+
+
+class Money:
+    """An exact amount of money, held as an integer number of cents.
+
+    Money(1234) is $12.34; use Money.parse for user input and floats. It
+    formats like a number, so f"${amount:.2f}" and f"{amount:,.2f}" work.
+    """
+
+    __slots__ = ("cents",)
+
+    def __init__(self, cents: int = 0):
+        if isinstance(cents, bool) or not isinstance(cents, int):
+            raise TypeError(f"Money takes integer cents, not {type(cents).__name__}")
+        self.cents = cents
+
+    @classmethod
+    def parse(cls, value) -> "Money":
+        """Money from a Money, int/float/Decimal of dollars or a string like "12.34".
+
+        Raises ValueError for anything that isn't a whole number of cents
+        or is larger than MAX_CENTS either way.
+        """
+        if isinstance(value, Money):
+            return value
+        if isinstance(value, bool):
+            raise ValueError(f"not an amount: {value!r}")
+        if isinstance(value, int):
+            if abs(value) * CENTS > MAX_CENTS:
+                raise ValueError(f"amount too large: {value!r}")
+            return cls(value * CENTS)
+        try:
+            # str() of a float is its shortest repr, so 0.1 parses as 10 cents
+            amount = Decimal(value.strip().replace(",", "") if isinstance(value, str) else str(value))
+        except (InvalidOperation, AttributeError, TypeError):
+            raise ValueError(f"not an amount: {value!r}")
+        if not amount.is_finite():
+            raise ValueError(f"not an amount: {value!r}")
+        # Compared before scaling, which could overflow the decimal context
+        if abs(amount) > _MAX_DOLLARS:
+            raise ValueError(f"amount too large: {value!r}")
+        cents = amount * CENTS
+        if cents != cents.to_integral_value():
+            raise ValueError(f"amount has fractions of a cent: {value!r}")
+        return cls(int(cents))
+
+    def to_decimal(self) -> Decimal:
+        return Decimal(self.cents).scaleb(-2)
+
+    # ------------------------ Arithmetic ------------------------
+
+    def __add__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return Money(self.cents + other.cents)
+
+    def __sub__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return Money(self.cents - other.cents)
+
+    def __mul__(self, factor):
+        if isinstance(factor, bool) or not isinstance(factor, int):
+            return NotImplemented
+        return Money(self.cents * factor)
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return Money(-self.cents)
+
+    def __abs__(self):
+        return Money(abs(self.cents))
+
+    def __bool__(self):
+        return self.cents != 0
+
+    # ------------------------ Comparison ------------------------
+
+    def __eq__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return self.cents == other.cents
+
+    def __lt__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return self.cents < other.cents
+
+    def __le__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return self.cents <= other.cents
+
+    def __gt__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return self.cents > other.cents
+
+    def __ge__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return self.cents >= other.cents
+
+    def __hash__(self):
+        return hash(("Money", self.cents))
+
+    # ------------------------ Conversion ------------------------
+
+    def __float__(self):
+        # For JSON and charts only; never do arithmetic on the result
+        return self.cents / CENTS
+
+    def __format__(self, spec):
+        return format(self.to_decimal(), spec) if spec else str(self)
+
+    def __str__(self):
+        return str(self.to_decimal())
+
+    def __repr__(self):
+        return f"Money('{self}')"
+
+
+ZERO = Money(0)
+_MAX_DOLLARS = Decimal(MAX_CENTS).scaleb(-2)
@@ -0,0 +1,145 @@
+"""Prove that no hot db_helper query scans a whole table.
+
+Runs the db_helper hot paths against a scratch database, captures every
+statement they send to SQLite and checks its EXPLAIN QUERY PLAN.
+
+    python -m database.query_plan_check
+"""
+import os
+import sys
+import tempfile
+
+import bcrypt
+
+from database import database, db_helper, statements
+from database.cache import account_cache
+from database.migrate import migrate
+
+_SKIPPED_PREFIXES = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "PRAGMA")
+
+
+def exercise_hot_paths():
+    # Cache hits would hide the statements we want to look at
+    account_cache.enabled = False
+    user_id = _insert_user("plan_alice")
+    other_id = _insert_user("plan_bob")
+    checking = db_helper.create_account(user_id, "Checking")
+    savings = db_helper.create_account(user_id, "Savings")
+    external = db_helper.create_account(other_id, "Checking")
+
+    db_helper.authenticate_user("plan_alice", "not-the-password")
+    db_helper.deposit(checking, 100.0)
+    db_helper.record_withdrawal(checking, 5.0)
+    db_helper.transfer_funds(checking, savings, 10.0)
+    db_helper.transfer_funds(checking, external, 10.0)
+    db_helper.post_batch([
+        {"type": "deposit", "account_id": savings, "amount": 1.0},
+        {"type": "transfer", "from_account": savings, "to_account": external, "amount": 1.0},
+    ])
+    db_helper.get_accounts(user_id)
+    db_helper.get_account_balance(checking)
+    db_helper.get_user_accounts_by_username("plan_bob")
+    db_helper.get_transaction_history(checking)
+    first_page = db_helper.get_transaction_page(checking, limit=2)
+    db_helper.get_transaction_page(checking, before=(first_page[-1]["timestamp"], first_page[-1]["id"]), limit=2)
+    db_helper.get_ledger_totals(("type", "month"), account_ids=[checking])
+    db_helper.get_dashboard_snapshot([user_id, other_id], recent_n=3)
+    page = db_helper.search_users("PLAN_", limit=1)
+    db_helper.search_users("plan_", after=(page[-1]["username"], page[-1]["id"]), limit=1)
+    db_helper.search_users(limit=1)
+    statements.catch_up_snapshots()
+    statements.get_balance_at(checking, "2025-01-31")
+    statements.get_statement(checking, "2025-01-01", "2025-02-01")
+    db_helper.delete_user_by_id(other_id)
+
+
+def _insert_user(username):
+    # Cheapest valid hash, the work factor doesn't matter for query plans
+    password_hash = bcrypt.hashpw(b"password", bcrypt.gensalt(rounds=4))
+    with database.transaction() as cursor:
+        cursor.execute("INSERT INTO users (username, password_hash) VALUES (?, ?)", (username, password_hash))
+        return cursor.lastrowid
+
+
+def capture_statements(fn) -> list[tuple[str, bool]]:
+    """Return (sql, foreign_keys_enabled) for every statement fn() runs."""
+    traced = []
+    conn = database.get_connection()
+    conn.set_trace_callback(traced.append)
+    try:
+        fn()
+    finally:
+        conn.set_trace_callback(None)
+
+    # Follow the PRAGMA toggles so each statement is explained under the same
+    # FK setting it ran with (FK checks on deletes can add their own scans)
+    statements = []
+    foreign_keys = True
+    for sql in traced:
+        normalized = " ".join(sql.split()).upper()
+        if normalized.startswith("PRAGMA FOREIGN_KEYS"):
+            foreign_keys = normalized.endswith("ON")
+        elif not normalized.startswith(_SKIPPED_PREFIXES):
+            statements.append((sql, foreign_keys))
+    return statements
+
+
+def full_scans(sql: str, foreign_keys: bool = True) -> list[str]:
+    conn = database.get_connection()
+    conn.execute(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'}")
+    try:
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    finally:
+        conn.execute("PRAGMA foreign_keys = ON")
+
+    # Walking an index in ORDER BY order under a LIMIT stops after LIMIT
+    # rows (the first page of a keyset listing), so it isn't a full scan
+    normalized = " ".join(sql.split()).upper()
+    ordered_page = " ORDER BY " in normalized and " LIMIT " in normalized and not any(
+        row[3].startswith("USE TEMP B-TREE") for row in plan)
+
+    problems = []
+    for row in plan:
+        detail = row[3]
+        if detail.startswith("SCAN ") and "VIRTUAL TABLE" not in detail:
+            if ordered_page and " INDEX " in detail:
+                continue
+            problems.append(detail)
+        elif detail.startswith("USE TEMP B-TREE FOR ORDER BY"):
+            problems.append(detail)
+    return problems
+
+
+def check_query_plans() -> list[tuple[str, list[str]]]:
+    failures = []
+    seen = set()
+    for sql, foreign_keys in capture_statements(exercise_hot_paths):
+        key = " ".join(sql.split())
+        if key in seen:
+            continue
+        seen.add(key)
+        problems = full_scans(sql, foreign_keys)
+        if problems:
+            failures.append((key, problems))
+    return failures
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        database.set_database_path(os.path.join(directory, "plan_check.db"))
+        migrate()
+        failures = check_query_plans()
+        database.close_all_connections()
+
+    if not failures:
+        print("[OK] No hot query scans a whole table.")
+        return 0
+    for sql, problems in failures:
+        print(f"[FAIL] {sql}")
+        for problem in problems:
+            print(f"       {problem}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,37 @@
+"""Delete the database and start over: python -m database.reset [path]"""
 import os
+import shutil
+import sys
 
-DB_FILENAME = "banking.db"
+from database import database
 
-if os.path.exists(DB_FILENAME):
-    os.remove(DB_FILENAME)
-    print("[DEBUG] Database deleted.")
-else:
-    print("[DEBUG] No database to delete.")
\ No newline at end of file
+# SQLite's WAL sidecars; a new database next to stale ones could replay them
+SIDECARS = ("-wal", "-shm")
+
+
+def reset_database(path=None) -> list[str]:
+    """Remove the database file, its WAL sidecars and its monthly archives.
+
+    This process's pooled connections are closed first so nothing writes
+    the files back. Returns the paths removed.
+    """
+    path = path or database.DB_FILENAME
+    database.close_all_connections()
+    removed = []
+    for filename in [path] + [path + suffix for suffix in SIDECARS]:
+        if os.path.exists(filename):
+            os.remove(filename)
+            removed.append(filename)
+    archives = os.path.splitext(path)[0] + "-archive"  # see archive.archive_directory
+    if os.path.isdir(archives):
+        shutil.rmtree(archives)
+        removed.append(archives)
+    return removed
+
+
+if __name__ == "__main__":
+    removed = reset_database(sys.argv[1] if len(sys.argv) > 1 else None)
+    if removed:
+        print(f"[DEBUG] Database deleted: {', '.join(removed)}")
+    else:
+        print("[DEBUG] No database to delete.")
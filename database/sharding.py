@@ -0,0 +1,359 @@
+"""Spread the ledger over K SQLite files so writers stop sharing one lock.
+
+Every user lives on shard crc32(username) % K, and ids are handed out so
+that id % K is the shard: a user's id and all of their account ids point
+at the user's shard. Routing is arithmetic, and a user's own accounts
+(and their internal transfers) never leave one file.
+
+Single-shard calls bind the shard's file and reuse db_helper unchanged.
+A transfer between shards is two local transactions tied together by an
+intent logged with the debit:
+
+    1. source shard: debit, ledger row, intent "debited"      (commit)
+    2. target shard: credit, ledger row, applied_intents row  (commit)
+    3. source shard: intent "completed"                       (commit)
+
+A crash after 1 leaves a "debited" intent; recover_transfers() finishes
+it (2 is idempotent thanks to applied_intents) or, when the target
+account is gone or can't take the credit, refunds the source.
+"""
+import heapq
+import os
+import sqlite3
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from database import db_helper
+from database.cache import account_cache
+from database.database import after_commit, bind_database_path, close_all_connections, transaction
+from database.migrate import migrate
+from database.money import Money, ZERO
+from database.velocity import velocity_engine
+from app.event_bus import EventBus
+
+# The debit is committed and the intent logged, but the credit couldn't be
+# applied yet; recover_transfers() will apply it
+TRANSFER_PENDING = "transfer_pending"
+
+
+def shard_paths(directory, shards, prefix="shard"):
+    return [os.path.join(directory, f"{prefix}{index}.db") for index in range(shards)]
+
+
+class ShardedLedger:
+    def __init__(self, paths, fanout_workers=None):
+        if not paths:
+            raise ValueError("need at least one shard")
+        self.paths = list(paths)
+        self.count = len(self.paths)
+        self.executor = ThreadPoolExecutor(max_workers=fanout_workers or self.count, thread_name_prefix="shard")
+
+    @classmethod
+    def open(cls, paths, recover=True):
+        """Migrate every shard and finish any transfer a crash interrupted."""
+        ledger = cls(paths)
+        for path in ledger.paths:
+            migrate(path)
+        if recover:
+            ledger.recover_transfers()
+        return ledger
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        close_all_connections()
+
+    # ------------------------ Routing ------------------------
+
+    def shard_of(self, object_id: int) -> int:
+        return object_id % self.count
+
+    def shard_for_username(self, username: str) -> int:
+        return zlib.crc32(username.encode()) % self.count
+
+    @contextmanager
+    def on_shard(self, shard):
+        with bind_database_path(self.paths[shard]):
+            yield
+
+    def _on_each_shard(self, fn, *args):
+        # Runs fn on every shard in parallel, results in shard order
+        def run(path):
+            with bind_database_path(path):
+                return fn(*args)
+        return list(self.executor.map(run, self.paths))
+
+    def _next_id(self, cursor, table, shard):
+        # The smallest id above any ever used that is congruent to `shard`
+        # mod K. sqlite_sequence remembers the largest id, so ids of deleted
+        # rows aren't reused.
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,))
+        row = cursor.fetchone()
+        last = row[0] if row and row[0] else 0
+        return last + ((shard - last) % self.count or self.count)
+
+    # ------------------------ Users ------------------------
+
+    def create_user(self, username: str, password: str) -> bool:
+        import bcrypt  # only hashing needs it, as in db_helper.create_user
+
+        password_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=db_helper.BCRYPT_ROUNDS))
+        shard = self.shard_for_username(username)
+        try:
+            with self.on_shard(shard), transaction(immediate=True) as cursor:
+                cursor.execute("INSERT INTO users (id, username, password_hash) VALUES (?, ?, ?)",
+                               (self._next_id(cursor, "users", shard), username, password_hash))
+                after_commit(account_cache.invalidate_username, username)
+            return True
+        except sqlite3.IntegrityError:
+            return False  # Username already exists
+
+    def authenticate_user(self, username: str, password: str) -> int | None:
+        with self.on_shard(self.shard_for_username(username)):
+            return db_helper.authenticate_user(username, password)
+
+    def get_user_id_by_username(self, username: str) -> int | None:
+        with self.on_shard(self.shard_for_username(username)):
+            return db_helper.get_user_id_by_username(username)
+
+    def get_user_accounts_by_username(self, username: str) -> list[dict]:
+        with self.on_shard(self.shard_for_username(username)):
+            return db_helper.get_user_accounts_by_username(username)
+
+    def delete_user_by_id(self, user_id: int):
+        with self.on_shard(self.shard_of(user_id)):
+            db_helper.delete_user_by_id(user_id)
+
+    # ------------------------ Accounts ------------------------
+
+    def create_account(self, user_id: int, account_type: str) -> int:
+        shard = self.shard_of(user_id)
+        with self.on_shard(shard), transaction(immediate=True) as cursor:
+            account_id = self._next_id(cursor, "accounts", shard)
+            cursor.execute("INSERT INTO accounts (id, user_id, account_type, balance) VALUES (?, ?, ?, 0)",
+                           (account_id, user_id, account_type))
+            after_commit(account_cache.invalidate_user, user_id)
+        return account_id
+
+    def get_accounts(self, user_id: int) -> list[dict]:
+        with self.on_shard(self.shard_of(user_id)):
+            return db_helper.get_accounts(user_id)
+
+    def get_account_balance(self, account_id: int) -> Money | None:
+        with self.on_shard(self.shard_of(account_id)):
+            return db_helper.get_account_balance(account_id)
+
+    def get_transaction_history(self, account_id: int) -> list[dict]:
+        with self.on_shard(self.shard_of(account_id)):
+            return db_helper.get_transaction_history(account_id)
+
+    def get_transaction_page(self, account_id: int, before=None, limit: int = 100) -> list[dict]:
+        with self.on_shard(self.shard_of(account_id)):
+            return db_helper.get_transaction_page(account_id, before=before, limit=limit)
+
+    # ------------------------ Postings ------------------------
+
+    def deposit(self, account_id: int, amount: Money, note: str = "Deposit") -> bool:
+        with self.on_shard(self.shard_of(account_id)):
+            return db_helper.deposit(account_id, amount, note=note)
+
+    def record_withdrawal(self, account_id: int, amount: Money, note: str = "Withdrawal") -> bool:
+        with self.on_shard(self.shard_of(account_id)):
+            return db_helper.record_withdrawal(account_id, amount, note=note)
+
+    def transfer_funds(self, from_account: int, to_account: int, amount: Money, note: str = "Transfer",
+                       note_in: str | None = None) -> db_helper.TransferResult:
+        source = self.shard_of(from_account)
+        if source == self.shard_of(to_account):
+            with self.on_shard(source):
+                return db_helper.transfer_funds(from_account, to_account, amount, note=note, note_in=note_in)
+
+        try:
+            amount = Money.parse(amount)
+        except ValueError:
+            amount = ZERO
+        if amount <= ZERO:
+            return db_helper.TransferResult(False, db_helper.INVALID_AMOUNT)
+        # Check the target before moving any money; if it vanishes between
+        # here and the credit, the debit is refunded. Read from its shard,
+        # not the cache.
+        if not self._account_exists(to_account):
+            return db_helper.TransferResult(False, db_helper.ACCOUNT_NOT_FOUND)
+
+        intent = (uuid.uuid4().hex, from_account, to_account, amount.cents, note_in or note)
+        try:
+            debited = self._debit_with_intent(intent, note)  # VelocityLimitExceeded propagates
+        except sqlite3.Error as e:
+            print("[ERROR] transfer:", e)
+            return db_helper.TransferResult(False, str(e))
+        if isinstance(debited, str):
+            return db_helper.TransferResult(False, debited)
+
+        try:
+            applied, to_user_id = self._apply_intent(intent)
+        except sqlite3.Error as e:
+            print("[ERROR] transfer credit, left for recovery:", e)
+            return db_helper.TransferResult(False, TRANSFER_PENDING, from_user_id=debited[0],
+                                            from_balance=Money(debited[1]))
+        if not applied:
+            self._reverse_intent(intent)
+            return db_helper.TransferResult(False, to_user_id)  # The error code
+        self._complete_intent(intent)
+        return db_helper.TransferResult(True, from_user_id=debited[0], to_user_id=to_user_id,
+                                        from_balance=Money(debited[1]))
+
+    def _account_exists(self, account_id):
+        with self.on_shard(self.shard_of(account_id)), transaction() as cursor:
+            cursor.execute("SELECT 1 FROM accounts WHERE id = ?", (account_id,))
+            return cursor.fetchone() is not None
+
+    def _debit_with_intent(self, intent, note):
+        # Phase 1: returns (user_id, new balance), or an error code
+        intent_id, from_account, to_account, cents, note_in = intent
+        # related_account_id names an account in another file, which the
+        # foreign key can't see; the balance UPDATE already proved our side
+        with self.on_shard(self.shard_of(from_account)), \
+                transaction(immediate=True, foreign_keys=False) as cursor:
+            cursor.execute("""
+                UPDATE accounts SET balance = balance - ?
+                WHERE id = ? AND balance >= ?
+                RETURNING user_id, balance
+            """, (cents, from_account, cents))
+            debited = cursor.fetchone()
+            if not debited:
+                cursor.execute("SELECT 1 FROM accounts WHERE id = ?", (from_account,))
+                return db_helper.INSUFFICIENT_FUNDS if cursor.fetchone() else db_helper.ACCOUNT_NOT_FOUND
+            if velocity_engine.enabled:
+                velocity_engine.check("transfer", from_account, debited[0], cents, to_account)
+            cursor.execute("""
+                INSERT INTO transactions (account_id, type, amount, note, related_account_id)
+                VALUES (?, 'transfer_out', ?, ?, ?)
+            """, (from_account, cents, note, to_account))
+            cursor.execute("""
+                INSERT INTO transfer_intents (id, from_account, to_account, amount, note_in)
+                VALUES (?, ?, ?, ?, ?)
+            """, intent)
+            after_commit(account_cache.invalidate_account, from_account, debited[0])
+            after_commit(EventBus.notify, "account_updated", debited[0])
+            return debited
+
+    def _apply_intent(self, intent):
+        # Phase 2, idempotent: returns (applied, target user_id), or
+        # (False, error code) when nothing was credited: the target account
+        # doesn't exist, or its balance would pass MAX_CENTS.
+        try:
+            return self._credit_intent(intent)
+        except sqlite3.IntegrityError:
+            return False, db_helper.BALANCE_LIMIT
+
+    def _credit_intent(self, intent):
+        intent_id, from_account, to_account, cents, note_in = intent
+        with self.on_shard(self.shard_of(to_account)), \
+                transaction(immediate=True, foreign_keys=False) as cursor:
+            cursor.execute("INSERT OR IGNORE INTO applied_intents (id) VALUES (?)", (intent_id,))
+            if cursor.rowcount == 0:
+                cursor.execute("SELECT user_id FROM accounts WHERE id = ?", (to_account,))
+                owner = cursor.fetchone()
+                return True, owner[0] if owner else None
+
+            cursor.execute("UPDATE accounts SET balance = balance + ? WHERE id = ? RETURNING user_id",
+                           (cents, to_account))
+            credited = cursor.fetchone()
+            if not credited:
+                # Undo the applied_intents row too, nothing happened here
+                cursor.execute("DELETE FROM applied_intents WHERE id = ?", (intent_id,))
+                return False, db_helper.ACCOUNT_NOT_FOUND
+            cursor.execute("""
+                INSERT INTO transactions (account_id, type, amount, note, related_account_id)
+                VALUES (?, 'transfer_in', ?, ?, ?)
+            """, (to_account, cents, note_in, from_account))
+            after_commit(account_cache.invalidate_account, to_account, credited[0])
+            after_commit(EventBus.notify, "account_updated", credited[0])
+            return True, credited[0]
+
+    def _complete_intent(self, intent):
+        with self.on_shard(self.shard_of(intent[1])), transaction() as cursor:
+            cursor.execute("UPDATE transfer_intents SET status = 'completed' WHERE id = ? AND status = 'debited'",
+                           (intent[0],))
+
+    def _reverse_intent(self, intent):
+        intent_id, from_account, to_account, cents, _ = intent
+        with self.on_shard(self.shard_of(from_account)), \
+                transaction(immediate=True, foreign_keys=False) as cursor:
+            cursor.execute("UPDATE transfer_intents SET status = 'reversed' WHERE id = ? AND status = 'debited'",
+                           (intent_id,))
+            if cursor.rowcount == 0:
+                return  # Already settled one way or the other
+            cursor.execute("UPDATE accounts SET balance = balance + ? WHERE id = ? RETURNING user_id",
+                           (cents, from_account))
+            refunded = cursor.fetchone()
+            cursor.execute("""
+                INSERT INTO transactions (account_id, type, amount, note, related_account_id)
+                VALUES (?, 'transfer_in', ?, ?, ?)
+            """, (from_account, cents, f"Refund: transfer to #{to_account} failed", to_account))
+            if refunded:
+                after_commit(account_cache.invalidate_account, from_account, refunded[0])
+                after_commit(EventBus.notify, "account_updated", refunded[0])
+
+    def recover_transfers(self) -> dict:
+        """Settle every cross-shard transfer a crash left half done."""
+        settled = {"completed": 0, "reversed": 0}
+        for shard in range(self.count):
+            with self.on_shard(shard), transaction() as cursor:
+                cursor.execute("""
+                    SELECT id, from_account, to_account, amount, note_in
+                    FROM transfer_intents WHERE status = 'debited'
+                """)
+                pending = cursor.fetchall()
+            for intent in pending:
+                applied, _ = self._apply_intent(intent)
+                if applied:
+                    self._complete_intent(intent)
+                    settled["completed"] += 1
+                else:
+                    self._reverse_intent(intent)
+                    settled["reversed"] += 1
+        return settled
+
+    # ------------------------ Fan-out Queries ------------------------
+
+    def get_all_users(self) -> list[dict]:
+        per_shard = self._on_each_shard(db_helper.get_all_users)
+        return list(heapq.merge(*(sorted(users, key=lambda u: u["id"]) for users in per_shard),
+                                key=lambda u: u["id"]))
+
+    def search_users(self, query: str = "", after=None, limit: int = 100, substring: bool = False) -> list[dict]:
+        # Each shard returns its own first page; the merged first `limit` is
+        # the global page, since every shard pages in the same order
+        per_shard = self._on_each_shard(db_helper.search_users, query, after, limit, substring)
+        merged = heapq.merge(*per_shard, key=lambda u: (db_helper.fold_nocase(u["username"]), u["id"]))
+        return [user for _, user in zip(range(limit), merged)]
+
+    def get_dashboard_snapshot(self, user_ids: list[int] | None = None, recent_n: int = 5) -> list[dict]:
+        if user_ids is None:
+            per_shard = self._on_each_shard(db_helper.get_dashboard_snapshot, None, recent_n)
+        else:
+            by_shard = {}
+            for user_id in user_ids:
+                by_shard.setdefault(self.shard_of(user_id), []).append(user_id)
+
+            def snapshot(shard):
+                with self.on_shard(shard):
+                    return db_helper.get_dashboard_snapshot(by_shard[shard], recent_n)
+            per_shard = list(self.executor.map(snapshot, by_shard))
+        return list(heapq.merge(*per_shard, key=lambda u: u["id"]))
+
+    def get_ledger_totals(self, group_by=("account",), account_ids=None, since=None, until=None) -> list[dict]:
+        merged = {}
+        for totals in self._on_each_shard(db_helper.get_ledger_totals, group_by, account_ids, since, until):
+            for entry in totals:
+                key = tuple(entry[name] for name in group_by)
+                if key not in merged:
+                    merged[key] = dict(entry)
+                    continue
+                target = merged[key]
+                for field in ("credits", "debits", "net"):
+                    target[field] = target[field] + entry[field]
+                target["count"] += entry["count"]
+        return [merged[key] for key in sorted(merged)]
@@ -0,0 +1,212 @@
+"""Balances at past dates and account statements, from daily snapshots.
+
+catch_up_snapshots() folds transactions committed since its last run into
+balance_snapshots (migration 0006), chunk by chunk. A statement then
+needs one snapshot lookup for its opening balance plus the rows of its
+own period, so it costs the same for an account with ten years of
+history as for one opened last month.
+
+Balances here are derived from the ledger rows, like get_ledger_totals().
+Snapshots never need rows the archive has moved out; statements read
+the archives for periods that reach into them.
+"""
+import datetime
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from database import archive, database
+from database.database import transaction
+from database.money import Money
+
+# Transactions folded into the snapshots per write transaction
+SNAPSHOT_CHUNK = 50_000
+
+# Accounts per task handed to a statement worker process
+STATEMENT_BATCH = 500
+
+_SIGNED_AMOUNT = "CASE WHEN type = 'transfer_out' THEN -amount ELSE amount END"
+
+
+def _day(value):
+    # Snapshots are per day, so statement bounds are dates
+    return datetime.date.fromisoformat(str(value)).isoformat()
+
+
+# ------------------------ Snapshots ------------------------
+
+def catch_up_snapshots(chunk_size: int = SNAPSHOT_CHUNK) -> int:
+    """Bring balance_snapshots up to date; returns how many rows it read.
+
+    Only transactions newer than the last run are read. A new row dated
+    in the past (an import, say) is added to its account's snapshots from
+    that day on.
+    """
+    processed = 0
+    while True:
+        with transaction(immediate=True) as cursor:
+            cursor.execute("SELECT last_transaction_id FROM snapshot_state WHERE id = 1")
+            watermark = cursor.fetchone()[0]
+            cursor.execute("SELECT id FROM transactions WHERE id > ? ORDER BY id LIMIT 1 OFFSET ?",
+                           (watermark, chunk_size - 1))
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute("SELECT MAX(id) FROM transactions")
+                row = cursor.fetchone()
+            upto = row[0] or 0
+            if upto <= watermark:
+                return processed
+
+            cursor.execute(f"""
+                SELECT account_id, substr(timestamp, 1, 10) AS day, SUM({_SIGNED_AMOUNT}), COUNT(*)
+                FROM transactions
+                WHERE id > ? AND id <= ?
+                GROUP BY account_id, day
+                ORDER BY account_id, day
+            """, (watermark, upto))
+            new_days = {}
+            for account_id, day, delta, count in cursor.fetchall():
+                new_days.setdefault(account_id, {})[day] = delta
+                processed += count
+
+            snapshots = []
+            for account_id, deltas in new_days.items():
+                snapshots.extend(_fold_deltas(cursor, account_id, deltas))
+            cursor.executemany("INSERT OR REPLACE INTO balance_snapshots (account_id, day, balance) VALUES (?, ?, ?)",
+                               snapshots)
+            cursor.execute("UPDATE snapshot_state SET last_transaction_id = ? WHERE id = 1", (upto,))
+
+
+def _fold_deltas(cursor, account_id, deltas):
+    # Adds the new rows' per-day sums to the account's snapshots from the
+    # first new day on, reading only snapshots (never older ledger rows,
+    # which may have been archived). Returns the rows to upsert.
+    first_day = min(deltas)
+    cursor.execute("SELECT day, balance FROM balance_snapshots WHERE account_id = ? AND day >= ?",
+                   (account_id, first_day))
+    existing = dict(cursor.fetchall())
+    old_balance = _latest_snapshot(cursor, account_id, first_day)
+    added = 0
+    snapshots = []
+    for day in sorted(existing.keys() | deltas.keys()):
+        old_balance = existing.get(day, old_balance)
+        added += deltas.get(day, 0)
+        snapshots.append((account_id, day, old_balance + added))
+    return snapshots
+
+
+def _latest_snapshot(cursor, account_id, day):
+    cursor.execute("""
+        SELECT balance FROM balance_snapshots
+        WHERE account_id = ? AND day < ?
+        ORDER BY day DESC LIMIT 1
+    """, (account_id, day))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def _balance_before(cursor, account_id, day):
+    # Snapshots hold every row up to the watermark, and there is one for
+    # each day with activity; so the latest one before `day` plus the
+    # not-yet-folded rows before `day` is the exact balance
+    balance = _latest_snapshot(cursor, account_id, day)
+    # +account_id keeps SQLite on the rowid range: the unfolded tail is
+    # short after a catch-up, the account's history before `day` may not be
+    cursor.execute(f"""
+        SELECT COALESCE(SUM({_SIGNED_AMOUNT}), 0)
+        FROM transactions
+        WHERE id > (SELECT last_transaction_id FROM snapshot_state WHERE id = 1)
+          AND +account_id = ? AND timestamp < ?
+    """, (account_id, day))
+    return balance + cursor.fetchone()[0]
+
+
+def get_balance_at(account_id: int, day: str) -> Money:
+    """The account's balance at the end of `day` ("YYYY-MM-DD")."""
+    next_day = datetime.date.fromisoformat(_day(day)) + datetime.timedelta(days=1)
+    with transaction() as cursor:
+        return Money(_balance_before(cursor, account_id, next_day.isoformat()))
+
+
+# ------------------------ Statements ------------------------
+
+def get_statement(account_id: int, since: str, until: str) -> dict:
+    """Statement for the days from `since` up to, not including, `until`.
+
+    Returns the opening and closing balance, the credits and debits
+    (Money) and the period's transactions, oldest first.
+    """
+    since, until = _day(since), _day(until)
+    with transaction() as cursor:
+        opening = _balance_before(cursor, account_id, since)
+        cursor.execute("""
+            SELECT id, type, amount, timestamp, note, related_account_id
+            FROM transactions
+            WHERE account_id = ? AND timestamp >= ? AND timestamp < ?
+            ORDER BY timestamp, id
+        """, (account_id, since, until))
+        rows = cursor.fetchall()
+        if archive.has_partitions(cursor):
+            rows = sorted(archive.archived_rows(account_id, since, until) + rows, key=lambda row: (row[3], row[0]))
+
+    credits = sum(row[2] for row in rows if row[1] != "transfer_out")
+    debits = sum(row[2] for row in rows if row[1] == "transfer_out")
+    return {
+        "account_id": account_id,
+        "since": since,
+        "until": until,
+        "opening_balance": Money(opening),
+        "credits": Money(credits),
+        "debits": Money(debits),
+        "closing_balance": Money(opening + credits - debits),
+        "transactions": [
+            {
+                "id": row[0],
+                "type": row[1],
+                "amount": Money(row[2]),
+                "timestamp": row[3],
+                "note": row[4],
+                "related_account_id": row[5]
+            }
+            for row in rows
+        ],
+    }
+
+
+def month_bounds(month: str) -> tuple[str, str]:
+    # "2025-01" -> ("2025-01-01", "2025-02-01")
+    first = datetime.date.fromisoformat(f"{month}-01")
+    following = (first.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return first.isoformat(), following.isoformat()
+
+
+def _init_worker(path):
+    database.set_database_path(path)
+
+
+def _statement_batch(account_ids, since, until):
+    return [get_statement(account_id, since, until) for account_id in account_ids]
+
+
+def iter_monthly_statements(month: str, processes: int | None = None, account_ids: list[int] | None = None):
+    """Yield every account's statement for `month` ("YYYY-MM"), by account id.
+
+    Snapshots are caught up first, then batches of accounts are spread
+    over `processes` worker processes (default: one per CPU).
+    """
+    since, until = month_bounds(month)
+    catch_up_snapshots()
+    if account_ids is None:
+        with transaction() as cursor:
+            cursor.execute("SELECT id FROM accounts ORDER BY id")
+            account_ids = [row[0] for row in cursor.fetchall()]
+    batches = [account_ids[i:i + STATEMENT_BATCH] for i in range(0, len(account_ids), STATEMENT_BATCH)]
+
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(batches) <= 1:
+        for batch in batches:
+            yield from _statement_batch(batch, since, until)
+        return
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(database.DB_FILENAME,)) as pool:
+        for statements in pool.map(_statement_batch, batches, [since] * len(batches), [until] * len(batches)):
+            yield from statements
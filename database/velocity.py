@@ -0,0 +1,237 @@
+"""In-memory sliding-window velocity limits for postings.
+
+Rules come from a JSON file (BANKING_VELOCITY_RULES, or load()):
+
+    {"rules": [
+        {"name": "withdrawals_per_minute", "scope": "account",
+         "operations": ["withdrawal", "transfer"], "window_seconds": 60, "max_count": 20},
+        {"name": "daily_outflow", "scope": "user",
+         "operations": ["withdrawal", "transfer"], "window_seconds": 86400, "max_amount": "10000.00"},
+        {"name": "same_payee_per_hour", "scope": "counterparty",
+         "operations": ["transfer"], "window_seconds": 3600, "max_count": 10}
+    ]}
+
+scope is what a window is kept per: the account posting, its owner, or
+the (from, to) account pair of a transfer. Each window is a ring of
+BUCKETS time buckets with running totals, so a check is O(1): expire the
+buckets that slid out, compare, add. Windows slide at bucket resolution
+(window / BUCKETS). Without rules the engine is off and postings skip it
+entirely.
+
+db_helper calls check() inside the posting's transaction, after the
+balance UPDATE (which is what tells it the owner). A blocked posting is
+rolled back; an allowed one is counted right away, so concurrent callers
+can't race past a limit. A posting that later fails to commit stays
+counted, which only errs on the strict side.
+
+deposit, record_withdrawal and transfer_funds (sharded ones included)
+all report a block the same way: they raise VelocityLimitExceeded, which
+callers show as "velocity_limit" (HTTP 429). post_batch is exempt. It
+is the bulk path for imports and back-office corrections, whose rows
+aren't customer activity and shouldn't use up a customer's window.
+"""
+import datetime
+import json
+import os
+import threading
+import time
+from array import array
+
+from database.database import transaction
+from database.money import Money
+
+# Buckets per window; more is smoother sliding at more memory per key
+BUCKETS = 12
+
+# Checks between sweeps that drop windows with nothing left in them
+PRUNE_EVERY = 100_000
+
+OPERATIONS = ("deposit", "withdrawal", "transfer")
+SCOPES = ("account", "user", "counterparty")
+
+
+class VelocityLimitExceeded(Exception):
+    def __init__(self, rule):
+        super().__init__(f"velocity limit '{rule}' exceeded")
+        self.rule = rule
+
+
+# A new window: counts in the first BUCKETS slots, amounts in the rest
+_EMPTY = array("q", bytes(16 * BUCKETS))
+
+
+class _Rule:
+    __slots__ = ("name", "scope", "operations", "window", "width", "max_count", "max_amount", "rings")
+
+    def __init__(self, name, scope, operations, window_seconds, max_count=None, max_amount=None):
+        if scope not in SCOPES:
+            raise ValueError(f"rule '{name}': scope must be one of {', '.join(SCOPES)}")
+        unknown = set(operations) - set(OPERATIONS)
+        if unknown:
+            raise ValueError(f"rule '{name}': unknown operations {', '.join(sorted(unknown))}")
+        if max_count is None and max_amount is None:
+            raise ValueError(f"rule '{name}': needs max_count or max_amount")
+        self.name = name
+        self.scope = scope
+        self.operations = tuple(operations)
+        self.window = float(window_seconds)
+        self.width = self.window / BUCKETS
+        # None means no limit; compared as "would the posting go over"
+        self.max_count = max_count if max_count is not None else float("inf")
+        self.max_amount = Money.parse(max_amount).cents if max_amount is not None else float("inf")
+        # key -> [head bucket, count, amount, per-bucket counts and amounts]
+        self.rings = {}
+
+    def key(self, account_id, user_id, counterparty):
+        if self.scope == "account":
+            return account_id
+        if self.scope == "user":
+            return user_id
+        # One int per account pair hashes faster than a tuple
+        return (account_id << 32) | counterparty if counterparty is not None else None
+
+    def current(self, key, bucket):
+        # The key's ring with everything older than the window expired
+        ring = self.rings.get(key)
+        if ring is None:
+            ring = self.rings[key] = [bucket, 0, 0, _EMPTY[:]]
+            return ring
+        head = ring[0]
+        if bucket <= head:
+            return ring
+        if bucket - head >= BUCKETS:
+            ring[1] = ring[2] = 0
+            ring[3] = _EMPTY[:]
+        else:
+            slots = ring[3]
+            for b in range(head + 1, bucket + 1):
+                i = b % BUCKETS
+                ring[1] -= slots[i]
+                ring[2] -= slots[BUCKETS + i]
+                slots[i] = slots[BUCKETS + i] = 0
+        ring[0] = bucket
+        return ring
+
+
+def _add(ring, cents):
+    # Out-of-order times (warm-up, a clock stepping back) land in the head bucket
+    i = ring[0] % BUCKETS
+    ring[1] += 1
+    ring[2] += cents
+    slots = ring[3]
+    slots[i] += 1
+    slots[BUCKETS + i] += cents
+
+
+class VelocityEngine:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rules = []
+        self.by_operation = {}
+        self.enabled = False
+        self.checks = 0
+        self.blocked = 0
+
+    def configure(self, rules: list[dict]):
+        compiled = [_Rule(**rule) for rule in rules]
+        with self.lock:
+            self.rules = compiled
+            self.by_operation = {op: [r for r in compiled if op in r.operations] for op in OPERATIONS}
+            self.enabled = bool(compiled)
+
+    def load(self, path):
+        with open(path, "r") as f:
+            self.configure(json.load(f)["rules"])
+        return len(self.rules)
+
+    def check(self, operation, account_id, user_id, cents, counterparty=None, now=None):
+        """Count the posting, or raise VelocityLimitExceeded without counting it."""
+        now = time.time() if now is None else now
+        with self.lock:
+            self.checks += 1
+            if self.checks % PRUNE_EVERY == 0:
+                self._prune(now)
+            rings = []
+            for rule in self.by_operation[operation]:
+                key = rule.key(account_id, user_id, counterparty)
+                if key is None:
+                    continue
+                ring = rule.current(key, int(now // rule.width))
+                if ring[1] + 1 > rule.max_count or ring[2] + cents > rule.max_amount:
+                    self.blocked += 1
+                    raise VelocityLimitExceeded(rule.name)
+                rings.append(ring)
+            for ring in rings:
+                _add(ring, cents)
+
+    def _record(self, operation, account_id, user_id, cents, counterparty, now):
+        for rule in self.by_operation[operation]:
+            key = rule.key(account_id, user_id, counterparty)
+            if key is not None:
+                _add(rule.current(key, int(now // rule.width)), cents)
+
+    def _prune(self, now):
+        for rule in self.rules:
+            bucket = int(now // rule.width)
+            idle = [key for key, ring in rule.rings.items() if bucket - ring[0] >= BUCKETS]
+            for key in idle:
+                del rule.rings[key]
+
+    def warm(self, now=None) -> int:
+        """Replay recent postings into the windows; returns rows replayed.
+
+        Reads every row timestamped within the longest window, whatever its
+        id (an import can add old-looking rows late), one index range per
+        account. Incoming transfer legs aren't postings of their own and
+        are skipped.
+        """
+        if not self.enabled:
+            return 0
+        now = time.time() if now is None else now
+        oldest = datetime.datetime.fromtimestamp(now - max(r.window for r in self.rules), datetime.timezone.utc)
+        cutoff = oldest.strftime("%Y-%m-%d %H:%M:%S")
+
+        with transaction() as cursor:
+            # CROSS JOIN keeps accounts as the outer loop, so each account is
+            # a seek on (account_id, timestamp) rather than a full table scan
+            cursor.execute("""
+                SELECT t.timestamp, t.id, t.account_id, a.user_id, t.type, t.amount, t.related_account_id
+                FROM accounts a CROSS JOIN transactions t
+                WHERE t.account_id = a.id AND t.timestamp >= ? AND t.type != 'transfer_in'
+            """, (cutoff,))
+            recent = cursor.fetchall()
+        recent.sort()  # Windows only slide forward, so replay oldest first
+
+        with self.lock:
+            for rule in self.rules:
+                rule.rings.clear()
+            for timestamp, _, account_id, user_id, kind, cents, related in recent:
+                if kind == "deposit":
+                    operation = "deposit"
+                else:
+                    operation = "transfer" if related is not None else "withdrawal"
+                at = datetime.datetime.fromisoformat(timestamp).replace(tzinfo=datetime.timezone.utc).timestamp()
+                self._record(operation, account_id, user_id, cents, related, at)
+        return len(recent)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "rules": len(self.rules),
+                "checks": self.checks,
+                "blocked": self.blocked,
+                "keys": sum(len(rule.rings) for rule in self.rules),
+            }
+
+
+velocity_engine = VelocityEngine()
+
+
+def configure_from_environment():
+    # Loads and warms the rules named by BANKING_VELOCITY_RULES, if set.
+    # Returns {"path", "rules", "warmed"} for the caller to report, else None
+    path = os.environ.get("BANKING_VELOCITY_RULES")
+    if not path:
+        return None
+    rules = velocity_engine.load(path)
+    return {"path": path, "rules": rules, "warmed": velocity_engine.warm()}
@@ -0,0 +1,175 @@
+"""Export and import the transaction ledger.
+
+    python ledger.py export -o ledger.csv
+    python ledger.py export --format ndjson --user 3 --since 2025-01-01 --until 2025-02-01
+    python ledger.py import ledger.ndjson --format ndjson
+    python ledger.py snapshots
+    python ledger.py statements 2025-01 -o statements-2025-01.ndjson --processes 4
+    python ledger.py accrue 2025-01 --dry-run
+    python ledger.py archive --keep-months 12
+    python ledger.py vacuum --pages 2000
+
+Both directions stream, so memory use doesn't grow with the ledger size.
+Export and statements write to stdout unless -o is given.
+"""
+import argparse
+import json
+import os
+import sys
+
+from database import database
+from database.accrual import ACCRUAL_CHUNK, load_rules, run_accrual
+from database.archive import (DEFAULT_KEEP_MONTHS, VACUUM_PAGES, archive_transactions, enable_incremental_vacuum,
+                              vacuum_step)
+from database.export import CHUNK_SIZE, FORMATS, ImportFormatError, export_transactions, import_transactions
+from database.migrate import migrate
+from database.statements import catch_up_snapshots, iter_monthly_statements
+
+
+def guess_format(path, default="csv"):
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if extension in ("json", "jsonl", "ndjson"):
+        return "ndjson"
+    return extension if extension in FORMATS else default
+
+
+def run_export(args):
+    fmt = args.format or (guess_format(args.output) if args.output else "csv")
+    filters = {"account_ids": args.account, "user_id": args.user, "since": args.since, "until": args.until}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as out:
+            count = export_transactions(out, fmt, **filters)
+    else:
+        try:
+            count = export_transactions(sys.stdout, fmt, **filters)
+        except BrokenPipeError:
+            # Reader went away (e.g. piped into head); not an error. Point
+            # stdout at devnull so the flush at exit doesn't fail again
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return 0
+    print(f"[INFO] Exported {count} transactions", file=sys.stderr)
+    return 0
+
+
+def run_import(args):
+    fmt = args.format or guess_format(args.input)
+    try:
+        if args.input == "-":
+            result = import_transactions(sys.stdin, fmt, not args.no_balances, args.chunk_size)
+        else:
+            with open(args.input, encoding="utf-8", newline="") as source:
+                result = import_transactions(source, fmt, not args.no_balances, args.chunk_size)
+    except ImportFormatError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+    print(f"[INFO] Imported {result['imported']} transactions, skipped {result['skipped']} "
+          "for unknown accounts", file=sys.stderr)
+    return 0
+
+
+def run_snapshots(args):
+    processed = catch_up_snapshots()
+    print(f"[INFO] Folded {processed} transactions into the balance snapshots", file=sys.stderr)
+    return 0
+
+
+def run_statements(args):
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    count = 0
+    try:
+        for statement in iter_monthly_statements(args.month, args.processes):
+            out.write(json.dumps(statement, default=str) + "\n")
+            count += 1
+    finally:
+        if args.output:
+            out.close()
+    print(f"[INFO] Wrote {count} statements for {args.month}", file=sys.stderr)
+    return 0
+
+
+def run_accrue(args):
+    rules = load_rules(args.rules) if args.rules else None
+    result = run_accrual(args.period, rules, dry_run=args.dry_run, chunk_size=args.chunk_size)
+    verb = "Would post" if args.dry_run else "Posted"
+    print(f"[INFO] {verb} interest {result['interest']} and fees {result['fees']} on {result['accounts']} "
+          f"accounts for {args.period} ({result['status'] or 'not run yet'})", file=sys.stderr)
+    if args.dry_run:
+        for account_type, entry in sorted(result["by_type"].items()):
+            print(f"       {account_type}: {entry['accounts']} accounts, interest {entry['interest']}, "
+                  f"fees {entry['fees']}", file=sys.stderr)
+    return 0
+
+
+def run_archive(args):
+    result = archive_transactions(args.keep_months, vacuum_pages=args.vacuum_pages)
+    print(f"[INFO] Archived {result['rows']} transactions older than {result['horizon']} "
+          f"({len(result['periods'])} months), freed {result['freed_pages']} pages", file=sys.stderr)
+    return 0
+
+
+def run_vacuum(args):
+    if args.enable:
+        if enable_incremental_vacuum():
+            print("[INFO] Incremental vacuum enabled (the file was rebuilt once)", file=sys.stderr)
+        else:
+            print("[INFO] Incremental vacuum was already enabled", file=sys.stderr)
+    print(f"[INFO] Freed {vacuum_step(args.pages)} pages", file=sys.stderr)
+    return 0
+
+
+COMMANDS = {"export": run_export, "import": run_import, "snapshots": run_snapshots, "statements": run_statements,
+            "accrue": run_accrue, "archive": run_archive, "vacuum": run_vacuum}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export, import and report on the transaction ledger.")
+    parser.add_argument("--db", default=database.DB_FILENAME)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="stream transactions to CSV or NDJSON")
+    export.add_argument("-o", "--output", help="file to write (default: stdout)")
+    export.add_argument("--format", choices=FORMATS, help="default: from the file extension, else csv")
+    export.add_argument("--account", type=int, action="append", help="only this account (repeatable)")
+    export.add_argument("--user", type=int, help="only this user's accounts")
+    export.add_argument("--since", help="earliest timestamp, e.g. 2025-01-01")
+    export.add_argument("--until", help="timestamp to stop before (exclusive)")
+
+    load = sub.add_parser("import", help="bulk-load transactions from CSV or NDJSON")
+    load.add_argument("input", help="file to read, or - for stdin")
+    load.add_argument("--format", choices=FORMATS, help="default: from the file extension, else csv")
+    load.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows per committed batch")
+    load.add_argument("--no-balances", action="store_true",
+                      help="insert ledger rows only, leaving account balances as they are")
+
+    sub.add_parser("snapshots", help="fold new transactions into the daily balance snapshots")
+
+    statements = sub.add_parser("statements", help="every account's statement for a month, as NDJSON")
+    statements.add_argument("month", help="YYYY-MM")
+    statements.add_argument("-o", "--output", help="file to write (default: stdout)")
+    statements.add_argument("--processes", type=int, help="worker processes (default: one per CPU)")
+
+    accrue = sub.add_parser("accrue", help="post interest and fees for a period, once")
+    accrue.add_argument("period", help="run key, e.g. 2025-01; a completed period is never posted twice")
+    accrue.add_argument("--dry-run", action="store_true", help="only report what would be posted")
+    accrue.add_argument("--rules", help="JSON file of per-account-type rules (default: built in)")
+    accrue.add_argument("--chunk-size", type=int, default=ACCRUAL_CHUNK, help="accounts per committed batch")
+
+    archive = sub.add_parser("archive", help="move old transactions into monthly archive files")
+    archive.add_argument("--keep-months", type=int, default=DEFAULT_KEEP_MONTHS,
+                         help="months kept in the hot table, counting the current one")
+    archive.add_argument("--vacuum-pages", type=int, default=VACUUM_PAGES,
+                         help="free pages returned to the filesystem afterwards")
+
+    vacuum = sub.add_parser("vacuum", help="return a bounded number of free pages to the filesystem")
+    vacuum.add_argument("--pages", type=int, default=VACUUM_PAGES)
+    vacuum.add_argument("--enable", action="store_true",
+                        help="first switch an older database to incremental vacuum (rewrites the file once)")
+    args = parser.parse_args()
+
+    database.set_database_path(args.db)
+    migrate()
+    return COMMANDS[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
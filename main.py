@@ -1,10 +1,15 @@
 from tkinter import Tk
-from database.database import initialize_database
+from database.database import initialize_database, startup_notices
 from app.ui.login_screen import LoginScreen
+from app.ui import profiler
+from app.event_bus import EventBus
 
 if __name__ == "__main__":
-    initialize_database()
+    for notice in startup_notices(initialize_database()):
+        print(notice)
 
     root = Tk()
+    profiler.configure_from_environment(root)
+    EventBus.attach_tk(root)
     app = LoginScreen(root)
     root.mainloop()
\ No newline at end of file
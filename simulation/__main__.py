@@ -0,0 +1,119 @@
+"""Customer traffic simulator.
+
+    python -m simulation run --workers 4 --rate 500 --ramp-to 5000 --duration 20 --record run.trace
+    python -m simulation replay run.trace --workers 4
+
+`run` builds a fresh database (or reuses --db) and sends virtual customer
+traffic from several processes. `replay` sends a recorded trace again
+with the same timing. Both print throughput, lock errors and latency
+for each second.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from benchmarks.synthetic import build_database
+from simulation.engine import DEFAULT_MIX, Workload, run_simulation
+from simulation.trace import partition, read_trace, write_trace
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown operation '{name}'")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def prepare_database(args, directory):
+    path = args.db or os.path.join(directory, "simulation.db")
+    if args.db and os.path.exists(args.db):
+        from database.database import transaction, set_database_path
+        set_database_path(path)
+        with transaction() as cursor:
+            users = cursor.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+            accounts = cursor.execute("SELECT MAX(id) FROM accounts").fetchone()[0] or 0
+        return path, {"users": users, "accounts": accounts}
+    shape = build_database(path, users=args.customers, accounts_per_user=args.accounts_per_customer,
+                           transactions_per_account=args.history, bcrypt_rounds=args.bcrypt_rounds,
+                           seed=args.seed)
+    return path, shape
+
+
+def print_report(report):
+    print(f"{'sec':>4}{'ops':>8}{'ok':>8}{'locked':>8}{'rejected':>9}{'errors':>8}"
+          f"{'p50 ms':>9}{'p99 ms':>9}{'lag ms':>9}")
+    for entry in report["timeline"]:
+        print(f"{entry['second']:>4}{entry['ops']:>8}{entry['ok']:>8}{entry['locked']:>8}{entry['rejected']:>9}"
+              f"{entry['errors']:>8}{entry['p50_ms']:>9.2f}{entry['p99_ms']:>9.2f}{entry['max_lag_ms']:>9.0f}")
+    print(f"\n{report['operations']} operations in {report['wall_seconds']:.1f}s "
+          f"= {report['throughput']:.0f} ops/s; outcomes: {report['outcomes']}")
+    if report["saturation_second"] is None:
+        print("No saturation: every worker kept up with its schedule.")
+    else:
+        print(f"Writes saturated at second {report['saturation_second']} "
+              "(workers fell behind schedule or hit 'database is locked').")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Customer traffic simulator.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="generate and run a workload")
+    run.add_argument("--workers", type=int, default=4)
+    run.add_argument("--duration", type=float, default=10.0)
+    run.add_argument("--rate", type=float, default=200.0, help="operations/sec across all workers")
+    run.add_argument("--ramp-to", type=float, default=None, help="raise the rate linearly to this by the end")
+    run.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="e.g. deposit=0.4,withdraw=0.2,transfer=0.4")
+    run.add_argument("--skew", type=float, default=1.0, help="Zipf exponent for hot accounts (0 = uniform)")
+    run.add_argument("--customers", type=int, default=1000)
+    run.add_argument("--accounts-per-customer", type=int, default=2)
+    run.add_argument("--history", type=int, default=10, help="pre-existing transactions per account")
+    run.add_argument("--record", help="write the generated trace here")
+
+    replay = sub.add_parser("replay", help="replay a recorded trace with its original timing")
+    replay.add_argument("trace")
+    replay.add_argument("--workers", type=int, default=4)
+    replay.add_argument("--customers", type=int, default=1000)
+    replay.add_argument("--accounts-per-customer", type=int, default=2)
+    replay.add_argument("--history", type=int, default=10)
+
+    for command in (run, replay):
+        command.add_argument("--db", help="existing database to use instead of a fresh one")
+        command.add_argument("--busy-timeout", type=int, default=5000, help="SQLite busy_timeout in ms")
+        command.add_argument("--bcrypt-rounds", type=int, default=4)
+        command.add_argument("--seed", type=int, default=475)
+        command.add_argument("--json", help="also write the report as JSON here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path, shape = prepare_database(args, directory)
+
+        if args.command == "run":
+            workload = Workload(shape["accounts"], shape["users"], mix=args.mix, rate=args.rate,
+                                ramp_to=args.ramp_to, skew=args.skew, seed=args.seed)
+            worker_events = [workload.schedule(w, args.workers, args.duration) for w in range(args.workers)]
+            if args.record:
+                write_trace(args.record, [event for events in worker_events for event in events])
+        else:
+            worker_events = partition(read_trace(args.trace), args.workers)
+
+        try:
+            report = run_simulation(path, worker_events, busy_timeout_ms=args.busy_timeout)
+        except RuntimeError as e:
+            print(f"[ERROR] {e}")
+            return 1
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
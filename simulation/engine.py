@@ -0,0 +1,242 @@
+import bisect
+import itertools
+import multiprocessing
+import queue
+import random
+import sqlite3
+import time
+
+from benchmarks.synthetic import BENCH_PASSWORD, username_for
+from database import database, db_helper
+from database.velocity import VelocityLimitExceeded
+
+DEFAULT_MIX = {"login": 0.05, "deposit": 0.35, "withdraw": 0.2, "transfer": 0.4}
+
+# Latency samples kept per one-second bucket and worker (reservoir sampled)
+SAMPLES_PER_BUCKET = 500
+
+# How often the parent checks that workers are still alive while it waits
+RESULT_POLL_SECONDS = 1.0
+
+
+class Workload:
+    """How virtual customers behave: operation mix, arrival rate and skew."""
+
+    def __init__(self, accounts, users, mix=None, rate=200.0, ramp_to=None, skew=0.0,
+                 max_amount=50.0, seed=475):
+        self.accounts = accounts
+        self.users = users
+        self.mix = dict(mix or DEFAULT_MIX)
+        self.rate = rate
+        self.ramp_to = ramp_to
+        self.skew = skew
+        self.max_amount = max_amount
+        self.seed = seed
+
+    def rate_at(self, elapsed, duration):
+        if self.ramp_to is None or duration <= 0:
+            return self.rate
+        return self.rate + (self.ramp_to - self.rate) * min(1.0, elapsed / duration)
+
+    def schedule(self, worker, workers, duration):
+        # Open-loop Poisson arrivals: each worker gets 1/workers of the rate
+        rng = random.Random(self.seed * 1000 + worker)
+        ops = list(self.mix)
+        op_weights = list(itertools.accumulate(self.mix[op] for op in ops))
+        # Zipf-like hot-account skew; skew=0 is uniform
+        account_weights = list(itertools.accumulate(1.0 / (rank ** self.skew) for rank in range(1, self.accounts + 1)))
+
+        def pick_account():
+            return bisect.bisect_left(account_weights, rng.random() * account_weights[-1]) + 1
+
+        def amount():
+            return round(rng.uniform(0.01, self.max_amount), 2)
+
+        t = 0.0
+        events = []
+        while True:
+            t += rng.expovariate(self.rate_at(t, duration) / workers)
+            if t >= duration:
+                break
+            op = ops[bisect.bisect_left(op_weights, rng.random() * op_weights[-1])]
+            event = {"t": round(t, 6), "w": worker, "op": op}
+            if op == "login":
+                event["user"] = rng.randint(1, self.users)
+            elif op == "transfer":
+                source = pick_account()
+                target = pick_account()
+                while target == source and self.accounts > 1:
+                    target = pick_account()
+                event.update({"from": source, "to": target, "amount": amount()})
+            else:
+                event.update({"account": pick_account(), "amount": amount()})
+            events.append(event)
+        return events
+
+
+# ------------------------ Worker Process ------------------------
+
+def execute(event):
+    """Run one event against db_helper; returns an outcome label."""
+    op = event["op"]
+    if op == "login":
+        return "ok" if db_helper.authenticate_user(username_for(event["user"]), BENCH_PASSWORD) else "rejected"
+    if op == "deposit":
+        return "ok" if db_helper.deposit(event["account"], event["amount"], note="Simulated deposit") else "rejected"
+    if op == "withdraw":
+        return "ok" if db_helper.record_withdrawal(event["account"], event["amount"], note="Simulated withdrawal") else "rejected"
+    result = db_helper.transfer_funds(event["from"], event["to"], event["amount"], note="Simulated transfer")
+    if result:
+        return "ok"
+    if result.error and "locked" in result.error:
+        return "locked"
+    return "rejected"
+
+
+def run_worker(db_path, events, start_at, busy_timeout_ms, results):
+    database.PRAGMAS["busy_timeout"] = busy_timeout_ms
+    database.set_database_path(db_path)
+    rng = random.Random()
+    buckets = {}
+
+    while time.time() < start_at:
+        time.sleep(min(0.01, start_at - time.time()))
+    origin = time.perf_counter()
+
+    for event in events:
+        delay = event["t"] - (time.perf_counter() - origin)
+        if delay > 0:
+            time.sleep(delay)
+
+        began = time.perf_counter()
+        try:
+            outcome = execute(event)
+        except sqlite3.OperationalError as e:
+            outcome = "locked" if "locked" in str(e) or "busy" in str(e) else "error"
+        except VelocityLimitExceeded:
+            outcome = "rejected"
+        except Exception:
+            outcome = "error"
+        finished = time.perf_counter()
+
+        second = int(event["t"])
+        bucket = buckets.setdefault(second, {"ops": 0, "outcomes": {}, "samples": [], "lag": 0.0})
+        bucket["ops"] += 1
+        bucket["outcomes"][outcome] = bucket["outcomes"].get(outcome, 0) + 1
+        # How far behind schedule we started: grows once the DB saturates
+        bucket["lag"] = max(bucket["lag"], began - origin - event["t"])
+        latency = finished - began
+        if len(bucket["samples"]) < SAMPLES_PER_BUCKET:
+            bucket["samples"].append(latency)
+        else:
+            slot = rng.randrange(bucket["ops"])
+            if slot < SAMPLES_PER_BUCKET:
+                bucket["samples"][slot] = latency
+
+    database.close_all_connections()
+    results.put(buckets)
+
+
+# ------------------------ Orchestration ------------------------
+
+def run_simulation(db_path, worker_events, busy_timeout_ms=5000, startup_delay=0.5):
+    """Replay per-worker event lists in parallel processes and merge the metrics."""
+    context = multiprocessing.get_context()
+    results = context.Queue()
+    start_at = time.time() + startup_delay + 0.05 * len(worker_events)
+    processes = [
+        context.Process(target=run_worker, args=(db_path, events, start_at, busy_timeout_ms, results))
+        for events in worker_events
+    ]
+    for process in processes:
+        process.start()
+    try:
+        collected = _collect(processes, results)
+    except BaseException:
+        for process in processes:
+            process.terminate()
+        raise
+    finally:
+        for process in processes:
+            process.join()
+    wall = time.time() - start_at
+    return merge_metrics(collected, wall)
+
+
+def _collect(processes, results):
+    # One result per worker. A worker that dies (exception, OOM, signal)
+    # never reports, so waiting must also watch the exit codes.
+    collected = []
+    while len(collected) < len(processes):
+        try:
+            collected.append(results.get(timeout=RESULT_POLL_SECONDS))
+            continue
+        except queue.Empty:
+            pass
+        failed = [(index, p.exitcode) for index, p in enumerate(processes) if p.exitcode not in (None, 0)]
+        if failed:
+            index, code = failed[0]
+            raise RuntimeError(f"simulation worker {index} exited with code {code} without reporting")
+        if all(p.exitcode is not None for p in processes):
+            # Everyone exited cleanly; anything still in flight is in the pipe
+            try:
+                collected.append(results.get(timeout=RESULT_POLL_SECONDS))
+            except queue.Empty:
+                missing = len(processes) - len(collected)
+                raise RuntimeError(f"{missing} simulation worker(s) exited without reporting")
+    return collected
+
+
+def _percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def merge_metrics(worker_buckets, wall_seconds):
+    seconds = {}
+    totals = {}
+    for buckets in worker_buckets:
+        for second, bucket in buckets.items():
+            merged = seconds.setdefault(second, {"ops": 0, "outcomes": {}, "samples": [], "lag": 0.0})
+            merged["ops"] += bucket["ops"]
+            merged["samples"].extend(bucket["samples"])
+            merged["lag"] = max(merged["lag"], bucket["lag"])
+            for outcome, count in bucket["outcomes"].items():
+                merged["outcomes"][outcome] = merged["outcomes"].get(outcome, 0) + count
+                totals[outcome] = totals.get(outcome, 0) + count
+
+    timeline = []
+    for second in sorted(seconds):
+        bucket = seconds[second]
+        timeline.append({
+            "second": second,
+            "ops": bucket["ops"],
+            "ok": bucket["outcomes"].get("ok", 0),
+            "locked": bucket["outcomes"].get("locked", 0),
+            "rejected": bucket["outcomes"].get("rejected", 0),
+            "errors": bucket["outcomes"].get("error", 0),
+            "p50_ms": _percentile(bucket["samples"], 0.50) * 1000,
+            "p99_ms": _percentile(bucket["samples"], 0.99) * 1000,
+            "max_lag_ms": bucket["lag"] * 1000,
+        })
+
+    operations = sum(totals.values())
+    return {
+        "wall_seconds": wall_seconds,
+        "operations": operations,
+        "throughput": operations / wall_seconds if wall_seconds > 0 else 0.0,
+        "outcomes": totals,
+        "timeline": timeline,
+        "saturation_second": find_saturation(timeline),
+    }
+
+
+def find_saturation(timeline, lag_ms=250.0):
+    # First second where workers fell clearly behind their schedule or hit
+    # lock errors: offered load has passed what SQLite can commit
+    for entry in timeline:
+        if entry["locked"] or entry["max_lag_ms"] > lag_ms:
+            return entry["second"]
+    return None
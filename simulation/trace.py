@@ -0,0 +1,34 @@
+import json
+
+# One event per line, ordered by "t" (seconds since the run started):
+#   {"t": 0.0123, "w": 0, "op": "transfer", "from": 3, "to": 17, "amount": 1.5}
+#   {"t": 0.0150, "w": 1, "op": "deposit", "account": 8, "amount": 20.0}
+#   {"t": 0.0170, "w": 1, "op": "withdraw", "account": 8, "amount": 5.0}
+#   {"t": 0.0210, "w": 0, "op": "login", "user": 4}
+
+
+def write_trace(path, events):
+    with open(path, "w") as f:
+        for event in sorted(events, key=lambda e: e["t"]):
+            f.write(json.dumps(event, separators=(",", ":")))
+            f.write("\n")
+
+
+def read_trace(path):
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def partition(events, workers):
+    # Keep each event on the worker that recorded it when the worker count
+    # matches, otherwise spread round-robin
+    events = list(events)
+    recorded = {event.get("w") for event in events}
+    keep = None not in recorded and recorded <= set(range(workers)) and workers - 1 in recorded
+    buckets = [[] for _ in range(workers)]
+    for index, event in enumerate(events):
+        buckets[event["w"] if keep else index % workers].append(event)
+    return buckets
@@ -0,0 +1,14 @@
+import pytest
+
+from benchmarks.synthetic import build_database
+from database import database
+
+
+@pytest.fixture
+def small_bank(tmp_path):
+    # 20 users with two accounts each (ids 1-40) and a few rows per account
+    path = str(tmp_path / "bank.db")
+    build_database(path, users=20, accounts_per_user=2, transactions_per_account=3, bcrypt_rounds=4)
+    yield path
+    database.close_all_connections()
+    database.set_database_path("banking.db")
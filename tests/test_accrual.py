@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.synthetic import build_database
+from database import accrual, database
+from database.cache import account_cache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def bank(tmp_path):
+    path = str(tmp_path / "accrual.db")
+    build_database(path, users=1000, accounts_per_user=2, transactions_per_account=1, bcrypt_rounds=4)
+    yield path
+    database.close_all_connections()
+    database.set_database_path("banking.db")
+
+
+def duplicate_postings(period):
+    with database.transaction() as cursor:
+        cursor.execute("""
+            SELECT account_id, note FROM transactions
+            WHERE note IN (?, ?)
+            GROUP BY account_id, note
+            HAVING COUNT(*) > 1
+        """, (f"Interest {period}", f"Fee {period}"))
+        return cursor.fetchall()
+
+
+def test_interleaved_runs_post_each_account_once(bank, monkeypatch):
+    expected = accrual.preview_accrual("2025-01")["accounts"]
+    clear = account_cache.clear
+    started = []
+
+    def clear_then_race():
+        # After the outer run's first chunk commits, a second run of the
+        # same period takes over and finishes it
+        clear()
+        if not started:
+            started.append(True)
+            accrual.run_accrual("2025-01", chunk_size=100)
+
+    monkeypatch.setattr(account_cache, "clear", clear_then_race)
+    summary = accrual.run_accrual("2025-01", chunk_size=100)
+
+    assert started
+    assert summary["status"] == "completed"
+    assert summary["accounts"] == expected
+    assert duplicate_postings("2025-01") == []
+
+
+def test_concurrent_processes_post_each_account_once(bank):
+    expected = accrual.preview_accrual("2025-02")["accounts"]
+    database.close_all_connections()
+    code = ("import sys; from database import accrual, database; database.set_database_path(sys.argv[1]); "
+            "accrual.run_accrual('2025-02', chunk_size=20)")
+    env = {**os.environ, "PYTHONPATH": ROOT}
+    workers = [subprocess.Popen([sys.executable, "-c", code, bank], env=env, stdout=subprocess.DEVNULL)
+               for _ in range(2)]
+    assert [worker.wait(timeout=120) for worker in workers] == [0, 0]
+
+    assert accrual.run_accrual("2025-02")["accounts"] == expected
+    assert duplicate_postings("2025-02") == []
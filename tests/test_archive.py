@@ -0,0 +1,68 @@
+import datetime
+import io
+import os
+
+import pytest
+
+from database import archive, database, db_helper, export
+from database.money import Money
+
+TODAY = datetime.date(2024, 4, 15)
+
+
+@pytest.fixture
+def archived(small_bank):
+    # One row a day from 2024-01-02, then every month before April archived
+    with database.transaction() as cursor:
+        cursor.execute("UPDATE transactions SET timestamp = datetime('2024-01-01', '+' || id || ' days')")
+    result = archive.archive_transactions(keep_months=1, today=TODAY)
+    assert result["periods"] == ["2024-01", "2024-02", "2024-03"]
+    for _ in range(3):
+        assert db_helper.deposit(1, Money(100))  # hot rows, timestamped now
+    return small_bank
+
+
+def all_pages(account_id, limit):
+    rows, before = [], None
+    while True:
+        page = db_helper.get_transaction_page(account_id, before=before, limit=limit)
+        rows += page
+        if len(page) < limit:
+            return rows
+        before = (page[-1]["timestamp"], page[-1]["id"])
+
+
+def expected(account_id):
+    with database.transaction() as cursor:
+        cursor.execute("SELECT id, timestamp FROM transactions WHERE account_id = ?", (account_id,))
+        rows = cursor.fetchall() + [(row[0], row[3]) for row in archive.archived_rows(account_id)]
+    return sorted(rows, key=lambda row: (row[1], row[0]), reverse=True)
+
+
+@pytest.mark.parametrize("limit", [1, 2, 100])
+def test_pages_cross_into_the_archives(archived, limit):
+    rows = all_pages(1, limit)
+    assert [(row["id"], row["timestamp"]) for row in rows] == expected(1)
+    assert any(row["timestamp"] < "2024-04" for row in rows) and any(row["timestamp"] >= "2024-04" for row in rows)
+
+
+def test_backdated_rows_merge_with_archived_ones(archived):
+    source = io.StringIO("account_id,type,amount,timestamp\n1,deposit,1.00,2024-01-01 12:00:00\n")
+    assert export.import_transactions(source)["imported"] == 1
+    for limit in (1, 2, 100):
+        rows = all_pages(1, limit)
+        assert [(row["id"], row["timestamp"]) for row in rows] == expected(1)
+    history = db_helper.get_transaction_history(1)
+    assert [row["timestamp"] for row in history] == [timestamp for _, timestamp in expected(1)]
+
+
+def test_deleting_all_users_empties_the_archives(archived):
+    directory = archive.archive_directory()
+    assert archive.list_partitions()
+    db_helper.delete_all_users()
+    assert archive.list_partitions() == []
+    for filename in os.listdir(directory):
+        if filename.endswith(".db"):
+            with database.transaction(path=os.path.join(directory, filename)) as cursor:
+                cursor.execute("SELECT COUNT(*) FROM transactions")
+                assert cursor.fetchone()[0] == 0
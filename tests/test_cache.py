@@ -0,0 +1,25 @@
+import sqlite3
+
+from database import db_helper
+from database.cache import account_cache
+from database.money import Money
+
+
+def test_own_writes_invalidate_at_once(small_bank, monkeypatch):
+    monkeypatch.setattr(account_cache, "check_interval", 3600)
+    before = db_helper.get_account_balance(1)
+    assert db_helper.deposit(1, Money(500))
+    assert db_helper.get_account_balance(1) == before + Money(500)
+
+
+def test_other_connections_are_noticed_after_the_interval(small_bank, monkeypatch):
+    monkeypatch.setattr(account_cache, "check_interval", 3600)
+    before = db_helper.get_account_balance(1)
+    other = sqlite3.connect(small_bank)
+    with other:
+        other.execute("UPDATE accounts SET balance = balance + 500 WHERE id = 1")
+    other.close()
+    assert db_helper.get_account_balance(1) == before  # still within the interval
+
+    monkeypatch.setattr(account_cache, "check_interval", 0)
+    assert db_helper.get_account_balance(1) == before + Money(500)
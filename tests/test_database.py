@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+from database import database
+
+
+def test_after_commit_runs_every_callback_then_raises(small_bank):
+    ran = []
+
+    def fail(name):
+        ran.append(name)
+        raise RuntimeError(name)
+
+    with pytest.raises(RuntimeError, match="first"):
+        with database.transaction() as cursor:
+            cursor.execute("UPDATE accounts SET balance = 0 WHERE id = 1")
+            database.after_commit(fail, "first")
+            database.after_commit(ran.append, "second")
+            database.after_commit(fail, "third")
+    assert ran == ["first", "second", "third"]
+    with database.transaction() as cursor:
+        cursor.execute("SELECT balance FROM accounts WHERE id = 1")
+        assert cursor.fetchone()[0] == 0  # committed all the same
+
+
+def test_after_commit_is_dropped_on_rollback(small_bank):
+    ran = []
+    with pytest.raises(KeyError):
+        with database.transaction():
+            database.after_commit(ran.append, "outer")
+            raise KeyError
+    assert ran == []
+
+
+def balance_of(account_id):
+    with database.transaction() as cursor:
+        cursor.execute("SELECT balance FROM accounts WHERE id = ?", (account_id,))
+        return cursor.fetchone()[0]
+
+
+def test_connections_are_pooled_per_thread_and_path(small_bank, tmp_path):
+    import threading
+
+    conn = database.get_connection()
+    assert database.get_connection() is conn
+    assert database.get_connection(str(tmp_path / "other.db")) is not conn
+    other = []
+    thread = threading.Thread(target=lambda: other.append(database.get_connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+
+
+def test_nested_transactions_are_savepoints(small_bank):
+    before = balance_of(1)
+    with database.transaction() as cursor:
+        cursor.execute("UPDATE accounts SET balance = balance + 1 WHERE id = 1")
+        with pytest.raises(ValueError):
+            with database.transaction() as inner:
+                inner.execute("UPDATE accounts SET balance = balance + 10 WHERE id = 1")
+                raise ValueError
+        with database.transaction() as inner:
+            inner.execute("UPDATE accounts SET balance = balance + 100 WHERE id = 1")
+        assert database.in_transaction()
+    assert not database.in_transaction()
+    assert balance_of(1) == before + 101  # only the failed savepoint was undone
+
+    with pytest.raises(ValueError):
+        with database.transaction() as cursor:
+            cursor.execute("UPDATE accounts SET balance = 0 WHERE id = 1")
+            with database.transaction() as inner:
+                inner.execute("UPDATE accounts SET balance = 0 WHERE id = 2")
+            raise ValueError
+    assert balance_of(1) == before + 101  # the outer rollback takes the savepoint with it
+
+
+def test_reset_removes_the_database_and_its_sidecars(small_bank):
+    from database.reset import reset_database
+
+    database.close_all_connections()
+    for suffix in ("-wal", "-shm"):
+        open(small_bank + suffix, "ab").close()  # as a crashed process leaves them
+    removed = reset_database(small_bank)
+    assert sorted(removed) == sorted(small_bank + suffix for suffix in ("", "-shm", "-wal"))
+    assert not any(os.path.exists(small_bank + suffix) for suffix in ("", "-wal", "-shm"))
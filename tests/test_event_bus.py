@@ -0,0 +1,75 @@
+import pytest
+
+from app.event_bus import EventBus
+
+
+class FakeRoot:
+    # Stands in for Tk: after() only records the job, run() fires them
+    def __init__(self):
+        self.jobs = {}
+        self.next_id = 0
+
+    def after(self, delay_ms, callback):
+        self.next_id += 1
+        self.jobs[f"after#{self.next_id}"] = callback
+        return f"after#{self.next_id}"
+
+    def after_cancel(self, after_id):
+        del self.jobs[after_id]
+
+    def run(self):
+        jobs, self.jobs = self.jobs, {}
+        for callback in jobs.values():
+            callback()
+
+
+@pytest.fixture
+def root():
+    root = FakeRoot()
+    EventBus.attach_tk(root)
+    yield root
+    EventBus.detach()
+
+
+def test_pump_is_only_scheduled_while_events_are_pending(root):
+    received = []
+    EventBus.subscribe("ping", received.append)
+    try:
+        assert root.jobs == {}
+        EventBus.notify("ping", 1)
+        EventBus.notify("ping", 1)
+        EventBus.notify("ping", 2)
+        assert len(root.jobs) == 1
+        root.run()
+        assert received == [1, 2]
+        assert root.jobs == {}
+    finally:
+        EventBus.unsubscribe("ping", received.append)
+
+
+def test_failing_subscriber_does_not_drop_the_batch(root, capsys):
+    received = []
+
+    def fail(data):
+        raise RuntimeError("boom")
+
+    EventBus.subscribe("bad", fail)
+    EventBus.subscribe("good", received.append)
+    try:
+        EventBus.notify("bad", 1)
+        EventBus.notify("good", 2)
+        root.run()
+        assert received == [2]
+        assert "[ERROR] bad" in capsys.readouterr().out
+        EventBus.notify("good", 3)
+        root.run()
+        assert received == [2, 3]
+    finally:
+        EventBus.unsubscribe("bad", fail)
+        EventBus.unsubscribe("good", received.append)
+
+
+def test_detach_cancels_the_pump(root):
+    EventBus.notify("ping", 1)
+    EventBus.detach()
+    assert root.jobs == {}
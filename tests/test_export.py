@@ -0,0 +1,47 @@
+import io
+
+import pytest
+
+from database import database, db_helper, export
+from database.money import Money
+
+
+def test_export_reads_in_short_transactions(small_bank):
+    rows = export.iter_transactions(chunk_size=5)
+    first = next(rows)
+    assert not database.in_transaction()  # nothing held open between chunks
+    assert db_helper.deposit(1, Money(100))  # a writer isn't held up by the reader
+    rest = list(rows)
+    ids = [first[0]] + [row[0] for row in rest]
+    assert ids == sorted(ids) and len(ids) == len(set(ids))
+    assert ids[-1] == db_helper.get_transaction_page(1, limit=1)[0]["id"]
+
+
+def test_export_by_account_pages_in_order(small_bank):
+    rows = list(export.iter_transactions(user_id=2, chunk_size=2))
+    assert {row[1] for row in rows} == {3, 4}
+    assert rows == sorted(rows, key=lambda row: (row[1], row[4], row[0]))
+    assert list(export.iter_transactions(account_ids=[3, 99], user_id=2)) == [row for row in rows if row[1] == 3]
+
+
+def csv_rows(*rows):
+    return io.StringIO("account_id,type,amount,timestamp\n" + "".join(f"{row}\n" for row in rows))
+
+
+@pytest.mark.parametrize("timestamp", ["yesterday", "2025-13-01 00:00:00", "2025-01-01T00:00:00", "2025-01-01"])
+def test_import_rejects_malformed_timestamps(small_bank, timestamp):
+    with pytest.raises(export.ImportFormatError, match="line 2"):
+        export.import_transactions(csv_rows(f"1,deposit,1.00,{timestamp}"))
+
+
+def test_import_rejects_negative_balances(small_bank):
+    balance = db_helper.get_account_balance(1)
+    source = csv_rows("1,deposit,1.00,2025-01-01 00:00:00",
+                      f"1,transfer_out,{balance + Money(200)},2025-01-02 00:00:00",
+                      "2,deposit,1.00,2025-01-03 00:00:00")
+    with pytest.raises(export.ImportFormatError, match="line 3: account #1"):
+        export.import_transactions(source)
+    assert db_helper.get_account_balance(1) == balance  # the whole chunk rolled back
+
+    source = csv_rows(f"1,transfer_out,{balance + Money(200)},2025-01-02 00:00:00")
+    assert export.import_transactions(source, apply_balances=False) == {"imported": 1, "skipped": 0}
@@ -0,0 +1,61 @@
+import sqlite3
+
+import pytest
+
+from database import database, migrate
+
+
+@pytest.fixture
+def scratch(tmp_path):
+    database.set_database_path(str(tmp_path / "scratch.db"))
+    yield tmp_path
+    database.close_all_connections()
+    database.set_database_path("banking.db")
+
+
+def versions():
+    return database.get_connection().execute("SELECT version, name FROM schema_version ORDER BY version").fetchall()
+
+
+def test_applies_each_migration_once(scratch):
+    expected = [(version, name) for version, name, _ in migrate.list_migrations()]
+    assert migrate.migrate() == [version for version, _ in expected]
+    assert migrate.migrate() == []
+    assert versions() == expected
+
+
+def test_skips_what_another_process_applied_meanwhile(scratch, monkeypatch):
+    migrate.migrate()
+    # As if this process read schema_version just before another one migrated
+    monkeypatch.setattr(migrate, "get_schema_version", lambda path=None: 0)
+    assert migrate.migrate() == []
+    assert len(versions()) == len(migrate.list_migrations())
+
+
+def test_failed_migration_changes_nothing(scratch, monkeypatch):
+    (scratch / "0001_first.sql").write_text("CREATE TABLE first (note TEXT DEFAULT 'a;b');\n")
+    (scratch / "0002_broken.sql").write_text("-- one good statement; then a bad one\n"
+                                             "CREATE TABLE second (id INTEGER);\nINSERT INTO nowhere VALUES (1);\n")
+    monkeypatch.setattr(migrate, "MIGRATIONS_DIR", str(scratch))
+    with pytest.raises(sqlite3.OperationalError):
+        migrate.migrate()
+    assert versions() == [(1, "first")]
+    tables = {row[0] for row in database.get_connection().execute("SELECT name FROM sqlite_master")}
+    assert "first" in tables and "second" not in tables
+
+
+def test_statements_split_where_sqlite_would():
+    script = ("CREATE TABLE a (x TEXT DEFAULT 'a;b'); -- c; d\n"
+              "CREATE TRIGGER t AFTER INSERT ON a BEGIN SELECT 1; SELECT 2; END;\n")
+    statements = list(migrate._statements(script))
+    assert len(statements) == 2
+    assert statements[1].strip().startswith("-- c; d\nCREATE TRIGGER")
+
+
+def test_initialize_database_reports_instead_of_printing(scratch, capsys):
+    created = database.initialize_database()
+    assert created["created"] and created["migrations"] == [version for version, _, _ in migrate.list_migrations()]
+    assert database.initialize_database() == {"path": database.DB_FILENAME, "created": False, "migrations": [],
+                                             "metrics": False, "velocity": None}
+    assert capsys.readouterr().out == ""
+    assert database.startup_notices(created)[0] == "[INFO] No database found. Creating new one..."
@@ -0,0 +1,66 @@
+import asyncio
+import json
+import sqlite3
+
+import pytest
+
+from app.service.bank_service import BankService
+from app.service.server import BankServer
+from database import database, db_helper
+from database.money import MAX_CENTS, Money
+
+
+@pytest.mark.parametrize("text, cents", [
+    ("12.34", 1234), ("1,000", 100000), (" 0.1 ", 10), (0.1, 10), (7, 700), (Money(5), 5),
+    (str(MAX_CENTS // 100), MAX_CENTS), (-(MAX_CENTS // 100), -MAX_CENTS),
+])
+def test_parse(text, cents):
+    assert Money.parse(text).cents == cents
+
+
+@pytest.mark.parametrize("text", [
+    "", "abc", "1.234", "NaN", "inf", True, None, "1e400", 1e20, 1e400, -1e20, MAX_CENTS, "10000000000000.01",
+])
+def test_parse_rejects(text):
+    with pytest.raises(ValueError):
+        Money.parse(text)
+
+
+def test_balances_stay_integers_within_bounds(small_bank):
+    with database.transaction() as cursor:
+        cursor.execute("UPDATE accounts SET balance = ? WHERE id = 1", (MAX_CENTS - 100,))
+    for statement, value in [("balance + ?", 101), ("balance + ?", 0.5), ("?", 2.5), ("?", -MAX_CENTS - 1)]:
+        with pytest.raises(sqlite3.IntegrityError), database.transaction() as cursor:
+            cursor.execute(f"UPDATE accounts SET balance = {statement} WHERE id = 1", (value,))
+    assert db_helper.get_account_balance(1) == Money(MAX_CENTS - 100)
+
+
+def test_credits_past_the_limit_are_refused(small_bank):
+    with database.transaction() as cursor:
+        cursor.execute("UPDATE accounts SET balance = ? WHERE id = 1", (MAX_CENTS - 100,))
+    assert not db_helper.deposit(1, Money(101))
+    assert db_helper.transfer_funds(2, 1, Money(101)).error == db_helper.BALANCE_LIMIT
+    assert db_helper.post_batch([{"account_id": 1, "type": "deposit", "amount": Money(101)}])[0]["error"] \
+        == db_helper.BALANCE_LIMIT
+    assert db_helper.deposit(1, Money(100))
+    assert db_helper.get_account_balance(1) == Money(MAX_CENTS)
+
+
+def test_api_rejects_oversized_amounts(small_bank):
+    with database.transaction() as cursor:
+        cursor.execute("UPDATE accounts SET balance = ? WHERE id = 1", (MAX_CENTS - 100,))
+
+    async def post(path, body):
+        server = BankServer(BankService(max_workers=1))
+        try:
+            return await server.respond("POST", path, json.dumps(body).encode())
+        finally:
+            server.service.close()
+
+    for amount in ["1e400", 1e20, MAX_CENTS]:
+        status, payload = asyncio.run(post("/accounts/1/deposit", {"amount": amount}))
+        assert (status, payload["error"]) == (400, "bad_request")
+    status, payload = asyncio.run(post("/accounts/1/deposit", {"amount": "1.01"}))
+    assert (status, payload["error"]) == (422, db_helper.BALANCE_LIMIT)
+    status, payload = asyncio.run(post("/accounts/99/deposit", {"amount": "1.00"}))
+    assert (status, payload["error"]) == (404, db_helper.ACCOUNT_NOT_FOUND)
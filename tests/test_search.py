@@ -0,0 +1,63 @@
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+
+from database import database, db_helper
+from database.sharding import ShardedLedger, shard_paths
+
+NAMES = ["ada", "Adam", "Ézra", "éa", "Eve", "Zed", "zoë", "Zoe"]
+
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_helper, "BCRYPT_ROUNDS", 4)
+    ledger = ShardedLedger.open(shard_paths(str(tmp_path), 3))
+    for name in NAMES:
+        assert ledger.create_user(name, "password")
+    yield ledger
+    ledger.close()
+    database.set_database_path("banking.db")
+
+
+def usernames(users):
+    return [user["username"] for user in users]
+
+
+def test_prefixes_fold_ascii_only(ledger):
+    # NOCASE leaves "É" and "é" distinct, and a folded prefix must too
+    assert usernames(ledger.search_users("ad")) == ["ada", "Adam"]
+    assert usernames(ledger.search_users("É")) == ["Ézra"]
+    assert usernames(ledger.search_users("é")) == ["éa"]
+    assert usernames(ledger.search_users("ZO")) == ["Zoe", "zoë"]
+
+
+def test_sharded_pages_follow_nocase_order(ledger):
+    # The order one SQLite database would give, and paging through it
+    with database.bind_database_path(ledger.paths[0]), database.transaction() as cursor:
+        cursor.execute("CREATE TEMP TABLE names (name TEXT)")
+        cursor.executemany("INSERT INTO names VALUES (?)", [(name,) for name in NAMES])
+        cursor.execute("SELECT name FROM names ORDER BY name COLLATE NOCASE")
+        expected = [row[0] for row in cursor.fetchall()]
+        cursor.execute("DROP TABLE names")
+
+    assert usernames(ledger.search_users()) == expected
+    pages, after = [], None
+    while True:
+        page = ledger.search_users(after=after, limit=3)
+        if not page:
+            break
+        pages += usernames(page)
+        after = (page[-1]["username"], page[-1]["id"])
+    assert pages == expected
+
+
+def test_missing_trigram_tokenizer_returns_false_quietly(monkeypatch, capsys):
+    @contextmanager
+    def no_tokenizer(**kwargs):
+        raise sqlite3.OperationalError("no such tokenizer: trigram")
+        yield
+
+    monkeypatch.setattr(db_helper, "transaction", no_tokenizer)
+    assert db_helper.enable_username_trigram_index() is False
+    assert capsys.readouterr().out == ""
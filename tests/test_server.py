@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+import pytest
+
+from app.service.bank_service import BankService
+from app.service.server import BankServer, MAX_PAGE_SIZE
+from database import db_helper
+from database.money import Money
+
+
+def request(method, path, body=None):
+    async def send():
+        server = BankServer(BankService(max_workers=1))
+        try:
+            return await server.respond(method, path, json.dumps(body).encode() if body is not None else b"")
+        finally:
+            server.service.close()
+
+    return asyncio.run(send())
+
+
+@pytest.mark.parametrize("method, path, body, status, error", [
+    ("GET", "/nowhere", None, 404, "not_found"),
+    ("DELETE", "/accounts/1/balance", None, 405, "method_not_allowed"),
+    ("GET", "/accounts/999/balance", None, 404, db_helper.ACCOUNT_NOT_FOUND),
+    ("POST", "/accounts/1/deposit", {}, 400, "bad_request"),
+    ("POST", "/accounts/1/deposit", {"amount": "1.001"}, 400, "bad_request"),
+    ("POST", "/accounts/1/deposit", {"amount": "-1"}, 422, db_helper.INVALID_AMOUNT),
+    ("POST", "/accounts/1/withdraw", {"amount": "99999999"}, 422, db_helper.INSUFFICIENT_FUNDS),
+    ("POST", "/transfers", {"from_account": 1, "to_account": 1, "amount": 1}, 422, db_helper.SAME_ACCOUNT),
+    ("POST", "/transfers", {"from_account": 1, "to_account": 999, "amount": 1}, 422, db_helper.ACCOUNT_NOT_FOUND),
+    ("POST", "/transfers", {"from_account": True, "to_account": 2, "amount": 1}, 400, "bad_request"),
+    ("POST", "/login", {"username": "user000001", "password": "wrong"}, 401, "invalid_credentials"),
+    ("GET", "/accounts/1/transactions?limit=0", None, 400, "bad_request"),
+    ("GET", "/accounts/1/transactions?limit=-1", None, 400, "bad_request"),
+    ("GET", "/accounts/1/transactions?limit=ten", None, 400, "bad_request"),
+])
+def test_error_statuses(small_bank, method, path, body, status, error):
+    response_status, payload = request(method, path, body)
+    assert (response_status, payload["error"]) == (status, error)
+
+
+def test_history_pages_and_clamps_the_limit(small_bank):
+    status, first = request("GET", "/accounts/1/transactions?limit=1")
+    assert status == 200 and len(first["transactions"]) == 1
+    timestamp, row_id = first["next"]
+    status, second = request("GET", f"/accounts/1/transactions?limit=1&before_timestamp={timestamp}&before_id={row_id}")
+    assert second["transactions"][0]["id"] != row_id
+
+    for _ in range(MAX_PAGE_SIZE + 1):
+        db_helper.deposit(1, Money(1))
+    status, page = request("GET", "/accounts/1/transactions?limit=100000")
+    assert status == 200 and len(page["transactions"]) == MAX_PAGE_SIZE
+    assert page["next"] is not None  # more rows remain past the clamped page
@@ -0,0 +1,93 @@
+import sqlite3
+
+import pytest
+
+from database import database, db_helper, sharding
+from database.money import Money
+from database.sharding import ShardedLedger, shard_paths
+
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    # Two shards, and an account on each: (ledger, source, target)
+    monkeypatch.setattr(db_helper, "BCRYPT_ROUNDS", 4)
+    ledger = ShardedLedger.open(shard_paths(str(tmp_path), 2))
+    accounts = {}
+    for index in range(20):
+        username = f"user{index}"
+        shard = ledger.shard_for_username(username)
+        if shard not in accounts:
+            ledger.create_user(username, "password")
+            accounts[shard] = ledger.create_account(ledger.get_user_id_by_username(username), "Checking")
+    ledger.deposit(accounts[0], Money(1000))
+    yield ledger, accounts[0], accounts[1]
+    ledger.close()
+    database.set_database_path("banking.db")
+
+
+def intent_statuses(ledger):
+    with ledger.on_shard(0), database.transaction() as cursor:
+        cursor.execute("SELECT status FROM transfer_intents")
+        return [row[0] for row in cursor.fetchall()]
+
+
+def crash_before_credit(ledger, monkeypatch, source, target):
+    # The debit commits, then the target shard can't be written
+    def locked(intent):
+        raise sqlite3.OperationalError("database is locked")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(ledger, "_apply_intent", locked)
+        result = ledger.transfer_funds(source, target, Money(300))
+    assert not result and result.error == sharding.TRANSFER_PENDING
+    assert intent_statuses(ledger) == ["debited"]
+
+
+def test_recovery_completes_a_debited_transfer(ledger, monkeypatch):
+    ledger, source, target = ledger
+    crash_before_credit(ledger, monkeypatch, source, target)
+    assert ledger.get_account_balance(source) == Money(700)
+    assert ledger.get_account_balance(target) == Money(0)
+
+    assert ledger.recover_transfers() == {"completed": 1, "reversed": 0}
+    assert ledger.get_account_balance(target) == Money(300)
+    assert intent_statuses(ledger) == ["completed"]
+    assert ledger.recover_transfers() == {"completed": 0, "reversed": 0}
+
+
+def test_recovery_does_not_credit_twice(ledger):
+    # A crash after the credit but before the intent was marked completed
+    ledger, source, target = ledger
+    intent = ("crashed", source, target, 300, "Transfer")
+    ledger._debit_with_intent(intent, "Transfer")
+    assert ledger._apply_intent(intent)[0]
+
+    assert ledger.recover_transfers() == {"completed": 1, "reversed": 0}
+    assert ledger.get_account_balance(source) == Money(700)
+    assert ledger.get_account_balance(target) == Money(300)
+    assert [row["type"] for row in ledger.get_transaction_history(target)] == ["transfer_in"]
+
+
+def test_recovery_refunds_when_the_target_is_gone(ledger, monkeypatch):
+    ledger, source, target = ledger
+    crash_before_credit(ledger, monkeypatch, source, target)
+    with ledger.on_shard(1), database.transaction() as cursor:
+        cursor.execute("DELETE FROM accounts WHERE id = ?", (target,))
+
+    assert ledger.recover_transfers() == {"completed": 0, "reversed": 1}
+    assert ledger.get_account_balance(source) == Money(1000)
+    assert intent_statuses(ledger) == ["reversed"]
+    assert ledger.get_transaction_history(source)[0]["note"] == f"Refund: transfer to #{target} failed"
+
+
+def test_open_recovers(ledger, monkeypatch):
+    ledger, source, target = ledger
+    crash_before_credit(ledger, monkeypatch, source, target)
+    ledger.close()
+
+    reopened = ShardedLedger.open(ledger.paths)
+    try:
+        assert reopened.get_account_balance(target) == Money(300)
+        assert intent_statuses(reopened) == ["completed"]
+    finally:
+        reopened.close()
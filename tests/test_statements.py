@@ -0,0 +1,67 @@
+import pytest
+
+from database import database, db_helper, statements
+from database.money import Money
+
+ROWS = [
+    ("deposit", 10000, "2025-01-03 09:00:00"),
+    ("transfer_out", 2500, "2025-01-03 17:30:00"),
+    ("transfer_out", 1000, "2025-01-20 12:00:00"),  # A withdrawal: no related account
+    ("transfer_in", 400, "2025-02-01 00:00:00"),
+    ("transfer_out", 900, "2025-02-14 23:59:59"),
+]
+DAYS = ["2025-01-02", "2025-01-03", "2025-01-19", "2025-01-20", "2025-01-31", "2025-02-01", "2025-02-14", "2025-03-01"]
+
+
+@pytest.fixture
+def account(small_bank):
+    account_id = db_helper.create_account(1, "Savings")
+    post(account_id, ROWS)
+    return account_id
+
+
+def post(account_id, rows):
+    with database.transaction() as cursor:
+        cursor.executemany("INSERT INTO transactions (account_id, type, amount, timestamp) VALUES (?, ?, ?, ?)",
+                           [(account_id,) + row for row in rows])
+
+
+def expected_balance(account_id, day):
+    # Straight from the ledger, without snapshots
+    with database.transaction() as cursor:
+        cursor.execute(f"""
+            SELECT COALESCE(SUM({statements._SIGNED_AMOUNT}), 0) FROM transactions
+            WHERE account_id = ? AND substr(timestamp, 1, 10) <= ?
+        """, (account_id, day))
+        return Money(cursor.fetchone()[0])
+
+
+def balances_at(account_id):
+    return [statements.get_balance_at(account_id, day) for day in DAYS]
+
+
+def test_balances_match_the_ledger_before_and_after_catch_up(account):
+    expected = [expected_balance(account, day) for day in DAYS]
+    assert balances_at(account) == expected  # Everything still unfolded
+    assert statements.catch_up_snapshots(chunk_size=7) > len(ROWS)
+    assert balances_at(account) == expected
+    assert statements.catch_up_snapshots() == 0
+
+
+def test_backdated_row_updates_later_snapshots(account):
+    statements.catch_up_snapshots()
+    post(account, [("deposit", 123, "2025-01-10 08:00:00")])
+    assert statements.catch_up_snapshots() == 1
+    assert balances_at(account) == [expected_balance(account, day) for day in DAYS]
+    assert statements.get_balance_at(account, "2025-01-09") == Money(7500)
+    assert statements.get_balance_at(account, "2025-01-10") == Money(7623)
+
+
+def test_statement_covers_its_period_only(account):
+    statements.catch_up_snapshots()
+    statement = statements.get_statement(account, *statements.month_bounds("2025-02"))
+    assert (statement["since"], statement["until"]) == ("2025-02-01", "2025-03-01")
+    assert statement["opening_balance"] == expected_balance(account, "2025-01-31") == Money(6500)
+    assert (statement["credits"], statement["debits"]) == (Money(400), Money(900))
+    assert statement["closing_balance"] == expected_balance(account, "2025-02-28") == Money(6000)
+    assert [row["timestamp"] for row in statement["transactions"]] == ["2025-02-01 00:00:00", "2025-02-14 23:59:59"]
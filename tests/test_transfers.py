@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+from database import database, db_helper
+from database.money import Money
+
+
+def balances(*account_ids):
+    return [db_helper.get_account_balance(account_id) for account_id in account_ids]
+
+
+def transfer_rows():
+    with database.transaction() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM transactions WHERE type IN ('transfer_out', 'transfer_in')")
+        return cursor.fetchone()[0]
+
+
+def test_transfer_moves_both_balances_and_writes_both_rows(small_bank):
+    before = balances(1, 3)
+    rows = transfer_rows()
+    result = db_helper.transfer_funds(1, 3, Money(100), note="Rent", note_in="Rent from 1")
+    assert result and result.from_balance == before[0] - Money(100)
+    assert (result.from_user_id, result.to_user_id) == (1, 2)
+    assert balances(1, 3) == [before[0] - Money(100), before[1] + Money(100)]
+    assert transfer_rows() == rows + 2
+    assert [(row["type"], row["note"]) for row in db_helper.get_transaction_page(3, limit=1)] == \
+        [("transfer_in", "Rent from 1")]
+
+
+@pytest.mark.parametrize("to_account, amount, error", [
+    (999, Money(100), db_helper.ACCOUNT_NOT_FOUND),  # Fails after the debit
+    (3, None, db_helper.INSUFFICIENT_FUNDS),
+    (1, Money(100), db_helper.SAME_ACCOUNT),
+    (3, Money(0), db_helper.INVALID_AMOUNT),
+])
+def test_failed_transfer_changes_nothing(small_bank, to_account, amount, error):
+    before = balances(1, 3)
+    rows = transfer_rows()
+    result = db_helper.transfer_funds(1, to_account, before[0] + Money(1) if amount is None else amount)
+    assert not result and result.error == error
+    assert balances(1, 3) == before
+    assert transfer_rows() == rows
+
+
+def test_concurrent_transfers_never_overdraw(small_bank):
+    # Every thread, on its own connection, tries to move the whole balance
+    with database.transaction() as cursor:
+        cursor.execute("UPDATE accounts SET balance = 1000 WHERE id = 1")
+    results = []
+
+    def drain(to_account):
+        results.append(db_helper.transfer_funds(1, to_account, Money(1000)))
+
+    threads = [threading.Thread(target=drain, args=(to_account,)) for to_account in range(3, 11)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(bool(result) for result in results) == 1
+    assert {result.error for result in results if not result} == {db_helper.INSUFFICIENT_FUNDS}
+    assert db_helper.get_account_balance(1) == Money(0)
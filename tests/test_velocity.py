@@ -0,0 +1,66 @@
+import json
+import time
+
+import pytest
+
+from database import database, db_helper, velocity
+from database.money import Money
+from database.velocity import VelocityLimitExceeded, velocity_engine
+
+ONE_A_MINUTE = [{"name": "one_a_minute", "scope": "account",
+                 "operations": ["deposit", "withdrawal", "transfer"], "window_seconds": 60, "max_count": 1}]
+
+
+@pytest.fixture
+def rules(small_bank):
+    velocity_engine.configure(ONE_A_MINUTE)
+    yield
+    velocity_engine.configure([])
+
+
+@pytest.mark.parametrize("post", [
+    lambda: db_helper.deposit(1, Money(100)),
+    lambda: db_helper.record_withdrawal(1, Money(100)),
+    lambda: db_helper.transfer_funds(1, 2, Money(100)),
+])
+def test_every_posting_raises_when_blocked(rules, post):
+    assert post()
+    balance = db_helper.get_account_balance(1)
+    with pytest.raises(VelocityLimitExceeded):
+        post()
+    assert db_helper.get_account_balance(1) == balance
+
+
+def test_post_batch_is_exempt(rules):
+    results = db_helper.post_batch([{"type": "deposit", "account_id": 1, "amount": Money(100)}] * 3)
+    assert all(result["ok"] for result in results)
+
+
+def test_warm_reads_by_timestamp_not_id(rules):
+    now = time.time()
+    recent = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(now - 10))
+    with database.transaction() as cursor:
+        cursor.execute("UPDATE transactions SET timestamp = '2000-01-01 00:00:00'")
+        cursor.executemany("INSERT INTO transactions (account_id, type, amount, timestamp) "
+                           "VALUES (2, 'deposit', 100, '2000-01-01 00:00:00')", [()] * 2000)
+        # Below every other id, as a late import of a recent row could leave it
+        cursor.execute("INSERT INTO transactions (id, account_id, type, amount, timestamp) "
+                       "VALUES (0, 1, 'deposit', 100, ?)", (recent,))
+
+    assert velocity_engine.warm(now=now) == 1
+    with pytest.raises(VelocityLimitExceeded):
+        db_helper.deposit(1, Money(100))
+    assert db_helper.deposit(3, Money(100))
+
+
+def test_configure_from_environment_reports_instead_of_printing(small_bank, tmp_path, monkeypatch, capsys):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"rules": ONE_A_MINUTE}))
+    assert velocity.configure_from_environment() is None
+    db_helper.deposit(1, Money(100))  # The synthetic rows are all older than a minute
+    monkeypatch.setenv("BANKING_VELOCITY_RULES", str(path))
+    try:
+        assert velocity.configure_from_environment() == {"path": str(path), "rules": 1, "warmed": 1}
+    finally:
+        velocity_engine.configure([])
+    assert capsys.readouterr().out == ""